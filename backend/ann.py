@@ -0,0 +1,179 @@
+# backend/ann.py
+"""
+Índice aproximado (ANN) para catálogos grandes, no estilo IVF.
+
+1. Os vetores TF-IDF dos itens são projetados aleatoriamente para ANN_DIM
+   dimensões (projeção gaussiana) e normalizados.
+2. Um k-means esférico (NumPy) agrupa essas projeções em ANN_LISTAS
+   centróides. Cada item vai para a lista do centróide mais próximo.
+3. Na consulta, o perfil é projetado do mesmo jeito, escolhemos as
+   ANN_NPROBE listas com centróide mais parecido e só os itens dessas listas
+   recebem a similaridade EXATA (cosseno na matriz TF-IDF original).
+
+ANN_NPROBE é o botão de recall/latência: mais listas visitadas => mais
+candidatos, mais recall e mais tempo. Com nprobe == número de listas o
+resultado é idêntico ao exato.
+
+ANN_NPROBE é um mínimo: se essas listas não têm itens suficientes para o
+top_k pedido (ou, com filtro de gênero, itens do gênero), as listas
+seguintes, por proximidade, entram até completar. Assim a recomendação
+aproximada traz tantos itens quanto a exata.
+
+Para medir recall@k contra o cálculo exato: python -m benchmarks.ann_recall
+"""
+from __future__ import annotations
+
+import threading
+from typing import Optional
+
+import numpy as np
+import scipy.sparse as sp
+
+from .config import ANN_DIM, ANN_LISTAS, ANN_NPROBE, ANN_SEED
+from .vetores import norma_perfil, normalizar_linhas, produto_perfil
+
+_lock = threading.Lock()
+_indice: Optional[dict] = None
+
+_ITERACOES_KMEANS = 15
+_AMOSTRA_POR_LISTA = 64
+_BLOCO = 65536
+
+
+def _mais_proximo(X: np.ndarray, centroides: np.ndarray) -> np.ndarray:
+    rotulos = np.empty(len(X), dtype=np.int64)
+    for ini in range(0, len(X), _BLOCO):
+        rotulos[ini : ini + _BLOCO] = np.argmax(X[ini : ini + _BLOCO] @ centroides.T, axis=1)
+    return rotulos
+
+
+def _kmeans_esferico(X: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+    n = len(X)
+    amostra = X[rng.choice(n, size=min(n, k * _AMOSTRA_POR_LISTA), replace=False)]
+    centroides = amostra[rng.choice(len(amostra), size=k, replace=False)]
+    for _ in range(_ITERACOES_KMEANS):
+        rotulos = _mais_proximo(amostra, centroides)
+        indicadora = sp.csr_matrix(
+            (np.ones(len(amostra)), (rotulos, np.arange(len(amostra)))),
+            shape=(k, len(amostra)),
+        )
+        somas = np.asarray(indicadora @ amostra)
+        vazios = np.flatnonzero(indicadora.getnnz(axis=1) == 0)
+        # listas vazias recomeçam num ponto aleatório da amostra
+        somas[vazios] = amostra[rng.choice(len(amostra), size=len(vazios))]
+        centroides = normalizar_linhas(somas)
+    return centroides
+
+
+def construir(
+    item_matrix,
+    n_listas: Optional[int] = None,
+    dim: int = ANN_DIM,
+    seed: int = ANN_SEED,
+) -> dict:
+    """Monta o índice IVF para item_matrix e o torna o índice ativo."""
+    global _indice
+    n_itens, n_termos = item_matrix.shape
+    if n_listas is None:
+        n_listas = ANN_LISTAS or int(round(4 * np.sqrt(n_itens)))
+    n_listas = max(1, min(n_listas, n_itens))
+
+    rng = np.random.default_rng(seed)
+    projecao = rng.standard_normal((n_termos, dim)) / np.sqrt(dim)
+    X = normalizar_linhas(np.asarray(item_matrix @ projecao))
+    centroides = _kmeans_esferico(X, n_listas, rng)
+    rotulos = _mais_proximo(X, centroides)
+
+    # listas invertidas: itens ordenados por lista + offsets de cada lista
+    ordem = np.argsort(rotulos, kind="stable")
+    offsets = np.concatenate(([0], np.cumsum(np.bincount(rotulos, minlength=n_listas))))
+
+    indice = {
+        "matriz": item_matrix,
+        "projecao": projecao,
+        "centroides": centroides,
+        "ordem": ordem,
+        "offsets": offsets,
+        "rotulos": rotulos,
+    }
+    with _lock:
+        _indice = indice
+    return indice
+
+
+def _listas_por_proximidade(indice: dict, profile: np.ndarray) -> np.ndarray:
+    """Listas em ordem decrescente de similaridade do centróide com o perfil."""
+    q = np.asarray(profile @ indice["projecao"]).ravel()
+    return np.argsort(-(indice["centroides"] @ q), kind="stable")
+
+
+def candidatos(
+    indice: dict,
+    profile: np.ndarray,
+    nprobe: int,
+    linhas: Optional[np.ndarray] = None,
+    minimo: int = 0,
+) -> Optional[np.ndarray]:
+    """
+    Itens das nprobe listas mais próximas do perfil, em ordem: posições na
+    matriz, ou, com `linhas` (ordenadas), índices em linhas dos itens delas
+    que estão nessas listas. Se as nprobe listas têm menos de `minimo`
+    desses itens, as listas seguintes (por proximidade) entram até completar.
+    None = seria preciso visitar todas as listas (vale o cálculo exato).
+    """
+    listas = _listas_por_proximidade(indice, profile)
+    ordem, offsets = indice["ordem"], indice["offsets"]
+    if linhas is None:
+        tamanhos = np.diff(offsets)[listas]
+    else:
+        rotulos = indice["rotulos"][linhas]
+        tamanhos = np.bincount(rotulos, minlength=len(listas))[listas]
+    # menor prefixo de listas com pelo menos `minimo` itens
+    n_listas = max(nprobe, int(np.searchsorted(np.cumsum(tamanhos), minimo)) + 1)
+    if n_listas >= len(listas):
+        return None
+    if linhas is None:
+        partes = [ordem[offsets[l] : offsets[l + 1]] for l in listas[:n_listas]]
+        return np.sort(np.concatenate(partes))
+    posto = np.empty(len(listas), dtype=np.int64)
+    posto[listas] = np.arange(len(listas))
+    return np.flatnonzero(posto[rotulos] < n_listas)
+
+
+def ann_scores(
+    item_matrix,
+    profile: np.ndarray,
+    linhas: Optional[np.ndarray] = None,
+    nprobe: Optional[int] = None,
+    minimo: int = 0,
+) -> np.ndarray:
+    """
+    Similaridade exata só para os candidatos do índice; os demais itens
+    ficam com NaN (não entram na recomendação).
+    Com `linhas` (ordenadas), o resultado corresponde só a essas linhas, e
+    a busca percorre as listas só atrás delas (ex.: um gênero).
+    `minimo` é quantos itens o chamador precisa pontuados (top_k mais os
+    que ele vai descartar): as listas seguintes entram até haver candidatos
+    suficientes; se nem todas bastam, o cálculo é o exato.
+    Sem índice para esta matriz (ainda não montado, a requisição começou
+    antes de uma troca de modelo, ou são as linhas ingeridas depois do fit,
+    ver catalogo.MatrizItens) o cálculo é o exato em todas as linhas: a
+    requisição nunca refaz o k-means, e itens novos são sempre candidatos.
+    """
+    indice = _indice
+    n = item_matrix.shape[0] if linhas is None else len(linhas)
+    norma = norma_perfil(profile)
+    if norma == 0:
+        return np.full(n, np.nan)
+    q = profile / norma
+    destino = None
+    if indice is not None and indice["matriz"] is item_matrix:
+        nprobe = max(1, ANN_NPROBE if nprobe is None else nprobe)
+        destino = candidatos(indice, profile, nprobe, linhas, minimo)
+    if destino is None:
+        matriz = item_matrix if linhas is None else item_matrix[linhas]
+        return produto_perfil(matriz, q)
+    sims = np.full(n, np.nan)
+    cand = destino if linhas is None else linhas[destino]
+    sims[destino] = produto_perfil(item_matrix[cand], q)
+    return sims
@@ -1,25 +1,122 @@
 # backend/app.py
-from typing import List
+import asyncio
+import contextvars
+import functools
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
 
 import pandas as pd
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 
-from .config import DATA_DIR, IMAGE_DIR
+from .config import (
+    DATA_DIR,
+    IMAGE_DIR,
+    SERVER_TIMING,
+    EXECUTOR_LEITURA_THREADS,
+    EXECUTOR_ESCRITA_THREADS,
+    LIMITE_CONCORRENCIA,
+)
 from .models import (
     Item,
+    ItemCreateRequest,
+    ItemUpdateRequest,
+    DriftCatalogoResponse,
     User,
     CreateUserRequest,
     AvaliacaoRequest,
     RecomendacaoRequest,
+    RecomendacaoLoteRequest,
+    RecomendacaoUsuario,
     MetricasResponse,
+    MetricasUsuario,
     AnaliseUsuarioResponse,
 )
+from . import capas
+from . import metrics
 from . import recommender as rec
+from .metrics import etapa
+
+
+# Trabalho bloqueante (pandas/sklearn, arquivos, SQLite) roda fora do event
+# loop, em dois executores: leituras/pontuação e escritas. Assim uma
+# recomendação lenta não trava o loop e leituras não esperam atrás de escritas.
+_executor_leitura: Optional[ThreadPoolExecutor] = None
+_executor_escrita: Optional[ThreadPoolExecutor] = None
+# loop -> semáforo que limita as requisições pesadas simultâneas
+_semaforos: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def _executores() -> tuple:
+    global _executor_leitura, _executor_escrita
+    if _executor_leitura is None:
+        _executor_leitura = ThreadPoolExecutor(
+            EXECUTOR_LEITURA_THREADS, thread_name_prefix="musiq-leitura"
+        )
+    if _executor_escrita is None:
+        _executor_escrita = ThreadPoolExecutor(
+            EXECUTOR_ESCRITA_THREADS, thread_name_prefix="musiq-escrita"
+        )
+    return _executor_leitura, _executor_escrita
+
+
+def _encerrar_executores() -> None:
+    global _executor_leitura, _executor_escrita
+    for executor in (_executor_leitura, _executor_escrita):
+        if executor is not None:
+            executor.shutdown(wait=True)
+    _executor_leitura = _executor_escrita = None
+
+
+async def _rodar(executor: ThreadPoolExecutor, fn, *args, **kwargs):
+    # copia o contexto (tempos do Server-Timing) para a thread do executor
+    ctx = contextvars.copy_context()
+    chamada = functools.partial(ctx.run, fn, *args, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(executor, chamada)
 
 
-app = FastAPI(title="Musiq+ API", version="1.0")
+async def em_leitura(fn, *args, **kwargs):
+    """Leitura barata (ex.: /usuarios): vai direto ao executor de leitura."""
+    return await _rodar(_executores()[0], fn, *args, **kwargs)
+
+
+async def em_escrita(fn, *args, **kwargs):
+    return await _rodar(_executores()[1], fn, *args, **kwargs)
+
+
+async def em_calculo(fn, *args, **kwargs):
+    """
+    Trabalho pesado (pontuação, métricas, catálogo inteiro). Espera no event
+    loop, sem ocupar thread, enquanto houver LIMITE_CONCORRENCIA em execução,
+    de modo que sempre sobram threads de leitura para as rotas baratas.
+    """
+    loop = asyncio.get_running_loop()
+    semaforo = _semaforos.get(loop)
+    if semaforo is None:
+        semaforo = _semaforos[loop] = asyncio.Semaphore(LIMITE_CONCORRENCIA)
+    async with semaforo:
+        return await em_leitura(fn, *args, **kwargs)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    _executores()
+    # abre o artefato do modelo (ou faz o fit) antes da primeira requisição
+    try:
+        await em_leitura(rec._ensure_model)
+    except RuntimeError:
+        # sem itens.csv: o erro volta a aparecer nas requisições
+        pass
+    yield
+    _encerrar_executores()
+
+
+app = FastAPI(title="Musiq+ API", version="1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -28,83 +125,143 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def medir_requisicoes(request: Request, call_next):
+    inicio = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # template da rota (ex.: /metricas/{usuario_id}) para não explodir a cardinalidade
+        rota = getattr(request.scope.get("route"), "path", "desconhecida")
+        metrics.DURACAO_REQUISICAO.observe(
+            time.perf_counter() - inicio, metodo=request.method, rota=rota
+        )
+        metrics.REQUISICOES.inc(metodo=request.method, rota=rota, status=str(status))
+
+
+@app.middleware("http")
+async def adicionar_server_timing(request: Request, call_next):
+    if not (SERVER_TIMING or request.headers.get("x-musiq-debug") == "1"):
+        return await call_next(request)
+    # as etapas rodam nos executores com uma cópia do contexto (ver _rodar):
+    # o dict é o mesmo objeto, então os tempos voltam para cá
+    tempos, token = metrics.iniciar_tempos()
+    inicio = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        metrics.encerrar_tempos(token)
+    response.headers["Server-Timing"] = metrics.server_timing(
+        tempos, time.perf_counter() - inicio
+    )
+    return response
+
+
 # Expor capas
 if IMAGE_DIR.exists():
     app.mount("/static", StaticFiles(directory=IMAGE_DIR), name="static")
 
 
 def _itens_with_capa(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    from pathlib import Path
-
-    for idx, row in df.iterrows():
-        image_jpg = IMAGE_DIR / f"{row['item_id']}.jpg"
-        image_png = IMAGE_DIR / f"{row['item_id']}.png"
-        placeholder = IMAGE_DIR / "placeholder.jpg"
-        if image_jpg.exists():
-            path = f"/static/{row['item_id']}.jpg"
-        elif image_png.exists():
-            path = f"/static/{row['item_id']}.png"
-        elif placeholder.exists():
-            path = "/static/placeholder.jpg"
-        else:
-            path = ""
-        df.at[idx, "capa_url"] = path
-    return df
+    # índice item_id -> capa_url pré-calculado (ver backend/capas.py)
+    with etapa("capas"):
+        return capas.adicionar_capas(df)
 
 
-@app.get("/itens", response_model=List[Item])
-def listar_itens(q: str | None = None, genero: str | None = None):
-    itens_df = rec.get_itens_df()
+def _registros(df: pd.DataFrame) -> list:
+    with etapa("serializacao"):
+        return df.to_dict(orient="records")
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def exportar_metricas():
+    # formato texto do Prometheus (ver backend/metrics.py); barato, roda no loop
+    return PlainTextResponse(
+        metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+def _listar_itens(q: str | None, genero: str | None) -> list:
     if q:
-        q_lower = q.lower()
-        mask = (
-            itens_df["nome"].str.lower().str.contains(q_lower)
-            | itens_df["artista"].str.lower().str.contains(q_lower)
-            | itens_df["tags"].str.lower().str.contains(q_lower)
-        )
-        itens_df = itens_df[mask]
+        # índice invertido de n-gramas (backend/search.py)
+        itens_df = rec.buscar_itens(q)
+    else:
+        itens_df = rec.get_itens_df()
     if genero:
         itens_df = itens_df[itens_df["genero"].str.lower() == genero.lower()]
     itens_df = _itens_with_capa(itens_df)
-    return itens_df.to_dict(orient="records")
+    return _registros(itens_df)
 
 
-@app.get("/usuarios", response_model=List[User])
-def listar_usuarios():
+@app.get("/itens", response_model=List[Item])
+async def listar_itens(q: str | None = None, genero: str | None = None):
+    return await em_calculo(_listar_itens, q, genero)
+
+
+@app.get("/memoria", response_model=Dict[str, int])
+async def memoria():
+    # bytes da matriz de itens, dos perfis e do catálogo (ver MUSIQ_MODO_COMPACTO)
+    return await em_leitura(rec.uso_memoria)
+
+
+def _criar_item(req: ItemCreateRequest) -> dict:
+    try:
+        item = rec.adicionar_item(req.model_dump())
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return _registros(_itens_with_capa(pd.DataFrame([item])))[0]
+
+
+@app.post("/itens", response_model=Item)
+async def criar_item(req: ItemCreateRequest):
+    # vetoriza com o vocabulário atual; as recomendações seguem sendo servidas
+    return await em_escrita(_criar_item, req)
+
+
+@app.get("/itens/drift", response_model=DriftCatalogoResponse)
+async def drift_itens():
+    return await em_leitura(rec.drift_catalogo)
+
+
+def _atualizar_item(item_id: int, req: ItemUpdateRequest) -> dict:
+    item = rec.atualizar_item(item_id, req.model_dump(exclude_unset=True))
+    if item is None:
+        raise HTTPException(status_code=404, detail="Item não encontrado.")
+    return _registros(_itens_with_capa(pd.DataFrame([item])))[0]
+
+
+@app.patch("/itens/{item_id}", response_model=Item)
+async def atualizar_item(item_id: int, req: ItemUpdateRequest):
+    return await em_escrita(_atualizar_item, item_id, req)
+
+
+def _listar_usuarios() -> list:
     df = rec.load_usuarios_df()
     if df.empty:
         return []
     usuarios = df.groupby("usuario_id")["nome"].first().reset_index()
-    return usuarios.to_dict(orient="records")
+    return _registros(usuarios)
+
+
+@app.get("/usuarios", response_model=List[User])
+async def listar_usuarios():
+    return await em_leitura(_listar_usuarios)
 
 
 @app.post("/usuarios", response_model=User)
-def criar_usuario(req: CreateUserRequest):
-    df = rec.load_usuarios_df()
-    if df.empty:
-        new_id = 1
-    else:
-        new_id = int(df["usuario_id"].max()) + 1
-    novo = pd.DataFrame(
-        [
-            {
-                "usuario_id": new_id,
-                "nome": req.nome,
-                "item_id": None,
-                "gostou": 0,
-                "origem": "outro",
-            }
-        ]
-    )
-    df = pd.concat([df, novo], ignore_index=True)
-    rec.salvar_usuarios_df(df)
+async def criar_usuario(req: CreateUserRequest):
+    new_id = await em_escrita(rec.criar_usuario, req.nome)
     return {"usuario_id": new_id, "nome": req.nome}
 
 
 @app.post("/avaliar")
-def avaliar(req: AvaliacaoRequest):
-    rec.registrar_avaliacao(
+async def avaliar(req: AvaliacaoRequest):
+    await em_escrita(
+        rec.registrar_avaliacao,
         usuario_id=req.usuario_id,
         item_id=req.item_id,
         gostou=req.gostou,
@@ -113,11 +270,14 @@ def avaliar(req: AvaliacaoRequest):
     return {"ok": True}
 
 
-@app.post("/recomendar", response_model=List[Item])
-def recomendar(req: RecomendacaoRequest):
-    df_usuarios = rec.load_usuarios_df()
-    if req.usuario_id not in df_usuarios["usuario_id"].unique():
+def _exigir_usuario(usuario_id: int) -> None:
+    # pelos ids dos perfis: não relê o histórico depois de cada /avaliar
+    if not rec.usuario_existe(usuario_id):
         raise HTTPException(status_code=404, detail="Usuário não encontrado.")
+
+
+def _recomendar(req: RecomendacaoRequest) -> list:
+    _exigir_usuario(req.usuario_id)
     try:
         recs_df = rec.recommend_for_user(
             req.usuario_id, top_k=req.top_k, genero=req.genero
@@ -125,22 +285,58 @@ def recomendar(req: RecomendacaoRequest):
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     recs_df = _itens_with_capa(recs_df)
-    return recs_df.to_dict(orient="records")
+    return _registros(recs_df)
+
+
+@app.post("/recomendar", response_model=List[Item])
+async def recomendar(req: RecomendacaoRequest):
+    return await em_calculo(_recomendar, req)
+
+
+def _recomendar_lote(req: RecomendacaoLoteRequest) -> list:
+    existentes = {u for u in dict.fromkeys(req.usuario_ids) if rec.usuario_existe(u)}
+    ids = [u for u in req.usuario_ids if u in existentes]
+
+    recs, erros = rec.recommend_for_users(ids, top_k=req.top_k, genero=req.genero)
+
+    resposta = []
+    for usuario_id in dict.fromkeys(req.usuario_ids):
+        if usuario_id not in existentes:
+            resposta.append({"usuario_id": usuario_id, "erro": "Usuário não encontrado."})
+        elif usuario_id in erros:
+            resposta.append({"usuario_id": usuario_id, "erro": erros[usuario_id]})
+        else:
+            itens = _registros(_itens_with_capa(recs[usuario_id]))
+            resposta.append({"usuario_id": usuario_id, "itens": itens})
+    return resposta
+
+
+@app.post("/recomendar/lote", response_model=List[RecomendacaoUsuario])
+async def recomendar_lote(req: RecomendacaoLoteRequest):
+    return await em_calculo(_recomendar_lote, req)
+
+
+@app.get("/metricas", response_model=List[MetricasUsuario])
+async def metricas_todos():
+    # todos os usuários numa passada (dashboards), em vez de uma chamada por usuário
+    return await em_calculo(rec.compute_metricas_todos)
+
+
+def _metricas(usuario_id: int) -> dict:
+    _exigir_usuario(usuario_id)
+    return rec.compute_metricas(usuario_id)
 
 
 @app.get("/metricas/{usuario_id}", response_model=MetricasResponse)
-def metricas(usuario_id: int):
-    df_usuarios = rec.load_usuarios_df()
-    if usuario_id not in df_usuarios["usuario_id"].unique():
-        raise HTTPException(status_code=404, detail="Usuário não encontrado.")
-    m = rec.compute_metricas(usuario_id)
-    return m
+async def metricas(usuario_id: int):
+    return await em_calculo(_metricas, usuario_id)
 
 
-@app.get("/analise_usuario/{usuario_id}", response_model=AnaliseUsuarioResponse)
-def analise_usuario(usuario_id: int):
-    df_usuarios = rec.load_usuarios_df()
-    if usuario_id not in df_usuarios["usuario_id"].unique():
+def _analise_usuario(usuario_id: int) -> dict:
+    _exigir_usuario(usuario_id)
+    # só as linhas do usuário (no SQLite, uma consulta pelo índice)
+    regs = rec.registros_usuario(usuario_id)
+    if regs.empty:
         raise HTTPException(status_code=404, detail="Usuário não encontrado.")
 
     stats = rec.genero_stats(usuario_id)
@@ -148,18 +344,11 @@ def analise_usuario(usuario_id: int):
     ratings = rec.user_ratings(usuario_id)
 
     total_avaliacoes = int(len(ratings))
-    total_avaliacoes_recomendador = int(
-        df_usuarios[
-            (df_usuarios["usuario_id"] == usuario_id)
-            & (df_usuarios["origem"] == "recomendador")
-        ].shape[0]
-    )
+    total_avaliacoes_recomendador = int((regs["origem"] == "recomendador").sum())
 
     usuario = {
         "usuario_id": int(usuario_id),
-        "nome": str(
-            df_usuarios[df_usuarios["usuario_id"] == usuario_id]["nome"].iloc[0]
-        ),
+        "nome": str(regs["nome"].iloc[0]),
     }
 
     metricas_resp = {
@@ -178,3 +367,8 @@ def analise_usuario(usuario_id: int):
         "generos": stats,
         "metricas": metricas_resp,
     }
+
+
+@app.get("/analise_usuario/{usuario_id}", response_model=AnaliseUsuarioResponse)
+async def analise_usuario(usuario_id: int):
+    return await em_calculo(_analise_usuario, usuario_id)
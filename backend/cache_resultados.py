@@ -0,0 +1,100 @@
+# backend/cache_resultados.py
+"""
+Cache LRU dos resultados de recommend_for_user.
+
+A chave inclui tudo de que o resultado depende:
+(usuario_id, versão do perfil, geração dos perfis, gênero, top_k, backend,
+versão do catálogo). Um like/deslike muda a versão do perfil e um item
+novo/alterado muda a versão do catálogo, então uma entrada velha nunca é
+servida; além disso as entradas do usuário (ou todas, no caso do catálogo)
+são descartadas na hora, para não ocuparem memória até saírem pelo LRU.
+
+O tamanho é limitado em bytes (RESULTADOS_CACHE_MB, estimado com
+DataFrame.memory_usage(deep=True)). Hits e misses vão para /metrics.
+"""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Set
+
+import pandas as pd
+
+from .config import RESULTADOS_CACHE_MB
+from .metrics import REGISTRY
+
+CACHE_CONSULTAS = REGISTRY.counter(
+    "musiq_cache_resultados_total", "Consultas ao cache de recomendações.", ["resultado"]
+)
+CACHE_BYTES = REGISTRY.gauge("musiq_cache_resultados_bytes", "Bytes estimados no cache.")
+CACHE_ENTRADAS = REGISTRY.gauge("musiq_cache_resultados_entradas", "Entradas no cache.")
+
+_lock = threading.Lock()
+_entradas: "OrderedDict[tuple, tuple]" = OrderedDict()  # chave -> (df, bytes)
+_por_usuario: Dict[int, Set[tuple]] = {}
+_bytes = 0
+_limite_bytes = int(RESULTADOS_CACHE_MB * 1024 * 1024)
+
+
+def _atualizar_gauges() -> None:
+    CACHE_BYTES.set(_bytes)
+    CACHE_ENTRADAS.set(len(_entradas))
+
+
+def _remover(chave: tuple) -> None:
+    global _bytes
+    _, tamanho = _entradas.pop(chave)
+    _bytes -= tamanho
+    chaves = _por_usuario.get(chave[0])
+    if chaves is not None:
+        chaves.discard(chave)
+        if not chaves:
+            del _por_usuario[chave[0]]
+
+
+def obter(chave: tuple) -> Optional[pd.DataFrame]:
+    """Cópia do resultado guardado, ou None."""
+    with _lock:
+        entrada = _entradas.get(chave)
+        if entrada is None:
+            CACHE_CONSULTAS.inc(resultado="miss")
+            return None
+        _entradas.move_to_end(chave)
+        CACHE_CONSULTAS.inc(resultado="hit")
+    return entrada[0].copy()
+
+
+def guardar(chave: tuple, df: pd.DataFrame) -> None:
+    """chave[0] deve ser o usuario_id (para invalidar_usuario)."""
+    global _bytes
+    if _limite_bytes <= 0:
+        return
+    df = df.copy()
+    tamanho = int(df.memory_usage(deep=True).sum())
+    if tamanho > _limite_bytes:
+        return
+    with _lock:
+        if chave in _entradas:
+            _remover(chave)
+        _entradas[chave] = (df, tamanho)
+        _por_usuario.setdefault(chave[0], set()).add(chave)
+        _bytes += tamanho
+        while _bytes > _limite_bytes:
+            _remover(next(iter(_entradas)))
+        _atualizar_gauges()
+
+
+def invalidar_usuario(usuario_id: int) -> None:
+    with _lock:
+        for chave in list(_por_usuario.get(int(usuario_id), ())):
+            _remover(chave)
+        _atualizar_gauges()
+
+
+def limpar() -> None:
+    global _bytes
+    with _lock:
+        _entradas.clear()
+        _por_usuario.clear()
+        _bytes = 0
+        _atualizar_gauges()
@@ -0,0 +1,83 @@
+# backend/capas.py
+"""
+Índice item_id -> capa_url, montado com uma única listagem de IMAGE_DIR.
+
+Regra (igual à anterior, por item):
+  1. /static/<item_id>.jpg, se existir
+  2. /static/<item_id>.png, se existir
+  3. /static/placeholder.jpg, se existir
+  4. "" (sem capa)
+
+O índice é refeito quando o mtime de IMAGE_DIR muda. Essa verificação é
+feita no máximo a cada CAPAS_RECHECAR_SEGUNDOS, então montar a resposta
+não faz nenhuma chamada ao sistema de arquivos por item.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+
+from .config import CAPAS_RECHECAR_SEGUNDOS, IMAGE_DIR
+
+_lock = threading.Lock()
+_indice: Dict[int, str] = {}
+_placeholder = ""
+_mtime_ns: Optional[int] = None
+_verificado_em = 0.0
+
+
+def _mtime_dir() -> Optional[int]:
+    try:
+        return IMAGE_DIR.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def _construir() -> Tuple[Dict[int, str], str]:
+    jpg, png = {}, {}
+    placeholder = ""
+    try:
+        entradas = list(os.scandir(IMAGE_DIR))
+    except FileNotFoundError:
+        entradas = []
+    for entrada in entradas:
+        nome = entrada.name
+        if nome == "placeholder.jpg":
+            placeholder = "/static/placeholder.jpg"
+            continue
+        base, ext = os.path.splitext(nome)
+        # só nomes que o f"{item_id}.jpg" antigo geraria (ex.: "7", não "07")
+        if ext not in (".jpg", ".png") or not base.lstrip("-").isdigit():
+            continue
+        if str(int(base)) != base:
+            continue
+        (jpg if ext == ".jpg" else png)[int(base)] = f"/static/{nome}"
+    indice = {**png, **jpg}  # .jpg tem prioridade sobre .png
+    return indice, placeholder
+
+
+def indice_capas() -> Tuple[Dict[int, str], str]:
+    """Retorna (item_id -> capa_url, url do placeholder), atualizando se preciso."""
+    global _indice, _placeholder, _mtime_ns, _verificado_em
+    agora = time.monotonic()
+    if _mtime_ns is not None and agora - _verificado_em < CAPAS_RECHECAR_SEGUNDOS:
+        return _indice, _placeholder
+    with _lock:
+        mtime = _mtime_dir()
+        if _mtime_ns is None or mtime != _mtime_ns:
+            _indice, _placeholder = _construir()
+            _mtime_ns = mtime if mtime is not None else -1
+        _verificado_em = agora
+    return _indice, _placeholder
+
+
+def adicionar_capas(df: pd.DataFrame) -> pd.DataFrame:
+    """Preenche a coluna capa_url com um join vetorizado no índice."""
+    indice, placeholder = indice_capas()
+    df = df.copy()
+    df["capa_url"] = df["item_id"].map(indice).fillna(placeholder)
+    return df
@@ -0,0 +1,406 @@
+# backend/catalogo.py
+"""
+Atualização incremental do catálogo (POST /itens, PATCH /itens/{id}).
+
+As alterações não reescrevem o itens.csv: cada uma anexa a versão completa
+do item ao itens.log (uma linha JSON por alteração; vale a última de cada
+item_id). As escritas de todos os workers são serializadas por um lock em
+arquivo (itens.escrita.lock): com o lock, o worker primeiro aplica o que os
+outros já anexaram ao log, e só então aloca o item_id novo e anexa a sua
+alteração. Assim ids não se repetem e nenhuma alteração se perde. As
+leituras também aplicam as linhas novas do log antes de responder (um stat
+por requisição), então todos os workers veem o mesmo catálogo.
+
+Na carga, o catálogo é o itens.csv com o itens.log aplicado, e o modelo do
+fit é identificado pelo hash dos dois (hash_catalogo).
+
+Um item novo ou alterado é vetorizado com o vocabulário e os pesos IDF já
+ajustados (sem refazer o fit) e vira uma linha nova no fim do catálogo em
+memória; nada do que veio do fit é copiado ou alterado:
+
+- a matriz de itens passa a ser MatrizItens(base, novas): a base é a matriz
+  do artefato (memory-map) e as linhas novas ficam num buffer CSR que cresce
+  por anexação (LinhasNovas), com custo O(nnz do item)
+- um PATCH não reescreve a linha do item: a versão nova é anexada e a
+  posição antiga passa a ser ignorada (o recommender a marca como morta)
+- gêneros e busca ganham a posição nova nas suas listas, no lugar
+- o índice item_id -> linha (PosicoesItens) busca os ids do fit no
+  artefato e guarda num dict só os ids das linhas novas
+
+Posições só crescem, então quem está no meio de uma recomendação continua
+com uma visão válida (a matriz que pegou não muda), e a próxima requisição
+já vê a linha nova. O próximo fit consolida tudo numa base só.
+
+O vocabulário congelado envelhece à medida que o catálogo muda. O "drift"
+mede isso: a fração de tokens dos itens ingeridos que não existem no
+vocabulário (OOV) e a fração do catálogo alterada desde o último fit. Quando
+passa dos limiares de config, vale rodar um fit completo (reiniciar o
+backend ou `python -m backend.model_store`, já que o catálogo mudou).
+"""
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import json
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from . import ingestao, lock_arquivo
+from .config import DATA_DIR, DRIFT_FRACAO_LIMIAR, DRIFT_OOV_LIMIAR
+
+# serializa as ingestões deste processo (as leituras não pegam lock);
+# reentrante: a sincronização com o log roda dentro de escrita()
+lock = threading.RLock()
+
+# lock de escrita mais velho que isso é de um processo que morreu
+_LOCK_EXPIRA_SEGUNDOS = 60
+
+_drift = {"adicionados": 0, "atualizados": 0, "tokens": 0, "tokens_oov": 0}
+
+
+def resetar_drift() -> None:
+    """O modelo foi (re)ajustado: o drift volta a zero."""
+    for chave in _drift:
+        _drift[chave] = 0
+
+
+def registrar_drift(n_tokens: int, n_oov: int, novo: bool) -> None:
+    _drift["adicionados" if novo else "atualizados"] += 1
+    _drift["tokens"] += n_tokens
+    _drift["tokens_oov"] += n_oov
+
+
+def drift(n_itens: int) -> dict:
+    alterados = _drift["adicionados"] + _drift["atualizados"]
+    taxa_oov = _drift["tokens_oov"] / _drift["tokens"] if _drift["tokens"] else 0.0
+    fracao = alterados / n_itens if n_itens else 0.0
+    return {
+        "itens_catalogo": n_itens,
+        "itens_adicionados": _drift["adicionados"],
+        "itens_atualizados": _drift["atualizados"],
+        "fracao_alterada": fracao,
+        "tokens": _drift["tokens"],
+        "tokens_fora_vocabulario": _drift["tokens_oov"],
+        "taxa_oov": taxa_oov,
+        "refit_recomendado": taxa_oov > DRIFT_OOV_LIMIAR or fracao > DRIFT_FRACAO_LIMIAR,
+    }
+
+
+class Buffer:
+    """
+    Array que cresce por anexação no eixo 0, dobrando a capacidade. visao()
+    não copia; o trecho já anexado nunca muda, então uma visão antiga
+    continua válida depois de novas anexações.
+    """
+
+    def __init__(self, dtype, forma: tuple = ()):
+        self._dados = np.empty((16,) + tuple(forma), dtype=dtype)
+        self.n = 0
+
+    def anexar(self, valores) -> None:
+        valores = np.asarray(valores, dtype=self._dados.dtype)
+        fim = self.n + len(valores)
+        if fim > len(self._dados):
+            capacidade = max(fim, 2 * len(self._dados))
+            dados = np.empty((capacidade,) + self._dados.shape[1:], dtype=self._dados.dtype)
+            dados[: self.n] = self._dados[: self.n]
+            self._dados = dados
+        self._dados[self.n : fim] = valores
+        self.n = fim
+
+    def visao(self) -> np.ndarray:
+        return self._dados[: self.n]
+
+
+class LinhasNovas:
+    """Linhas anexadas à matriz de itens depois do fit, num CSR que cresce."""
+
+    def __init__(self, base: sp.csr_matrix):
+        self.n_colunas = base.shape[1]
+        # indices e indptr com o mesmo dtype: o csr_matrix não converte (copia)
+        self._data = Buffer(base.dtype)
+        self._indices = Buffer(base.indices.dtype)
+        self._indptr = Buffer(base.indices.dtype)
+        self._indptr.anexar([0])
+
+    def anexar(self, vetor: sp.csr_matrix) -> sp.csr_matrix:
+        """Anexa vetor (1 x V) e devolve a matriz de todas as linhas novas."""
+        vetor = sp.csr_matrix(vetor)
+        vetor.sort_indices()
+        self._data.anexar(vetor.data)
+        self._indices.anexar(vetor.indices)
+        self._indptr.anexar([self._indices.n])
+        return sp.csr_matrix(
+            (self._data.visao(), self._indices.visao(), self._indptr.visao()),
+            shape=(self._indptr.n - 1, self.n_colunas),
+            copy=False,
+        )
+
+
+class MatrizItens:
+    """
+    Matriz de itens = base (a do fit) + linhas novas, sem copiar a base. Tem
+    o que o backend usa de uma csr_matrix: shape, dtype, linhas (m[i],
+    m[lista]) e produto por vetor ou matriz densa (m @ x).
+    """
+
+    def __init__(self, base: sp.csr_matrix, novas: sp.csr_matrix):
+        self.base, self.novas = base, novas
+        self.n_base = base.shape[0]
+        self.shape = (self.n_base + novas.shape[0], base.shape[1])
+        self.dtype = base.dtype
+
+    def __getitem__(self, linhas):
+        if isinstance(linhas, (int, np.integer)):
+            if linhas < self.n_base:
+                return self.base[linhas]
+            return self.novas[linhas - self.n_base]
+        linhas = np.asarray(linhas, dtype=np.int64)
+        novas = linhas >= self.n_base
+        if not novas.any():
+            return self.base[linhas]
+        if novas.all():
+            return self.novas[linhas - self.n_base]
+        partes = sp.vstack(
+            [self.base[linhas[~novas]], self.novas[linhas[novas] - self.n_base]], format="csr"
+        )
+        origem = np.concatenate([np.flatnonzero(~novas), np.flatnonzero(novas)])
+        return partes[np.argsort(origem)]
+
+    def __matmul__(self, x):
+        return np.concatenate([np.asarray(self.base @ x), np.asarray(self.novas @ x)])
+
+    def pontuar(self, fn, linhas: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        fn(matriz, linhas) aplicado à base e às linhas novas separadamente,
+        com o resultado na ordem de linhas (ou de todas as linhas).
+        """
+        if linhas is None:
+            return np.concatenate([fn(self.base, None), fn(self.novas, None)])
+        linhas = np.asarray(linhas, dtype=np.int64)
+        novas = linhas >= self.n_base
+        sims = np.empty(len(linhas))
+        if (~novas).any():
+            sims[~novas] = fn(self.base, linhas[~novas])
+        if novas.any():
+            sims[novas] = fn(self.novas, linhas[novas] - self.n_base)
+        return sims
+
+
+class PosicoesItens:
+    """
+    item_id -> linha (viva) na matriz de itens, sem um dict do catálogo
+    inteiro: as linhas do fit são achadas por busca binária nos ids
+    ordenados do artefato (memory-map, ordem = argsort estável dos ids), e
+    só os itens ingeridos depois do fit ficam num dict, que tem precedência.
+    Tem o que o backend usa de um dict (in, get, [], []=, len) e posicoes()
+    para um array de ids de uma vez.
+    """
+
+    def __init__(self, ordenados: np.ndarray, ordem: np.ndarray):
+        self._ordenados, self._ordem = ordenados, ordem
+        # ids distintos do fit
+        self._n_fit = int(np.count_nonzero(np.diff(ordenados))) + 1 if len(ordenados) else 0
+        self._novos: Dict[int, int] = {}
+        # ids anexados depois do fit que não existiam nele
+        self._extras = 0
+
+    def posicoes(self, item_ids) -> np.ndarray:
+        """Linha de cada id de item_ids (-1 = fora do catálogo)."""
+        ids = np.asarray(item_ids, dtype=np.int64)
+        ordenados = self._ordenados
+        # com ids repetidos no itens.csv vale a última linha, como num dict
+        i = np.searchsorted(ordenados, ids, side="right") - 1
+        achou = i >= 0
+        if len(ordenados):
+            achou &= ordenados[np.maximum(i, 0)] == ids
+        pos = np.full(len(ids), -1, dtype=np.int64)
+        pos[achou] = self._ordem[i[achou]]
+        novos = list(self._novos.items())  # cópia atômica: escritas em paralelo
+        if novos:
+            chaves = np.array([k for k, _ in novos], dtype=np.int64)
+            valores = np.array([v for _, v in novos], dtype=np.int64)
+            ordem = np.argsort(chaves)
+            chaves, valores = chaves[ordem], valores[ordem]
+            j = np.minimum(np.searchsorted(chaves, ids), len(chaves) - 1)
+            nos_novos = chaves[j] == ids
+            pos[nos_novos] = valores[j[nos_novos]]
+        return pos
+
+    def get(self, item_id: int, padrao: Optional[int] = None) -> Optional[int]:
+        pos = self._novos.get(item_id)
+        if pos is not None:
+            return pos
+        pos = int(self.posicoes([item_id])[0])
+        return padrao if pos < 0 else pos
+
+    def __contains__(self, item_id) -> bool:
+        return self.get(item_id) is not None
+
+    def __getitem__(self, item_id: int) -> int:
+        pos = self.get(item_id)
+        if pos is None:
+            raise KeyError(item_id)
+        return pos
+
+    def __setitem__(self, item_id: int, pos: int) -> None:
+        if item_id not in self:
+            self._extras += 1
+        self._novos[int(item_id)] = int(pos)
+
+    def __len__(self) -> int:
+        return self._n_fit + self._extras
+
+
+def log_path() -> Path:
+    return DATA_DIR / "itens.log"
+
+
+def _lock_path() -> Path:
+    return DATA_DIR / "itens.escrita.lock"
+
+
+@contextlib.contextmanager
+def escrita():
+    """Lock de escrita no catálogo: threads deste processo e outros workers."""
+    with lock, lock_arquivo.segurando(_lock_path(), _LOCK_EXPIRA_SEGUNDOS):
+        yield
+
+
+def _valor_json(v):
+    if isinstance(v, np.generic):
+        v = v.item()
+    if isinstance(v, float) and np.isnan(v):
+        return None
+    return v
+
+
+def anexar_log(item: dict) -> int:
+    """
+    Anexa a versão completa do item ao itens.log (chamado com escrita()).
+    Retorna o tamanho do log depois da escrita.
+    """
+    linha = json.dumps({k: _valor_json(v) for k, v in item.items()}, ensure_ascii=False)
+    with open(log_path(), "ab") as f:
+        f.write((linha + "\n").encode("utf-8"))
+        return f.tell()
+
+
+def tamanho_log() -> int:
+    try:
+        return log_path().stat().st_size
+    except FileNotFoundError:
+        return 0
+
+
+def ler_log(inicio: int = 0, fim: Optional[int] = None) -> Tuple[List[dict], int]:
+    """
+    Itens anexados ao log entre os bytes inicio e fim (padrão: até o final).
+    Retorna (itens, byte seguinte à última linha completa lida): uma linha
+    ainda sendo escrita fica para a próxima leitura.
+    """
+    try:
+        with open(log_path(), "rb") as f:
+            f.seek(inicio)
+            dados = f.read() if fim is None else f.read(max(0, fim - inicio))
+    except FileNotFoundError:
+        return [], inicio
+    completo = dados.rfind(b"\n") + 1
+    itens = [json.loads(linha) for linha in dados[:completo].splitlines() if linha.strip()]
+    return itens, inicio + completo
+
+
+def _ultimas_versoes(entradas: List[dict], colunas) -> pd.DataFrame:
+    """Última versão de cada item_id do log, na ordem da primeira aparição."""
+    log = pd.DataFrame(entradas).reindex(columns=colunas)
+    ordem_ids = log["item_id"].drop_duplicates()
+    ultimas = log.drop_duplicates("item_id", keep="last").set_index("item_id")
+    return ultimas.loc[ordem_ids].reset_index()
+
+
+def _substituir(itens: pd.DataFrame, ultimas: pd.DataFrame, pos: np.ndarray) -> pd.DataFrame:
+    """
+    itens com ultimas.iloc[i] no lugar de itens.iloc[pos[i]] (pos < 0: não
+    está em itens) e as linhas restantes de ultimas no fim.
+    """
+    n = len(itens)
+    existentes = pos >= 0
+    ordem = np.arange(n)
+    ordem[pos[existentes]] = n + np.flatnonzero(existentes)
+    ordem = np.concatenate([ordem, n + np.flatnonzero(~existentes)])
+    # o concat perde o dtype categórico; tipar_itens refaz as categorias
+    todos = ingestao.tipar_itens(pd.concat([itens, ultimas], ignore_index=True))
+    return todos.iloc[ordem].reset_index(drop=True)
+
+
+def aplicar_log(itens: pd.DataFrame, entradas: List[dict]) -> pd.DataFrame:
+    """
+    Catálogo itens com as entradas do log aplicadas: a última versão de cada
+    item_id substitui a linha dele no lugar; ids novos vão para o fim, na
+    ordem em que apareceram.
+    """
+    if not entradas:
+        return itens
+    ultimas = _ultimas_versoes(entradas, itens.columns)
+    pos = pd.Index(itens["item_id"]).get_indexer(ultimas["item_id"])
+    return _substituir(itens, ultimas, pos)
+
+
+def aplicar_log_em_blocos(
+    blocos: Iterable[pd.DataFrame], entradas: List[dict]
+) -> Iterator[pd.DataFrame]:
+    """
+    O mesmo que aplicar_log, bloco a bloco: cada bloco sai com as versões do
+    log no lugar, e os ids novos saem num último bloco. Só o log (e um bloco
+    por vez) fica em memória.
+    """
+    if not entradas:
+        yield from blocos
+        return
+    ultimas = None
+    vistos = np.empty(0, dtype=np.int64)
+    for bloco in blocos:
+        if ultimas is None:
+            ultimas = _ultimas_versoes(entradas, bloco.columns)
+            ids_log = pd.Index(ultimas["item_id"])
+            vistos = np.zeros(len(ultimas), dtype=bool)
+        # índice em ultimas de cada linha do bloco (-1 = fora do log)
+        no_log = ids_log.get_indexer(bloco["item_id"])
+        alteradas = np.flatnonzero(no_log >= 0)
+        if not len(alteradas):
+            yield bloco
+            continue
+        vistos[no_log[alteradas]] = True
+        yield _substituir(bloco, ultimas.iloc[no_log[alteradas]], alteradas)
+    if ultimas is None:
+        ultimas = _ultimas_versoes(entradas, list(entradas[0]))
+        vistos = np.zeros(len(ultimas), dtype=bool)
+    novos = ultimas[~vistos].reset_index(drop=True)
+    if len(novos):
+        yield ingestao.tipar_itens(novos)
+
+
+def hash_catalogo(csv_path: Path, bytes_log: int) -> str:
+    """
+    sha256 do itens.csv seguido dos primeiros bytes_log bytes do itens.log:
+    identifica o catálogo do fit. Sem log é o hash do próprio itens.csv.
+    """
+    h = hashlib.sha256()
+    with open(csv_path, "rb") as f:
+        for bloco in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloco)
+    if bytes_log:
+        with open(log_path(), "rb") as f:
+            restante = bytes_log
+            while restante:
+                bloco = f.read(min(restante, 1 << 20))
+                if not bloco:
+                    break
+                h.update(bloco)
+                restante -= len(bloco)
+    return h.hexdigest()
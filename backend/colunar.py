@@ -0,0 +1,380 @@
+# backend/colunar.py
+"""
+Snapshot binário colunar dos CSVs (itens.csv, avaliacoes.csv, usuarios.csv).
+
+Ao lado de <nome>.csv fica a pasta <nome>.colunas/ com uma coluna por
+arquivo .npy, aberta via memory-map:
+
+- colunas numéricas: o próprio array (int64/float64); abre em milissegundos,
+  qualquer que seja o tamanho
+- colunas categóricas: códigos int32 + categorias no meta.json
+- colunas de texto: todos os valores em UTF-8 separados por NUL num único
+  array uint8 (um decode + split, sem parser de CSV) e uma máscara de nulos
+
+O meta.json guarda (tamanho, mtime) do CSV de origem. O snapshot só é usado
+enquanto o CSV não muda; depois de uma escrita no CSV (compactação do log,
+setup_data etc.) a leitura volta a ser do CSV até o snapshot ser regerado.
+Para gerar os snapshots da pasta de dados:
+
+    python backend/data/setup_data.py --colunar
+
+O mesmo layout, com os offsets de cada valor de texto, guarda o catálogo do
+artefato do modelo (GravadorTabela / Tabela): gravado bloco a bloco durante
+o build e lido linha a linha, sem decodificar a tabela inteira.
+"""
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+VERSAO_FORMATO = 1
+
+_SEPARADOR = "\x00"
+
+
+def pasta(csv_path: Path) -> Path:
+    return Path(csv_path).with_suffix(".colunas")
+
+
+def _origem(csv_path: Path) -> list:
+    st = Path(csv_path).stat()
+    return [st.st_size, st.st_mtime_ns]
+
+
+def gravar(df: pd.DataFrame, csv_path: Path, origem: list) -> Path:
+    """Grava df como snapshot de csv_path (origem = _origem do CSV lido)."""
+    destino = pasta(csv_path)
+    tmp = destino.with_name(f".{destino.name}.tmp-{os.getpid()}")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    colunas = []
+    for i, nome in enumerate(df.columns):
+        serie = df[nome]
+        coluna = {"nome": nome}
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            coluna["tipo"] = "categoria"
+            coluna["categorias"] = [str(c) for c in serie.cat.categories]
+            np.save(tmp / f"c{i}.npy", serie.cat.codes.to_numpy(dtype=np.int32))
+        elif serie.dtype.kind in "iufb":
+            coluna["tipo"] = "numero"
+            np.save(tmp / f"c{i}.npy", serie.to_numpy())
+        else:
+            coluna["tipo"] = "texto"
+            nulos = serie.isna().to_numpy()
+            textos = serie.astype(object).where(~nulos, "").astype(str)
+            if textos.str.contains(_SEPARADOR, regex=False).any():
+                raise ValueError(f"coluna {nome!r} contém NUL; não cabe no snapshot")
+            dados = _SEPARADOR.join(textos.tolist()).encode("utf-8")
+            np.save(tmp / f"c{i}.npy", np.frombuffer(dados, dtype=np.uint8))
+            np.save(tmp / f"c{i}_nulos.npy", nulos)
+        colunas.append(coluna)
+
+    meta = {
+        "versao_formato": VERSAO_FORMATO,
+        "origem": origem,
+        "linhas": len(df),
+        "colunas": colunas,
+    }
+    (tmp / "meta.json").write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+    shutil.rmtree(destino, ignore_errors=True)
+    os.rename(tmp, destino)
+    return destino
+
+
+def converter(csv_path: Path, dtype: Optional[dict] = None) -> Path:
+    """Lê o CSV (com os dtypes que o backend usa) e grava o snapshot."""
+    origem = _origem(csv_path)
+    return gravar(pd.read_csv(csv_path, dtype=dtype), csv_path, origem)
+
+
+def _texto(p: Path, i: int, linhas: int) -> pd.Series:
+    dados = np.load(p / f"c{i}.npy", mmap_mode="r")
+    valores = dados.tobytes().decode("utf-8").split(_SEPARADOR) if linhas else []
+    if len(valores) != linhas:
+        raise ValueError("coluna de texto com número de linhas diferente do meta")
+    valores = np.array(valores, dtype=object)
+    nulos = np.load(p / f"c{i}_nulos.npy")
+    valores[nulos] = np.nan
+    return pd.Series(valores, dtype="str")
+
+
+def ler(csv_path: Path) -> Optional[pd.DataFrame]:
+    """
+    DataFrame do snapshot de csv_path, ou None se não há snapshot ou se ele
+    não corresponde mais ao CSV.
+    """
+    p = pasta(csv_path)
+    try:
+        meta = json.loads((p / "meta.json").read_text(encoding="utf-8"))
+        if meta.get("versao_formato") != VERSAO_FORMATO or meta["origem"] != _origem(csv_path):
+            return None
+        linhas = meta["linhas"]
+        dados = {}
+        for i, coluna in enumerate(meta["colunas"]):
+            if coluna["tipo"] == "numero":
+                # memory-map somente leitura, sem cópia
+                serie = pd.Series(np.load(p / f"c{i}.npy", mmap_mode="r"), copy=False)
+            elif coluna["tipo"] == "categoria":
+                codigos = np.load(p / f"c{i}.npy", mmap_mode="r")
+                serie = pd.Series(pd.Categorical.from_codes(codigos, coluna["categorias"]))
+            else:
+                serie = _texto(p, i, linhas)
+            if len(serie) != linhas:
+                return None
+            dados[coluna["nome"]] = serie
+    except (OSError, ValueError, KeyError):
+        return None
+    return pd.DataFrame(dados, copy=False)
+
+
+def ler_csv(csv_path: Path, **kwargs) -> pd.DataFrame:
+    """Lê do snapshot colunar se ele está em dia; senão, pd.read_csv."""
+    df = ler(csv_path)
+    if df is None:
+        df = pd.read_csv(csv_path, **kwargs)
+    return df
+
+
+def existe(csv_path: Path) -> bool:
+    return (pasta(csv_path) / "meta.json").exists()
+
+
+def converter_pasta(destino: Path, tabelas: Iterable[tuple]) -> None:
+    """Converte cada (arquivo, dtype) de tabelas que existir em destino."""
+    for nome, dtype in tabelas:
+        csv_path = Path(destino) / nome
+        if csv_path.exists():
+            converter(csv_path, dtype)
+
+
+def _mapear(path: Path):
+    """Bytes do arquivo via mmap (fatias viram bytes, sem objeto numpy)."""
+    with open(path, "rb") as f:
+        if not os.fstat(f.fileno()).st_size:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class GravadorTabela:
+    """
+    Grava uma tabela de `linhas` linhas em destino, um bloco (DataFrame) de
+    cada vez, sem juntar os blocos em memória: colunas numéricas e códigos
+    de categoria vão direto para .npy alocados no disco (memory-map) e os
+    textos são anexados a um arquivo de bytes, com o offset de cada valor.
+    O tipo de cada coluna vem do primeiro bloco; uma coluna numérica é
+    promovida (ex.: int64 -> float64 num bloco com vazios) como no concat.
+    """
+
+    def __init__(self, destino: Path, linhas: int):
+        self.destino = Path(destino)
+        self.destino.mkdir(parents=True)
+        self.linhas = linhas
+        self._colunas: List[dict] = []
+        self._arrays: Dict[int, np.ndarray] = {}
+        self._textos: Dict[int, object] = {}
+        self._nulos: Dict[int, np.ndarray] = {}
+        self._categorias: Dict[int, Dict[str, int]] = {}
+        self._linha = 0
+
+    def _abrir(self, nome: str, dtype) -> np.ndarray:
+        return np.lib.format.open_memmap(
+            self.destino / nome, mode="w+", dtype=dtype, shape=(self.linhas,)
+        )
+
+    def _iniciar(self, df: pd.DataFrame) -> None:
+        for i, nome in enumerate(df.columns):
+            serie = df[nome]
+            if isinstance(serie.dtype, pd.CategoricalDtype):
+                self._colunas.append({"nome": nome, "tipo": "categoria"})
+                self._categorias[i] = {}
+                self._arrays[i] = self._abrir(f"c{i}.npy", np.int32)
+            elif serie.dtype.kind in "iufb":
+                self._colunas.append({"nome": nome, "tipo": "numero"})
+                self._arrays[i] = self._abrir(f"c{i}.npy", serie.dtype)
+            else:
+                # object (ex.: youtube_url com None) volta como object
+                objeto = serie.dtype == object
+                self._colunas.append({"nome": nome, "tipo": "texto", "objeto": bool(objeto)})
+                self._textos[i] = open(self.destino / f"c{i}.bin", "wb")
+                offsets = np.lib.format.open_memmap(
+                    self.destino / f"c{i}_offsets.npy",
+                    mode="w+",
+                    dtype=np.int64,
+                    shape=(self.linhas + 1,),
+                )
+                offsets[0] = 0
+                self._arrays[i] = offsets
+                self._nulos[i] = self._abrir(f"c{i}_nulos.npy", bool)
+
+    def _numero(self, i: int, serie: pd.Series, ini: int, fim: int) -> None:
+        arr = self._arrays[i]
+        if serie.dtype.kind not in "iufb":
+            if not serie.isna().all():
+                raise ValueError(f"coluna {serie.name!r} mudou de tipo entre os blocos")
+            serie = serie.astype(np.float64)
+        dtype = np.result_type(arr.dtype, serie.dtype)
+        if dtype != arr.dtype:
+            promovido = self._abrir(f".c{i}.npy", dtype)
+            promovido[:ini] = arr[:ini]
+            os.replace(self.destino / f".c{i}.npy", self.destino / f"c{i}.npy")
+            self._arrays[i] = arr = promovido
+        arr[ini:fim] = serie.to_numpy(dtype=dtype)
+
+    def _categoria(self, i: int, serie: pd.Series, ini: int, fim: int) -> None:
+        # códigos provisórios na ordem em que as categorias aparecem; fechar()
+        # ordena as categorias (como union_categoricals(sort_categories=True))
+        codigos = self._categorias[i]
+        serie = serie.astype("category")
+        locais = np.array(
+            [codigos.setdefault(str(c), len(codigos)) for c in serie.cat.categories],
+            dtype=np.int32,
+        )
+        locais = np.append(locais, np.int32(-1))  # código -1 (vazio) continua -1
+        self._arrays[i][ini:fim] = locais[serie.cat.codes.to_numpy()]
+
+    def _texto(self, i: int, serie: pd.Series, ini: int, fim: int) -> None:
+        nulos = serie.isna().to_numpy()
+        textos = serie.astype(object).where(~nulos, "").astype(str).tolist()
+        offsets = self._arrays[i]
+        f = self._textos[i]
+        tamanhos = np.empty(len(textos), dtype=np.int64)
+        for j, texto in enumerate(textos):
+            if _SEPARADOR in texto:
+                raise ValueError(f"coluna {serie.name!r} contém NUL; não cabe na tabela")
+            dados = texto.encode("utf-8") + b"\x00"
+            f.write(dados)
+            tamanhos[j] = len(dados)
+        np.cumsum(tamanhos, out=offsets[ini + 1 : fim + 1])
+        offsets[ini + 1 : fim + 1] += offsets[ini]
+        self._nulos[i][ini:fim] = nulos
+
+    def anexar(self, df: pd.DataFrame) -> None:
+        if not self._colunas:
+            self._iniciar(df)
+        ini, fim = self._linha, self._linha + len(df)
+        if fim > self.linhas:
+            raise ValueError("mais linhas que o tamanho declarado da tabela")
+        for i, coluna in enumerate(self._colunas):
+            serie = df[coluna["nome"]]
+            if coluna["tipo"] == "numero":
+                self._numero(i, serie, ini, fim)
+            elif coluna["tipo"] == "categoria":
+                self._categoria(i, serie, ini, fim)
+            else:
+                self._texto(i, serie, ini, fim)
+        self._linha = fim
+
+    def fechar(self) -> None:
+        if self._linha != self.linhas:
+            raise ValueError("menos linhas que o tamanho declarado da tabela")
+        for i, coluna in enumerate(self._colunas):
+            if coluna["tipo"] == "categoria":
+                categorias = sorted(self._categorias[i])
+                provisorios = self._categorias[i]
+                novo = np.empty(len(categorias) + 1, dtype=np.int32)
+                for codigo, c in enumerate(categorias):
+                    novo[provisorios[c]] = codigo
+                novo[-1] = -1
+                codigos = self._arrays[i]
+                for ini in range(0, self.linhas, 1 << 20):
+                    codigos[ini : ini + (1 << 20)] = novo[codigos[ini : ini + (1 << 20)]]
+                coluna["categorias"] = categorias
+        for f in self._textos.values():
+            f.close()
+        for arr in (*self._arrays.values(), *self._nulos.values()):
+            arr.flush()
+        self._arrays.clear()
+        self._nulos.clear()
+        meta = {"versao_formato": VERSAO_FORMATO, "linhas": self.linhas, "colunas": self._colunas}
+        (self.destino / "meta.json").write_text(
+            json.dumps(meta, ensure_ascii=False), encoding="utf-8"
+        )
+
+
+class Tabela:
+    """
+    Tabela gravada por GravadorTabela, aberta via memory-map. Nada é
+    decodificado na abertura: linhas(pos) monta só as linhas pedidas (os
+    textos de cada uma saem da sua faixa de bytes), e as páginas ficam no
+    page cache, compartilhadas entre processos.
+    """
+
+    def __init__(self, p: Path):
+        p = Path(p)
+        meta = json.loads((p / "meta.json").read_text(encoding="utf-8"))
+        if meta.get("versao_formato") != VERSAO_FORMATO:
+            raise ValueError("tabela em outro formato")
+        self.n = meta["linhas"]
+        self._meta = meta["colunas"]
+        self.colunas = [c["nome"] for c in self._meta]
+        self._dados = {}
+        self._tipos = {}
+        for i, coluna in enumerate(self._meta):
+            nome = coluna["nome"]
+            # view como ndarray: indexar um np.memmap custa mais que a leitura
+            if coluna["tipo"] == "texto":
+                self._dados[nome] = (
+                    _mapear(p / f"c{i}.bin"),
+                    np.load(p / f"c{i}_offsets.npy", mmap_mode="r").view(np.ndarray),
+                    np.load(p / f"c{i}_nulos.npy", mmap_mode="r").view(np.ndarray),
+                )
+            else:
+                self._dados[nome] = np.load(p / f"c{i}.npy", mmap_mode="r").view(np.ndarray)
+            if coluna["tipo"] == "categoria":
+                self._tipos[nome] = pd.CategoricalDtype(coluna["categorias"])
+
+    def __len__(self) -> int:
+        return self.n
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes mapeados (no page cache, não na memória do processo)."""
+        total = 0
+        for dados in self._dados.values():
+            for arr in dados if isinstance(dados, tuple) else (dados,):
+                total += len(arr) if isinstance(arr, (bytes, mmap.mmap)) else int(arr.nbytes)
+        return total
+
+    def textos(self, nome: str, pos, vazio=None) -> list:
+        """Valores da coluna de texto nome nas linhas pos (vazio nos nulos)."""
+        blob, offsets, nulos = self._dados[nome]
+        pos = np.asarray(pos, dtype=np.int64)
+        if not len(pos):
+            return []
+        if pos[-1] - pos[0] == len(pos) - 1 and (len(pos) == 1 or (np.diff(pos) == 1).all()):
+            # faixa contígua: um decode só
+            ini, fim = int(offsets[pos[0]]), int(offsets[pos[-1] + 1])
+            valores = blob[ini : fim - 1].decode("utf-8").split(_SEPARADOR)
+        else:
+            ini, fim = offsets[pos], offsets[pos + 1] - 1
+            valores = [blob[a:b].decode("utf-8") for a, b in zip(ini.tolist(), fim.tolist())]
+        for j in np.flatnonzero(nulos[pos]).tolist():
+            valores[j] = vazio
+        return valores
+
+    def linhas(self, pos) -> pd.DataFrame:
+        """DataFrame com as linhas pos, na ordem pedida (índice 0..n-1)."""
+        pos = np.asarray(pos, dtype=np.int64)
+        dados = {}
+        for coluna in self._meta:
+            nome = coluna["nome"]
+            if coluna["tipo"] == "numero":
+                dados[nome] = self._dados[nome][pos]
+            elif coluna["tipo"] == "categoria":
+                dados[nome] = pd.Categorical.from_codes(
+                    self._dados[nome][pos], dtype=self._tipos[nome]
+                )
+            elif coluna["objeto"]:
+                # Series object explícita: o DataFrame inferiria str (None -> NaN)
+                dados[nome] = pd.Series(self.textos(nome, pos), dtype=object)
+            else:
+                dados[nome] = pd.array(self.textos(nome, pos, np.nan), dtype="str")
+        return pd.DataFrame(dados, copy=False)
@@ -9,3 +9,79 @@ IMAGE_DIR = DATA_DIR / "image"
 # Garante que as pastas existem
 for d in (DATA_DIR, IMAGE_DIR):
     d.mkdir(parents=True, exist_ok=True)
+
+# Backend de cálculo de similaridade: "sparse" (padrão), "ann" (aproximado),
+# "lsa" (embeddings SVD) ou "joblib" (legado)
+SCORING_BACKEND = os.getenv("MUSIQ_SCORING_BACKEND", "sparse")
+
+# Quantidade de eventos em usuarios.log que dispara a compactação em segundo plano
+USUARIOS_LOG_COMPACTAR_A_CADA = int(os.getenv("MUSIQ_USUARIOS_LOG_COMPACTAR_A_CADA", "1000"))
+
+# Artefatos do modelo TF-IDF (ver backend/model_store.py)
+MODEL_DIR = Path(os.getenv("MUSIQ_MODEL_DIR", DATA_DIR / "modelo"))
+
+# Intervalo mínimo (s) entre verificações de mudança em IMAGE_DIR
+CAPAS_RECHECAR_SEGUNDOS = float(os.getenv("MUSIQ_CAPAS_RECHECAR_SEGUNDOS", "5"))
+
+# Armazenamento de usuários/avaliações: "csv" (padrão) ou "sqlite"
+STORAGE_BACKEND = os.getenv("MUSIQ_STORAGE", "csv")
+SQLITE_PATH = Path(os.getenv("MUSIQ_SQLITE_PATH", DATA_DIR / "musiq.db"))
+
+# Índice aproximado (MUSIQ_SCORING_BACKEND=ann, ver backend/ann.py).
+# ANN_LISTAS=0 usa ~4*sqrt(n_itens) listas.
+ANN_LISTAS = int(os.getenv("MUSIQ_ANN_LISTAS", "0"))
+ANN_NPROBE = int(os.getenv("MUSIQ_ANN_NPROBE", "8"))
+ANN_DIM = int(os.getenv("MUSIQ_ANN_DIM", "64"))
+ANN_SEED = int(os.getenv("MUSIQ_ANN_SEED", "42"))
+
+# Cabeçalho Server-Timing com o tempo de cada etapa da requisição.
+# Sempre ligado com MUSIQ_SERVER_TIMING=1; senão só quando a requisição
+# envia o cabeçalho X-Musiq-Debug: 1.
+SERVER_TIMING = os.getenv("MUSIQ_SERVER_TIMING", "0").lower() in ("1", "true", "sim")
+
+# Executores da API (ver backend/app.py): leituras/pontuação e escritas
+# ficam em pools separados. LIMITE_CONCORRENCIA limita as requisições
+# pesadas simultâneas (0 = metade das threads de leitura), deixando threads
+# livres para rotas baratas como /usuarios.
+EXECUTOR_LEITURA_THREADS = int(
+    os.getenv("MUSIQ_EXECUTOR_LEITURA_THREADS", str(min(32, (os.cpu_count() or 1) + 4)))
+)
+EXECUTOR_ESCRITA_THREADS = int(os.getenv("MUSIQ_EXECUTOR_ESCRITA_THREADS", "2"))
+LIMITE_CONCORRENCIA = int(os.getenv("MUSIQ_LIMITE_CONCORRENCIA", "0")) or max(
+    1, EXECUTOR_LEITURA_THREADS // 2
+)
+
+# Catálogo incremental (POST/PATCH /itens): acima destes limiares o
+# /itens/drift recomenda refazer o fit completo. OOV = fração de tokens dos
+# itens ingeridos fora do vocabulário; fração = itens alterados / catálogo.
+DRIFT_OOV_LIMIAR = float(os.getenv("MUSIQ_DRIFT_OOV_LIMIAR", "0.15"))
+DRIFT_FRACAO_LIMIAR = float(os.getenv("MUSIQ_DRIFT_FRACAO_LIMIAR", "0.10"))
+
+# Limite (MB) do cache LRU de resultados de recomendação (0 desliga),
+# ver backend/cache_resultados.py
+RESULTADOS_CACHE_MB = float(os.getenv("MUSIQ_RESULTADOS_CACHE_MB", "64"))
+
+# Modo compacto: matriz de itens em float32 (índices int32) e perfis
+# guardados como linhas esparsas. PERFIL_MAX_TERMOS > 0 trunca o perfil
+# aos termos de maior peso antes de pontuar (0 = perfil completo).
+MODO_COMPACTO = os.getenv("MUSIQ_MODO_COMPACTO", "0").lower() in ("1", "true", "sim")
+PERFIL_MAX_TERMOS = int(os.getenv("MUSIQ_PERFIL_MAX_TERMOS", "0"))
+
+# Backend "lsa" (ver backend/lsa.py): dimensão dos embeddings da SVD truncada
+LSA_DIM = int(os.getenv("MUSIQ_LSA_DIM", "128"))
+LSA_SEED = int(os.getenv("MUSIQ_LSA_SEED", "42"))
+
+# Ingestão do catálogo (ver backend/ingestao.py): itens.csv é lido e
+# vetorizado em blocos de INGESTAO_BLOCO_LINHAS linhas; o fit do TF-IDF
+# distribui os blocos em INGESTAO_JOBS processos (0 = um por CPU).
+INGESTAO_BLOCO_LINHAS = int(os.getenv("MUSIQ_INGESTAO_BLOCO_LINHAS", "50000"))
+INGESTAO_JOBS = int(os.getenv("MUSIQ_INGESTAO_JOBS", "0")) or (os.cpu_count() or 1)
+
+# Recomendações pré-calculadas (python -m backend.precompute): top-N de cada
+# usuário, gravado em PRECOMPUTE_DIR e servido pelo /recomendar enquanto os
+# likes do usuário e o catálogo não mudam. PRECOMPUTE_JOBS = processos do
+# job (0 = um por CPU); PRECOMPUTE_BLOCO = usuários por tarefa.
+PRECOMPUTE_DIR = Path(os.getenv("MUSIQ_PRECOMPUTE_DIR", DATA_DIR / "precomputado"))
+PRECOMPUTE_TOP_N = int(os.getenv("MUSIQ_PRECOMPUTE_TOP_N", "100"))
+PRECOMPUTE_JOBS = int(os.getenv("MUSIQ_PRECOMPUTE_JOBS", "0")) or (os.cpu_count() or 1)
+PRECOMPUTE_BLOCO = int(os.getenv("MUSIQ_PRECOMPUTE_BLOCO", "512"))
@@ -1,6 +1,9 @@
 # backend/data/setup_data.py
 from pathlib import Path
+import argparse
 import random
+import shutil
+import sys
 
 import numpy as np
 import pandas as pd
@@ -500,27 +503,25 @@ def create_avaliacoes():
         10: ["Jazz", "MPB", "Clássica"],
     }
 
-    rows = []
-    for u in user_ids:
-        prefs = user_prefs.get(u, [])
-        for _, item in itens.iterrows():
-            item_id = int(item["item_id"])
-            genero = str(item["genero"])
-            # TODO: todo usuário avalia todas as músicas
-            if genero in prefs:
-                p_like = 0.85
-            else:
-                p_like = 0.35
-            gostou = 1 if random.random() < p_like else 0
-            rows.append(
-                {
-                    "usuario_id": u,
-                    "item_id": item_id,
-                    "gostou": gostou,
-                }
-            )
+    # todo usuário avalia todas as músicas: grade usuários x itens
+    usuarios = np.repeat(user_ids, len(itens))
+    item_ids = np.tile(itens["item_id"].astype(int).to_numpy(), len(user_ids))
+    generos = np.tile(itens["genero"].astype(str).to_numpy(), len(user_ids))
+
+    prefere = np.array(
+        [g in user_prefs.get(u, []) for u, g in zip(usuarios, generos)], dtype=bool
+    )
+    p_like = np.where(prefere, 0.85, 0.35)
+    # mesma sequência de random.random() de antes (usuário a usuário, item a item)
+    sorteios = np.array([random.random() for _ in range(len(usuarios))])
 
-    df = pd.DataFrame(rows)
+    df = pd.DataFrame(
+        {
+            "usuario_id": usuarios,
+            "item_id": item_ids,
+            "gostou": (sorteios < p_like).astype(int),
+        }
+    )
     df.to_csv(BASE_DIR / "avaliacoes.csv", index=False)
     print("avaliacoes.csv (gabarito) criado com 10 usuários avaliando todas as músicas.")
 
@@ -539,12 +540,322 @@ def create_usuarios():
     print("usuarios.csv criado vazio; usuários serão cadastrados pelo sistema.")
 
 
+# ============================================================
+# 4) Dados sintéticos em escala (benchmarks / testes de carga)
+# ============================================================
+
+# gênero -> (tags, instrumentação, humores típicos)
+GENEROS_SINTETICOS = {
+    "Pop": (["pop", "radio", "hit", "dançante", "balada", "romântico"],
+            ["Voz", "Sintetizador", "Piano", "Violão"], ["Animado", "Romântico"]),
+    "Rock": (["rock", "guitarra", "anos 90", "clássico", "alternativo", "grunge"],
+             ["Guitarra", "Bateria", "Baixo", "Voz"], ["Animado", "Dramático"]),
+    "Jazz": (["jazz", "improviso", "modal", "clássico", "instrumental", "swing"],
+             ["Saxofone", "Piano", "Trompete", "Baixo"], ["Chill", "Triste"]),
+    "MPB": (["mpb", "samba", "bossa nova", "brasil", "clássico", "violão"],
+            ["Violão", "Voz", "Percussão", "Piano"], ["Relaxado", "Nostálgico"]),
+    "Clássica": (["clássica", "orquestra", "piano", "erudito", "estudo", "romântico"],
+                 ["Piano", "Orquestra", "Violino", "Cello"], ["Relaxado", "Dramático"]),
+    "Hip Hop": (["hip hop", "rap", "trap", "beat", "rima", "moderno"],
+                ["Beat", "Voz", "Sample", "Baixo"], ["Focado", "Animado"]),
+    "Eletrônica": (["eletrônica", "house", "techno", "festa", "progressivo", "dançante"],
+                   ["Sintetizador", "Beat", "Sample", "Texturas"], ["Animado", "Focado"]),
+    "Indie": (["indie", "alternativo", "chill", "lo-fi", "garagem", "pop alternativo"],
+              ["Guitarra", "Synth", "Voz", "Bateria"], ["Chill", "Triste"]),
+    "Lo-fi": (["lo-fi", "estudo", "relax", "chill", "vlog", "noturno"],
+              ["Beat", "Piano", "Synth", "Sample"], ["Chill", "Relaxado"]),
+    "Synthwave": (["synthwave", "retrô", "anos 80", "neon", "dark", "filme"],
+                  ["Synth", "Bateria eletrônica", "Baixo", "Voz"], ["Sombrio", "Nostálgico"]),
+    "Reggae": (["reggae", "roots", "praia", "jamaica", "dub", "positivo"],
+               ["Guitarra", "Baixo", "Bateria", "Órgão"], ["Relaxado", "Animado"]),
+    "Metal": (["metal", "pesado", "riff", "thrash", "anos 80", "distorção"],
+              ["Guitarra", "Bateria", "Baixo", "Voz"], ["Sombrio", "Dramático"]),
+}
+TEMPOS = np.array(["Lento", "Médio", "Rápido"])
+IDIOMAS = np.array(["Inglês", "Português", "Espanhol", "Instrumental"])
+ADJETIVOS = np.array(["intensa", "suave", "melancólica", "energética", "contemplativa",
+                      "marcante", "experimental", "envolvente", "minimalista", "épica"])
+PALAVRAS_NOME = np.array(["Noite", "Sol", "Mar", "Cidade", "Sonho", "Estrada", "Chuva",
+                          "Fogo", "Lua", "Vento", "Tempo", "Luz", "Rio", "Céu", "Eco"])
+
+
+def _gravar_em_blocos(path: Path, blocos) -> int:
+    """Grava DataFrames em sequência no mesmo CSV (cabeçalho só no primeiro)."""
+    total = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for i, df in enumerate(blocos):
+            df.to_csv(f, header=(i == 0), index=False)
+            total += len(df)
+    return total
+
+
+def _bloco_itens(ids: np.ndarray, n_artistas: int, rng: np.random.Generator) -> pd.DataFrame:
+    nomes_generos = list(GENEROS_SINTETICOS)
+    n = len(ids)
+    # popularidade desigual de gêneros
+    pesos = 1.0 / np.arange(1, len(nomes_generos) + 1) ** 0.6
+    g = rng.choice(len(nomes_generos), size=n, p=pesos / pesos.sum())
+
+    tags_pool = np.array([v[0] for v in GENEROS_SINTETICOS.values()], dtype=object)
+    inst_pool = np.array([v[1] for v in GENEROS_SINTETICOS.values()], dtype=object)
+    humor_pool = np.array([v[2] for v in GENEROS_SINTETICOS.values()], dtype=object)
+
+    def escolher(pool, k):
+        # k valores distintos por linha (sem reposição)
+        cols = np.argsort(rng.random((n, pool.shape[1])), axis=1)[:, :k]
+        return [pd.Series(pool[g, cols[:, j]]) for j in range(k)]
+
+    tags = escolher(tags_pool, 3)
+    inst = escolher(inst_pool, 2)
+    humor = escolher(humor_pool, 1)[0]
+    genero = pd.Series(np.array(nomes_generos, dtype=object)[g])
+    instrumentacao = inst[0].str.cat(inst[1], sep=", ")
+
+    # artistas com cauda longa (poucos artistas com muitas faixas)
+    artista = rng.zipf(1.3, size=n) % n_artistas + 1
+    palavra = pd.Series(PALAVRAS_NOME[rng.integers(0, len(PALAVRAS_NOME), n)])
+    adjetivo = pd.Series(ADJETIVOS[rng.integers(0, len(ADJETIVOS), n)])
+
+    return pd.DataFrame(
+        {
+            "item_id": ids,
+            "nome": palavra.str.cat(pd.Series(ids.astype(str)), sep=" "),
+            "artista": "Artista " + pd.Series(artista.astype(str)),
+            "genero": genero,
+            "tempo": TEMPOS[rng.integers(0, len(TEMPOS), n)],
+            "instrumentacao": instrumentacao,
+            "palavra_chave": genero.str.lower(),
+            "humor": humor,
+            "duracao_segundos": rng.normal(230, 60, n).clip(60, 900).astype(int),
+            "idioma": IDIOMAS[rng.integers(0, len(IDIOMAS), n)],
+            "tags": tags[0].str.cat([tags[1], tags[2]], sep=", "),
+            "descricao": "Faixa " + adjetivo + " de " + genero.str.lower()
+            + " com " + inst[0].str.lower() + " e clima " + humor.str.lower() + ".",
+            "youtube_url": "",
+        }
+    )
+
+
+def _generos_dos_itens(destino: Path) -> np.ndarray:
+    """Código do gênero de cada item (índice = item_id - 1)."""
+    generos = pd.read_csv(destino / "itens.csv", usecols=["genero"])["genero"]
+    codigos = {g: i for i, g in enumerate(GENEROS_SINTETICOS)}
+    return generos.map(codigos).to_numpy()
+
+
+def _amostrar_sem_reposicao(
+    n_usuarios: int, k: int, p_item: np.ndarray, rng: np.random.Generator
+) -> np.ndarray:
+    """
+    k índices de item distintos por usuário (matriz n_usuarios x k),
+    sorteados sem reposição com probabilidade proporcional a p_item.
+    - catálogo pequeno perto de k: Gumbel top-k (log(p_item) + ruído de
+      Gumbel, os k maiores com argpartition), O(n_itens) por usuário
+    - caso geral: sorteios com reposição descartando as repetições, que dão
+      a mesma distribuição (cada item novo sai com probabilidade proporcional
+      a p_item entre os ainda não sorteados) a O(k) por usuário; só quem
+      ficou com menos de k itens sorteia de novo, com cada vez mais sorteios
+    """
+    n_itens = len(p_item)
+    if 2 * k >= n_itens:
+        chaves = np.log(p_item) + rng.gumbel(size=(n_usuarios, n_itens))
+        return np.argpartition(-chaves, k - 1, axis=1)[:, :k]
+
+    linhas = np.empty(0, dtype=np.int64)
+    itens = np.empty(0, dtype=np.int64)
+    faltam = np.full(n_usuarios, k)
+    fator = 1
+    while faltam.any():
+        quem = np.flatnonzero(faltam)
+        sorteios = faltam[quem] * fator + 1
+        linhas = np.concatenate([linhas, np.repeat(quem, sorteios)])
+        itens = np.concatenate([itens, rng.choice(n_itens, size=int(sorteios.sum()), p=p_item)])
+        # primeira ocorrência de cada (usuário, item), na ordem dos sorteios
+        _, primeiras = np.unique(linhas * n_itens + itens, return_index=True)
+        primeiras.sort()
+        linhas, itens = linhas[primeiras], itens[primeiras]
+        # os k primeiros de cada usuário (ordem estável por usuário)
+        ordem = np.argsort(linhas, kind="stable")
+        linhas, itens = linhas[ordem], itens[ordem]
+        inicio = np.searchsorted(linhas, np.arange(n_usuarios))
+        manter = np.arange(len(linhas)) - inicio[linhas] < k
+        linhas, itens = linhas[manter], itens[manter]
+        faltam = k - np.bincount(linhas, minlength=n_usuarios)
+        fator *= 2
+    return itens.reshape(n_usuarios, k)
+
+
+def _bloco_avaliacoes(
+    usuarios: np.ndarray,
+    ratings_per_user: int,
+    genero_item: np.ndarray,
+    p_item: np.ndarray,
+    rng: np.random.Generator,
+) -> pd.DataFrame:
+    n_generos = len(GENEROS_SINTETICOS)
+    n_itens = len(genero_item)
+    # cada usuário prefere exatamente 1 a 3 gêneros, sorteados sem reposição
+    n_prefs = rng.integers(1, 4, len(usuarios))
+    posto = rng.random((len(usuarios), n_generos)).argsort(axis=1).argsort(axis=1)
+    prefs = posto < n_prefs[:, None]
+
+    # exatamente k itens distintos por usuário
+    k = min(ratings_per_user, n_itens)
+    idx_itens = _amostrar_sem_reposicao(len(usuarios), k, p_item, rng)
+    linha_usuario = np.repeat(np.arange(len(usuarios)), k)
+    idx_itens = idx_itens.ravel()
+
+    prefere = prefs[linha_usuario, genero_item[idx_itens]]
+    gostou = rng.random(len(idx_itens)) < np.where(prefere, 0.85, 0.35)
+
+    return pd.DataFrame(
+        {
+            "usuario_id": usuarios[linha_usuario],
+            "item_id": idx_itens + 1,
+            "gostou": gostou.astype(int),
+        }
+    )
+
+
+def create_dados_sinteticos(
+    n_itens: int,
+    n_usuarios: int,
+    ratings_per_user: int,
+    seed: int = 42,
+    destino: Path = BASE_DIR,
+    n_gabarito: int = 100,
+    bloco: int = 100_000,
+) -> None:
+    """
+    Gera itens.csv, avaliacoes.csv (gabarito) e usuarios.csv sintéticos em
+    escala, com amostragem vetorizada (NumPy) e escrita em blocos.
+    - itens: gêneros com popularidade desigual; tags, instrumentação e humor
+      coerentes com o gênero; artistas com cauda longa
+    - avaliações: itens escolhidos por popularidade (Zipf) e like mais
+      provável nos gêneros preferidos de cada usuário
+    """
+    rng = np.random.default_rng(seed)
+    destino = Path(destino)
+    (destino / "image").mkdir(parents=True, exist_ok=True)
+    placeholder = BASE_DIR / "image" / "placeholder.jpg"
+    if placeholder.exists() and destino != BASE_DIR:
+        shutil.copy(placeholder, destino / "image" / "placeholder.jpg")
+
+    n_artistas = max(1, n_itens // 10)
+    total = _gravar_em_blocos(
+        destino / "itens.csv",
+        (
+            _bloco_itens(np.arange(ini, min(ini + bloco, n_itens)) + 1, n_artistas, rng)
+            for ini in range(0, n_itens, bloco)
+        ),
+    )
+    print(f"itens.csv criado com {total} músicas sintéticas.")
+
+    genero_item = _generos_dos_itens(destino)
+    # popularidade dos itens (Zipf) em ordem aleatória de item_id
+    pop = 1.0 / np.arange(1, n_itens + 1) ** 0.8
+    p_item = rng.permutation(pop / pop.sum())
+    usuarios_por_bloco = max(1, bloco // max(1, ratings_per_user))
+
+    def blocos(n: int):
+        for ini in range(0, n, usuarios_por_bloco):
+            usuarios = np.arange(ini, min(ini + usuarios_por_bloco, n)) + 1
+            yield usuarios, _bloco_avaliacoes(
+                usuarios, ratings_per_user, genero_item, p_item, rng
+            )
+
+    total = _gravar_em_blocos(
+        destino / "avaliacoes.csv", (df for _, df in blocos(n_gabarito))
+    )
+    print(f"avaliacoes.csv (gabarito) criado com {total} avaliações de {n_gabarito} usuários.")
+
+    origens = np.array(["inicio", "recomendador"])
+
+    def blocos_usuarios():
+        for usuarios, df in blocos(n_usuarios):
+            cadastro = pd.DataFrame(
+                {
+                    "usuario_id": usuarios,
+                    "nome": "Usuario " + pd.Series(usuarios.astype(str)),
+                    "item_id": None,
+                    "gostou": 0,
+                    "origem": "outro",
+                }
+            )
+            nomes = "Usuario " + df["usuario_id"].astype(str)
+            df = df.assign(
+                nome=nomes.to_numpy(),
+                origem=origens[rng.integers(0, 2, len(df))],
+            )[["usuario_id", "nome", "item_id", "gostou", "origem"]]
+            yield pd.concat([cadastro, df], ignore_index=True).sort_values(
+                "usuario_id", kind="stable"
+            )
+
+    total = _gravar_em_blocos(destino / "usuarios.csv", blocos_usuarios())
+    print(f"usuarios.csv criado com {total} linhas de {n_usuarios} usuários.")
+
+
+# ============================================================
+# Snapshots colunares (.npy) dos CSVs, ver backend/colunar.py
+# ============================================================
+
+def create_colunar(destino: Path = BASE_DIR):
+    """
+    Converte itens.csv, avaliacoes.csv e usuarios.csv de destino para o
+    formato colunar binário, que o backend prefere ao CSV quando está em dia.
+    """
+    sys.path.insert(0, str(BASE_DIR.parents[1]))  # raiz do projeto
+    from backend import colunar
+    from backend.ingestao import DTYPES_ITENS
+
+    tabelas = [("itens.csv", DTYPES_ITENS), ("avaliacoes.csv", None), ("usuarios.csv", None)]
+    colunar.converter_pasta(destino, tabelas)
+    print("Snapshots colunares criados em", destino)
+
+
 # ============================================================
 # Execução principal
 # ============================================================
 
 if __name__ == "__main__":
-    create_itens()
-    create_avaliacoes()
-    create_usuarios()
-    print("itens.csv, avaliacoes.csv e usuarios.csv criados em", BASE_DIR)
+    parser = argparse.ArgumentParser(
+        description=(
+            "Gera os CSVs do Musiq+. Sem argumentos, cria o catálogo fixo de "
+            "30 músicas; com --items, gera dados sintéticos em escala."
+        )
+    )
+    parser.add_argument("--items", type=int, help="quantidade de músicas sintéticas")
+    parser.add_argument("--users", type=int, default=1000, help="usuários em usuarios.csv")
+    parser.add_argument("--ratings-per-user", type=int, default=20)
+    parser.add_argument("--gabarito-users", type=int, default=100, help="usuários do gabarito")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", type=Path, default=BASE_DIR, help="pasta de saída")
+    parser.add_argument(
+        "--colunar",
+        action="store_true",
+        help=(
+            "grava snapshots colunares (.npy) dos CSVs de --out; sem --items, "
+            "só converte os CSVs existentes"
+        ),
+    )
+    args = parser.parse_args()
+
+    if args.colunar and args.items is None:
+        create_colunar(args.out)
+    elif args.items is None:
+        create_itens()
+        create_avaliacoes()
+        create_usuarios()
+        print("itens.csv, avaliacoes.csv e usuarios.csv criados em", BASE_DIR)
+    else:
+        create_dados_sinteticos(
+            n_itens=args.items,
+            n_usuarios=args.users,
+            ratings_per_user=args.ratings_per_user,
+            seed=args.seed,
+            destino=args.out,
+            n_gabarito=args.gabarito_users,
+        )
+        print("Dados sintéticos criados em", args.out)
+        if args.colunar:
+            create_colunar(args.out)
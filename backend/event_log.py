@@ -0,0 +1,299 @@
+# backend/event_log.py
+"""
+Armazenamento append-only das avaliações dos usuários.
+
+usuarios.csv passa a ser um snapshot compactado. Cada escrita nova (avaliação
+ou cadastro de usuário) é apenas UMA linha anexada em usuarios.log, sem
+cabeçalho. Na leitura, snapshot + log são concatenados e resolvidos com
+"última escrita vence" para cada par (usuario_id, item_id).
+
+Quando o log passa de USUARIOS_LOG_COMPACTAR_A_CADA linhas, uma thread em
+segundo plano reescreve o snapshot e zera o log. Cada anexação e a troca do
+log pela compactação seguram o mesmo lock de arquivo (usuarios.log.lock):
+sem ele, um processo que abriu o log antes da troca escreveria no arquivo
+que a compactação já leu, e o evento se perderia.
+"""
+from __future__ import annotations
+
+import atexit
+import csv
+import io
+import os
+import threading
+from typing import Optional, Tuple
+
+import pandas as pd
+
+from . import colunar, lock_arquivo
+from .config import DATA_DIR, USUARIOS_LOG_COMPACTAR_A_CADA
+
+COLUNAS = ["usuario_id", "nome", "item_id", "gostou", "origem"]
+
+# lock de compactação entre processos (arquivo criado com O_EXCL)
+_LOCK_EXPIRA_SEGUNDOS = 600
+# lock de cadastro: só cobre ler o maior id + anexar uma linha
+_LOCK_CADASTRO_EXPIRA_SEGUNDOS = 60
+# lock do log: só cobre um write (ou o rename da compactação)
+_LOCK_LOG_EXPIRA_SEGUNDOS = 10
+_LOCK_LOG_INTERVALO = 0.001
+
+_lock = threading.RLock()
+_cadastro_lock = threading.Lock()
+_linhas_no_log: Optional[int] = None
+_compactacao_agendada = False
+_thread_compactacao: Optional[threading.Thread] = None
+
+
+def snapshot_path():
+    return DATA_DIR / "usuarios.csv"
+
+
+def log_path():
+    return DATA_DIR / "usuarios.log"
+
+
+def _compactando_path():
+    return DATA_DIR / "usuarios.log.compactando"
+
+
+def _lock_path():
+    return DATA_DIR / "usuarios.compactacao.lock"
+
+
+def _cadastro_lock_path():
+    return DATA_DIR / "usuarios.cadastro.lock"
+
+
+def _log_lock_path():
+    return DATA_DIR / "usuarios.log.lock"
+
+
+def _segurando_log():
+    """Lock entre processos de quem escreve em (ou troca) o usuarios.log."""
+    return lock_arquivo.segurando(
+        _log_lock_path(), _LOCK_LOG_EXPIRA_SEGUNDOS, _LOCK_LOG_INTERVALO
+    )
+
+
+def _ler_log(path) -> Optional[pd.DataFrame]:
+    if not path.exists() or path.stat().st_size == 0:
+        return None
+    return pd.read_csv(path, header=None, names=COLUNAS)
+
+
+def _stat_snapshot():
+    try:
+        st = snapshot_path().stat()
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def assinatura() -> tuple:
+    """
+    (inode, mtime, tamanho) do snapshot e dos logs. Muda sempre que alguma
+    escrita (deste ou de outro processo) altera os dados.
+    """
+    partes = []
+    for path in (snapshot_path(), _compactando_path(), log_path()):
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            partes.append(None)
+            continue
+        partes.append((st.st_ino, st.st_mtime_ns, st.st_size))
+    return tuple(partes)
+
+
+def resolver(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aplica "última escrita vence" por (usuario_id, item_id).
+    Linhas sem item_id (cadastro de usuário) nunca são descartadas.
+    Eventos gravados sem nome herdam o nome do próprio usuário.
+    """
+    if df.empty:
+        return df.reset_index(drop=True)
+    repetida = df.duplicated(subset=["usuario_id", "item_id"], keep="last")
+    df = df[~(repetida & df["item_id"].notna())].reset_index(drop=True)
+    nomes = df.groupby("usuario_id")["nome"].transform("first")
+    df["nome"] = df["nome"].fillna(nomes)
+    return df
+
+
+def ler_usuarios() -> pd.DataFrame:
+    """Snapshot + eventos pendentes, já resolvidos."""
+    while True:
+        antes = _stat_snapshot()
+        partes = []
+        if antes is not None:
+            partes.append(colunar.ler_csv(snapshot_path()))
+        for path in (_compactando_path(), log_path()):
+            parte = _ler_log(path)
+            if parte is not None:
+                partes.append(parte)
+        # houve compactação no meio da leitura: lê de novo
+        if _stat_snapshot() == antes:
+            break
+
+    partes = [p for p in partes if not p.empty]
+    if not partes:
+        return pd.DataFrame(columns=COLUNAS)
+    df = partes[0] if len(partes) == 1 else pd.concat(partes, ignore_index=True)
+    return resolver(df)
+
+
+def _contar_linhas_log() -> int:
+    path = log_path()
+    if not path.exists():
+        return 0
+    with open(path, "rb") as f:
+        return sum(1 for _ in f)
+
+
+def append_evento(
+    usuario_id: int,
+    item_id: Optional[int],
+    gostou: int,
+    origem: str,
+    nome: str = "",
+) -> Tuple[tuple, tuple]:
+    """
+    Anexa um único evento ao log: custo O(1) por escrita. Retorna a
+    assinatura() de logo antes e de logo depois da escrita, lidas com o lock
+    do log: se a de antes não é a última que o chamador viu, outro processo
+    escreveu nesse meio tempo.
+    """
+    global _linhas_no_log, _compactacao_agendada, _thread_compactacao
+
+    buf = io.StringIO()
+    csv.writer(buf, lineterminator="\n").writerow(
+        [
+            int(usuario_id),
+            nome,
+            "" if item_id is None else int(item_id),
+            int(gostou),
+            origem,
+        ]
+    )
+    linha = buf.getvalue()
+
+    with _lock:
+        # uma única chamada de write em modo append; o lock garante que o
+        # arquivo aberto ainda é o usuarios.log (e não o que a compactação
+        # acabou de renomear e ler)
+        with _segurando_log():
+            antes = assinatura()
+            with open(log_path(), "a", encoding="utf-8", newline="") as f:
+                f.write(linha)
+            depois = assinatura()
+
+        if _linhas_no_log is None:
+            _linhas_no_log = _contar_linhas_log()
+        else:
+            _linhas_no_log += 1
+
+        if _linhas_no_log >= USUARIOS_LOG_COMPACTAR_A_CADA and not _compactacao_agendada:
+            _compactacao_agendada = True
+            _thread_compactacao = threading.Thread(
+                target=_compactar_em_segundo_plano, daemon=True
+            )
+            _thread_compactacao.start()
+    return antes, depois
+
+
+def append_cadastro(nome: str) -> Tuple[int, tuple, tuple]:
+    """
+    Cadastra um usuário com o próximo usuario_id livre e retorna o id, com as
+    assinaturas de antes e depois da escrita (ver append_evento).
+    Ler o maior id e anexar a linha de cadastro acontecem na mesma seção
+    crítica (entre threads e entre processos), então dois cadastros
+    simultâneos nunca recebem o mesmo id. As avaliações não esperam por ela.
+    """
+    with _cadastro_lock, lock_arquivo.segurando(
+        _cadastro_lock_path(), _LOCK_CADASTRO_EXPIRA_SEGUNDOS
+    ):
+        df = ler_usuarios()
+        novo_id = 1 if df.empty else int(df["usuario_id"].max()) + 1
+        antes, depois = append_evento(
+            usuario_id=novo_id, item_id=None, gostou=0, origem="outro", nome=nome
+        )
+    return novo_id, antes, depois
+
+
+def _compactar_em_segundo_plano() -> None:
+    global _compactacao_agendada
+    try:
+        compactar()
+    finally:
+        _compactacao_agendada = False
+
+
+@atexit.register
+def _esperar_compactacao() -> None:
+    # a thread é daemon: sem isso, sair no meio da compactação deixaria o
+    # lock e o usuarios.log.compactando para trás
+    thread = _thread_compactacao
+    if thread is not None and thread.is_alive():
+        thread.join()
+
+
+def _escrever_snapshot(df: pd.DataFrame) -> None:
+    tmp = snapshot_path().with_suffix(".csv.tmp")
+    df.to_csv(tmp, index=False)
+    os.replace(tmp, snapshot_path())
+    if colunar.existe(snapshot_path()):
+        # mantém o snapshot colunar em dia com o novo usuarios.csv
+        colunar.converter(snapshot_path())
+
+
+def compactar() -> bool:
+    """
+    Reescreve usuarios.csv com o estado resolvido e descarta os eventos já
+    incorporados. Retorna False se outro processo já está compactando.
+
+    Só a troca do log (usuarios.log -> usuarios.log.compactando) acontece
+    com _lock e o lock do log (o mesmo de append_evento, em qualquer
+    processo); a leitura, o merge e a gravação do snapshot não bloqueiam
+    append_evento, que continua escrevendo no log novo.
+    """
+    global _linhas_no_log
+
+    if not lock_arquivo.adquirir(_lock_path(), _LOCK_EXPIRA_SEGUNDOS):
+        return False
+    try:
+        log, compactando = log_path(), _compactando_path()
+        with _lock, _segurando_log():
+            # novos eventos passam a ir para um log novo (um .compactando
+            # que sobrou de uma compactação interrompida é aproveitado)
+            if log.exists() and not compactando.exists():
+                os.rename(log, compactando)
+                _linhas_no_log = 0
+
+        partes = []
+        if snapshot_path().exists():
+            partes.append(colunar.ler_csv(snapshot_path()))
+        parte = _ler_log(compactando)
+        if parte is not None:
+            partes.append(parte)
+        partes = [p for p in partes if not p.empty]
+        if partes:
+            df = resolver(pd.concat(partes, ignore_index=True))
+        else:
+            df = pd.DataFrame(columns=COLUNAS)
+
+        _escrever_snapshot(df)
+        compactando.unlink(missing_ok=True)
+        return True
+    finally:
+        lock_arquivo.liberar(_lock_path())
+
+
+def substituir_tudo(df: pd.DataFrame) -> None:
+    """Grava df como novo snapshot completo e descarta o log."""
+    global _linhas_no_log
+    # espera uma compactação em andamento (ela grava o snapshot fora do _lock)
+    with lock_arquivo.segurando(_lock_path(), _LOCK_EXPIRA_SEGUNDOS), _lock, _segurando_log():
+        _escrever_snapshot(df)
+        log_path().unlink(missing_ok=True)
+        _compactando_path().unlink(missing_ok=True)
+        _linhas_no_log = 0
@@ -0,0 +1,232 @@
+# backend/ingestao.py
+"""
+Ingestão do catálogo em blocos, com tipos declarados.
+
+1. itens.csv é lido em blocos de INGESTAO_BLOCO_LINHAS linhas com dtypes
+   fixos: item_id inteiro, genero/idioma/humor categóricos (poucos valores
+   distintos, um código por linha em vez de uma string) e as colunas de
+   texto como texto, mesmo num bloco só com vazios. Cada bloco já sai
+   tipado.
+2. O texto de features é montado com operações vetorizadas de string,
+   bloco a bloco, sem guardar uma coluna feature_text do catálogo inteiro.
+3. O TF-IDF é ajustado em duas passadas pelos blocos, sem juntar o catálogo
+   num DataFrame nem numa matriz. Em cada uma, os blocos são tokenizados e
+   contados com o vocabulário local deles (em paralelo, INGESTAO_JOBS
+   processos, poucos blocos em andamento por vez):
+   - ajustar_tfidf soma as frequências de documento por termo; o
+     vocabulário global sai ordenado, como o do TfidfVectorizer, e o IDF sai
+     das frequências somadas. Só os termos ficam em memória.
+   - transformar_blocos remapeia as contagens de cada bloco para o
+     vocabulário global e devolve as linhas TF-IDF do bloco, que quem chama
+     grava direto no destino (ver model_store.salvar).
+
+O resultado é o do TfidfVectorizer(stop_words=...).fit_transform sobre o
+catálogo inteiro (mesmo vocabulário e IDF; pesos iguais a menos de
+arredondamento), mas sem tokenizar o catálogo de uma vez.
+"""
+from __future__ import annotations
+
+import collections
+import itertools
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from joblib import Parallel, delayed
+from pandas.api.types import union_categoricals
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+from . import colunar
+from .config import INGESTAO_BLOCO_LINHAS, INGESTAO_JOBS
+
+CATEGORICAS = ("genero", "idioma", "humor")
+
+# declaradas para um bloco só com vazios não virar float
+TEXTOS = (
+    "nome", "artista", "tempo", "instrumentacao", "palavra_chave", "tags", "descricao",
+    "youtube_url",
+)
+
+DTYPES_ITENS = {
+    "item_id": "int64",
+    **{c: "category" for c in CATEGORICAS},
+    **{c: "str" for c in TEXTOS},
+}
+
+# colunas de texto -> valor para vazio, na ordem em que entram nas features
+CAMPOS_FEATURES = {
+    "genero": "desconhecido",
+    "tags": "",
+    "palavra_chave": "",
+    "humor": "",
+    "instrumentacao": "",
+    "idioma": "",
+    "descricao": "",
+}
+
+
+def _preencher(s: pd.Series, vazio: str) -> pd.Series:
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        if vazio not in s.cat.categories:
+            s = s.cat.add_categories([vazio])
+        return s.fillna(vazio)
+    return s.fillna(vazio).astype(str)
+
+
+def tipar_itens(df: pd.DataFrame) -> pd.DataFrame:
+    for campo, vazio in CAMPOS_FEATURES.items():
+        df[campo] = _preencher(df[campo], vazio)
+    for campo in CATEGORICAS:
+        if not isinstance(df[campo].dtype, pd.CategoricalDtype):
+            df[campo] = df[campo].astype("category")
+    # sem link: None (e não NaN), para o modelo Item aceitar
+    if "youtube_url" in df.columns:
+        url = df["youtube_url"].astype(object)
+        df["youtube_url"] = url.where(url.notna(), None)
+    return df
+
+
+def _unir(blocos: List[pd.DataFrame]) -> pd.DataFrame:
+    # mesmas categorias em todos os blocos: o concat mantém o dtype categórico
+    for campo in CATEGORICAS:
+        categorias = union_categoricals(
+            [b[campo] for b in blocos], sort_categories=True
+        ).categories
+        for b in blocos:
+            b[campo] = b[campo].cat.set_categories(categorias)
+    return pd.concat(blocos, ignore_index=True)
+
+
+def ler_blocos(path: Path, bloco: int = INGESTAO_BLOCO_LINHAS) -> Iterator[pd.DataFrame]:
+    """Blocos tipados de itens.csv, lidos um de cada vez."""
+    for b in pd.read_csv(path, dtype=DTYPES_ITENS, chunksize=bloco):
+        yield tipar_itens(b)
+
+
+def ler_itens(path: Path, bloco: int = INGESTAO_BLOCO_LINHAS) -> pd.DataFrame:
+    """
+    Lê itens.csv em blocos tipados e devolve o catálogo inteiro. Se existe
+    um snapshot colunar em dia (ver colunar.py), lê dele.
+    """
+    df = colunar.ler(path)
+    if df is not None:
+        return _unir([tipar_itens(df)])
+    return _unir(list(ler_blocos(path, bloco)))
+
+
+def textos_features(df: pd.DataFrame) -> pd.Series:
+    """
+    Texto de features de cada linha: os campos de CAMPOS_FEATURES não vazios
+    separados por espaço (equivale a " ".join(p for p in campos if p)).
+    """
+    texto = None
+    for campo in CAMPOS_FEATURES:
+        parte = df[campo].astype(str)
+        if texto is None:
+            texto = parte
+            continue
+        junto = texto + " " + parte
+        texto = junto.where(parte != "", texto).where(texto != "", parte)
+    return texto
+
+
+def _contar(textos: List[str], stop_words) -> Tuple[sp.csr_matrix, np.ndarray]:
+    """Contagens de termos de um bloco com o vocabulário do próprio bloco."""
+    contador = CountVectorizer(stop_words=stop_words, dtype=np.int64)
+    try:
+        contagens = contador.fit_transform(textos)
+    except ValueError:
+        # bloco só com stopwords/vazio: nenhum termo
+        return sp.csr_matrix((len(textos), 0), dtype=np.int64), np.empty(0, dtype=object)
+    return contagens.tocsr(), contador.get_feature_names_out()
+
+
+def _com_contagens(
+    blocos: Iterable[pd.DataFrame], stop_words, n_jobs: int
+) -> Iterator[Tuple[pd.DataFrame, sp.csr_matrix, np.ndarray]]:
+    """
+    (bloco, contagens, termos do bloco) para cada bloco, na ordem. Com mais
+    de um bloco, a contagem roda em n_jobs processos; o joblib só despacha
+    alguns blocos à frente, então a memória não cresce com o catálogo.
+    """
+    blocos = iter(blocos)
+    primeiros = list(itertools.islice(blocos, 2))
+    blocos = itertools.chain(primeiros, blocos)
+    if len(primeiros) < 2 or n_jobs <= 1:
+        for df in blocos:
+            yield (df, *_contar(textos_features(df).tolist(), stop_words))
+        return
+
+    # os resultados voltam na ordem de despacho: o mais antigo pendente é
+    # sempre o bloco do próximo resultado
+    pendentes = collections.deque()
+
+    def tarefas():
+        for df in blocos:
+            pendentes.append(df)
+            yield delayed(_contar)(textos_features(df).tolist(), stop_words)
+
+    resultados = Parallel(n_jobs=n_jobs, return_as="generator")(tarefas())
+    for contagens, nomes in resultados:
+        yield pendentes.popleft(), contagens, nomes
+
+
+def ajustar_tfidf(
+    blocos: Iterable[pd.DataFrame],
+    stop_words,
+    dtype=np.float64,
+    n_jobs: int = INGESTAO_JOBS,
+) -> Tuple[TfidfVectorizer, int, int]:
+    """
+    Primeira passada: vocabulário e IDF do catálogo (os blocos de itens).
+    Retorna (vectorizer, linhas, nnz), com linhas e nnz da matriz que
+    transformar_blocos vai produzir.
+    """
+    freq_doc: Dict[str, int] = {}
+    linhas = nnz = 0
+    for df, contagens, nomes in _com_contagens(blocos, stop_words, n_jobs):
+        linhas += len(df)
+        nnz += contagens.nnz
+        freq = np.bincount(contagens.indices, minlength=len(nomes))
+        for termo, f in zip(nomes.tolist(), freq.tolist()):
+            freq_doc[termo] = freq_doc.get(termo, 0) + f
+
+    termos = sorted(freq_doc)
+    if not termos:
+        raise ValueError("empty vocabulary; perhaps the documents only contain stop words")
+
+    # IDF suavizado do TfidfVectorizer: ln((1 + n) / (1 + df)) + 1
+    freq = np.array([freq_doc[t] for t in termos], dtype=np.int64)
+    idf = np.log((linhas + 1) / (freq + 1)) + 1
+    vectorizer = TfidfVectorizer(
+        stop_words=stop_words, dtype=dtype, vocabulary={t: i for i, t in enumerate(termos)}
+    )
+    vectorizer.idf_ = idf
+    return vectorizer, linhas, nnz
+
+
+def transformar_blocos(
+    blocos: Iterable[pd.DataFrame],
+    vectorizer: TfidfVectorizer,
+    n_jobs: int = INGESTAO_JOBS,
+) -> Iterator[Tuple[pd.DataFrame, sp.csr_matrix]]:
+    """
+    Segunda passada: (bloco, linhas TF-IDF do bloco), com as linhas
+    normalizadas (L2), como TfidfVectorizer + normalize.
+    """
+    vocabulario = vectorizer.vocabulary_
+    dtype = vectorizer.dtype
+    idf = vectorizer.idf_.astype(dtype)
+    for df, contagens, nomes in _com_contagens(blocos, vectorizer.stop_words, n_jobs):
+        # como os dois vocabulários são ordenados, os índices de cada linha
+        # continuam em ordem crescente
+        mapa = np.fromiter((vocabulario[t] for t in nomes), dtype=np.int64, count=len(nomes))
+        matriz = sp.csr_matrix(
+            (contagens.data, mapa[contagens.indices], contagens.indptr),
+            shape=(contagens.shape[0], len(vocabulario)),
+        ).astype(dtype)
+        matriz.data *= idf[matriz.indices]
+        yield df, normalize(matriz, norm="l2", copy=False)
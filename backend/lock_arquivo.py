@@ -0,0 +1,75 @@
+# backend/lock_arquivo.py
+"""
+Lock entre processos com um arquivo criado via O_EXCL.
+
+Usado pelo build do artefato (model_store), pela compactação e pelas
+anexações do log de avaliações (event_log) e pelas escritas no catálogo
+(catalogo). O arquivo
+guarda o PID de quem tem o lock. Um lock é considerado abandonado, e é
+removido, quando:
+
+- o processo que o criou não existe mais (morreu sem liberar)
+- ou o arquivo passou de expira_segundos (ex.: processo de outra máquina)
+"""
+from __future__ import annotations
+
+import contextlib
+import os
+import time
+from pathlib import Path
+
+
+def _inode_abandonado(path: Path, expira_segundos: float):
+    """Inode do lock se ele está abandonado; None se não existe ou está vivo."""
+    try:
+        st = path.stat()
+        conteudo = path.read_text()
+    except FileNotFoundError:
+        return None
+    if time.time() - st.st_mtime > expira_segundos:
+        return st.st_ino
+    try:
+        pid = int(conteudo)
+    except ValueError:
+        # ainda sendo escrito (ou formato antigo, sem PID): só o tempo decide
+        return None
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return st.st_ino
+    except PermissionError:
+        pass
+    return None
+
+
+def adquirir(path: Path, expira_segundos: float) -> bool:
+    """Tenta criar o lock; False se outro processo o tem."""
+    inode = _inode_abandonado(path, expira_segundos)
+    if inode is not None:
+        # só remove se ainda é o mesmo arquivo (outro processo pode ter
+        # removido o abandonado e criado um lock novo nesse meio tempo)
+        with contextlib.suppress(FileNotFoundError):
+            if path.stat().st_ino == inode:
+                path.unlink()
+    try:
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        return False
+    with os.fdopen(fd, "w") as f:
+        f.write(str(os.getpid()))
+    return True
+
+
+def liberar(path: Path) -> None:
+    path.unlink(missing_ok=True)
+
+
+@contextlib.contextmanager
+def segurando(path: Path, expira_segundos: float, intervalo: float = 0.05):
+    """Espera até adquirir o lock e o libera no fim do bloco."""
+    while not adquirir(path, expira_segundos):
+        time.sleep(intervalo)
+    try:
+        yield
+    finally:
+        liberar(path)
@@ -0,0 +1,102 @@
+# backend/lsa.py
+"""
+Pontuação em espaço latente (LSA) para catálogos com vocabulário grande.
+
+1. _item_matrix é fatorada com TruncatedSVD em LSA_DIM dimensões; cada item
+   vira um embedding denso, normalizado (L2) e guardado contíguo
+   (n_itens x LSA_DIM).
+2. Na consulta, o perfil TF-IDF é projetado no mesmo espaço
+   (componentes @ perfil) e a similaridade é o cosseno entre embeddings:
+   um único produto matriz densa × vetor (BLAS).
+
+É uma aproximação do cosseno TF-IDF: LSA_DIM é o botão de
+qualidade/latência. Para comparar com o backend "sparse":
+
+    python -m benchmarks.lsa --k 10 --dims 32 64 128 256
+"""
+from __future__ import annotations
+
+import threading
+from typing import Optional
+
+import numpy as np
+from sklearn.decomposition import TruncatedSVD
+
+from .catalogo import Buffer
+from .config import LSA_DIM, LSA_SEED
+from .vetores import norma_perfil, normalizar_linhas, produto_perfil
+
+_lock = threading.Lock()
+_indice: Optional[dict] = None
+
+
+def construir(item_matrix, dim: int = LSA_DIM, seed: int = LSA_SEED) -> dict:
+    """Fatora item_matrix e torna o resultado o índice ativo."""
+    global _indice
+    dim = max(1, min(dim, min(item_matrix.shape) - 1))
+    svd = TruncatedSVD(n_components=dim, algorithm="randomized", random_state=seed)
+    embeddings = svd.fit_transform(item_matrix)
+
+    indice = {
+        "matriz": item_matrix,
+        # (dim x V): projeta um vetor TF-IDF no espaço latente
+        "componentes": np.ascontiguousarray(svd.components_, dtype=item_matrix.dtype),
+        "embeddings": np.ascontiguousarray(normalizar_linhas(embeddings), dtype=item_matrix.dtype),
+    }
+    with _lock:
+        _indice = indice
+    return indice
+
+
+def anexar_linha(novas, vetor) -> None:
+    """
+    Catálogo incremental: projeta a linha anexada (vetor, 1 x V) com os
+    componentes atuais, sem refazer a SVD. novas é a matriz das linhas
+    ingeridas depois do fit, já com esta (ver catalogo.MatrizItens). Não faz
+    nada sem índice montado.
+    """
+    with _lock:
+        indice = _indice
+        if indice is None:
+            return
+        if "embeddings_novas" not in indice:
+            indice["embeddings_novas"] = Buffer(
+                indice["embeddings"].dtype, indice["embeddings"].shape[1:]
+            )
+        projecao = np.asarray(vetor @ indice["componentes"].T)
+        indice["embeddings_novas"].anexar(normalizar_linhas(projecao))
+        indice["novas"] = novas
+
+
+def lsa_scores(
+    item_matrix,
+    profile: np.ndarray,
+    linhas: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Cosseno entre o perfil projetado e os embeddings dos itens (ou só das
+    linhas informadas, na mesma ordem). As linhas ingeridas depois do fit
+    usam as projeções de anexar_linha. Sem índice para esta matriz (ainda
+    não montado, ou a requisição começou antes de uma troca de modelo)
+    devolve o cosseno TF-IDF exato: a requisição nunca refaz a SVD.
+    """
+    indice = _indice
+    embeddings = None
+    if indice is not None and indice["matriz"] is item_matrix:
+        embeddings = indice["embeddings"]
+    elif indice is not None and indice.get("novas") is item_matrix:
+        embeddings = indice["embeddings_novas"].visao()[: item_matrix.shape[0]]
+    if embeddings is None or len(embeddings) < item_matrix.shape[0]:
+        matriz = item_matrix if linhas is None else item_matrix[linhas]
+        norma = norma_perfil(profile)
+        if norma == 0:
+            return np.zeros(matriz.shape[0])
+        return produto_perfil(matriz, profile / norma)
+
+    if linhas is not None:
+        embeddings = embeddings[linhas]
+    q = produto_perfil(indice["componentes"], profile.astype(embeddings.dtype, copy=False))
+    norma = np.linalg.norm(q)
+    if norma == 0:
+        return np.zeros(embeddings.shape[0])
+    return embeddings @ (q / norma)
@@ -0,0 +1,212 @@
+# backend/metrics.py
+"""
+Registro de métricas em memória, exposto em /metrics no formato texto do
+Prometheus (sem servidor externo).
+
+- contadores e histogramas de latência por rota (middleware em app.py)
+- histograma por etapa interna, medido com `with etapa("nome"):`
+- gauges de tamanho do catálogo, do vocabulário e de avaliações
+
+As etapas também podem ser acumuladas por requisição (contextvar), para o
+cabeçalho Server-Timing (ver app.py).
+"""
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+BUCKETS_LATENCIA = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+
+def _formatar_labels(nomes: Sequence[str], valores: Tuple[str, ...], extra: str = "") -> str:
+    partes = [
+        f'{n}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for n, v in zip(nomes, valores)
+    ]
+    if extra:
+        partes.append(extra)
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+
+def _formatar_valor(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class _Metrica:
+    tipo = ""
+
+    def __init__(self, nome: str, ajuda: str, labels: Sequence[str] = ()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _chave(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels[n]) for n in self.labels)
+
+    def _cabecalho(self) -> List[str]:
+        return [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} {self.tipo}"]
+
+
+class Counter(_Metrica):
+    tipo = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._valores: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, valor: float = 1.0, **labels) -> None:
+        chave = self._chave(labels)
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0.0) + valor
+
+    def valor(self, **labels) -> float:
+        return self._valores.get(self._chave(labels), 0.0)
+
+    def render(self) -> List[str]:
+        linhas = self._cabecalho()
+        with self._lock:
+            for chave, v in sorted(self._valores.items()):
+                linhas.append(f"{self.nome}{_formatar_labels(self.labels, chave)} {_formatar_valor(v)}")
+        return linhas
+
+
+class Gauge(Counter):
+    tipo = "gauge"
+
+    def set(self, valor: float, **labels) -> None:
+        with self._lock:
+            self._valores[self._chave(labels)] = float(valor)
+
+
+class Histogram(_Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nome, ajuda, labels=(), buckets: Sequence[float] = BUCKETS_LATENCIA):
+        super().__init__(nome, ajuda, labels)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # chave -> [contagem por bucket (não cumulativa), soma, total]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, valor: float, **labels) -> None:
+        chave = self._chave(labels)
+        with self._lock:
+            serie = self._series.get(chave)
+            if serie is None:
+                serie = self._series[chave] = [[0] * len(self.buckets), 0.0, 0]
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    serie[0][i] += 1
+                    break
+            serie[1] += valor
+            serie[2] += 1
+
+    def render(self) -> List[str]:
+        linhas = self._cabecalho()
+        with self._lock:
+            for chave, (contagens, soma, total) in sorted(self._series.items()):
+                acumulado = 0
+                for limite, c in zip(self.buckets, contagens):
+                    acumulado += c
+                    le = 'le="' + _formatar_valor(limite) + '"'
+                    linhas.append(
+                        f"{self.nome}_bucket{_formatar_labels(self.labels, chave, le)} {acumulado}"
+                    )
+                rotulos = _formatar_labels(self.labels, chave)
+                linhas.append(f"{self.nome}_sum{rotulos} {_formatar_valor(soma)}")
+                linhas.append(f"{self.nome}_count{rotulos} {total}")
+        return linhas
+
+
+class Registry:
+    def __init__(self):
+        self._metricas: List[_Metrica] = []
+
+    def _registrar(self, metrica):
+        self._metricas.append(metrica)
+        return metrica
+
+    def counter(self, nome, ajuda, labels=()) -> Counter:
+        return self._registrar(Counter(nome, ajuda, labels))
+
+    def gauge(self, nome, ajuda, labels=()) -> Gauge:
+        return self._registrar(Gauge(nome, ajuda, labels))
+
+    def histogram(self, nome, ajuda, labels=(), buckets=BUCKETS_LATENCIA) -> Histogram:
+        return self._registrar(Histogram(nome, ajuda, labels, buckets))
+
+    def render(self) -> str:
+        linhas: List[str] = []
+        for metrica in self._metricas:
+            linhas.extend(metrica.render())
+        return "\n".join(linhas) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUISICOES = REGISTRY.counter(
+    "musiq_requisicoes_total", "Requisições HTTP atendidas.", ["metodo", "rota", "status"]
+)
+DURACAO_REQUISICAO = REGISTRY.histogram(
+    "musiq_requisicao_duracao_segundos", "Latência das requisições HTTP.", ["metodo", "rota"]
+)
+DURACAO_ETAPA = REGISTRY.histogram(
+    "musiq_etapa_duracao_segundos", "Duração das etapas internas do backend.", ["etapa"]
+)
+ITENS_CATALOGO = REGISTRY.gauge("musiq_itens_catalogo", "Itens no catálogo carregado.")
+TERMOS_VOCABULARIO = REGISTRY.gauge("musiq_termos_vocabulario", "Termos no vocabulário TF-IDF.")
+TAXA_OOV_CATALOGO = REGISTRY.gauge(
+    "musiq_catalogo_taxa_oov", "Fração de tokens dos itens ingeridos fora do vocabulário."
+)
+AVALIACOES_USUARIOS = REGISTRY.gauge(
+    "musiq_avaliacoes_usuarios", "Avaliações (com item) na última leitura dos usuários."
+)
+
+
+# etapa -> segundos acumulados na requisição atual (None = não coletar)
+_tempos_requisicao: ContextVar[Optional[Dict[str, float]]] = ContextVar(
+    "musiq_tempos_requisicao", default=None
+)
+
+
+@contextmanager
+def etapa(nome: str) -> Iterator[None]:
+    """Mede a duração do bloco e registra no histograma de etapas."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracao = time.perf_counter() - inicio
+        DURACAO_ETAPA.observe(duracao, etapa=nome)
+        tempos = _tempos_requisicao.get()
+        if tempos is not None:
+            tempos[nome] = tempos.get(nome, 0.0) + duracao
+
+
+def iniciar_tempos() -> Tuple[Dict[str, float], Token]:
+    """Passa a acumular as etapas do contexto atual num dict novo."""
+    tempos: Dict[str, float] = {}
+    return tempos, _tempos_requisicao.set(tempos)
+
+
+def encerrar_tempos(token: Token) -> None:
+    _tempos_requisicao.reset(token)
+
+
+def server_timing(tempos: Dict[str, float], total: float) -> str:
+    """Valor do cabeçalho Server-Timing (durações em ms), na ordem das etapas."""
+    partes = [f"{nome};dur={seg * 1000:.3f}" for nome, seg in tempos.items()]
+    partes.append(f"total;dur={total * 1000:.3f}")
+    return ", ".join(partes)
+
+
+def render() -> str:
+    return REGISTRY.render()
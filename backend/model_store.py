@@ -0,0 +1,351 @@
+# backend/model_store.py
+"""
+Artefato persistido do modelo TF-IDF.
+
+Guarda em disco o vocabulário, os pesos IDF, os arrays CSR de _item_matrix e
+os metadados derivados do catálogo (ids, linhas por gênero e posting lists da
+busca), numa pasta identificada pelo hash (sha256) do catálogo: itens.csv
+mais as alterações do itens.log incluídas no fit (ver catalogo.hash_catalogo):
+
+    MODEL_DIR/<hash>/meta.json
+    MODEL_DIR/<hash>/vocabulario.json
+    MODEL_DIR/<hash>/idf.npy
+    MODEL_DIR/<hash>/data.npy, indices.npy, indptr.npy
+    MODEL_DIR/<hash>/item_ids.npy
+    MODEL_DIR/<hash>/ids_ordenados.npy, ids_ordem.npy
+    MODEL_DIR/<hash>/itens/
+    MODEL_DIR/<hash>/genero_linhas.npy, genero_offsets.npy
+    MODEL_DIR/<hash>/busca_<campo>_grams.json, _linhas.npy, _offsets.npy
+
+ids_ordenados/ids_ordem são os item_ids em ordem crescente e a linha de
+cada um (catalogo.PosicoesItens acha a linha de um id por busca binária), e
+itens/ é o próprio catálogo do fit, coluna a coluna (colunar.Tabela), de
+onde saem os metadados das linhas servidas. O build grava os arrays CSR, os
+ids e o catálogo direto no disco, bloco a bloco (ver
+ingestao.transformar_blocos), sem montar a matriz nem o catálogo em memória.
+Os .npy são abertos com memory-map (somente leitura), então carregar o modelo
+não refaz o fit e não copia os arrays para a memória do processo. Com
+`uvicorn --workers N`, todos os workers compartilham as mesmas páginas do
+page cache; só um deles faz o fit (lock em MODEL_DIR/.<hash>.lock) e os
+demais esperam o artefato ficar pronto.
+
+Para gerar o artefato manualmente (a partir da raiz do projeto):
+
+    python -m backend.model_store
+"""
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import tempfile
+import time
+from array import array
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from .config import MODEL_DIR
+from . import colunar, lock_arquivo, search
+
+VERSAO_FORMATO = 3
+_ARRAYS_CSR = ("data", "indices", "indptr")
+# lock de build mais velho que isso é de um processo que morreu
+_LOCK_EXPIRA_SEGUNDOS = 1800
+
+
+def artefato_dir(hash_itens: str) -> Path:
+    return MODEL_DIR / hash_itens
+
+
+def _gravar_parcial(
+    pasta: Path,
+    prefixo: str,
+    parciais: Dict[str, List[Dict[str, int]]],
+    postings: Dict[str, Sequence[int]],
+) -> None:
+    """
+    Grava as postings {chave: linhas} de um bloco (chaves ordenadas, linhas
+    concatenadas) num arquivo parcial; em parciais[prefixo] fica o tamanho
+    de cada lista do bloco, para _juntar_parciais.
+    """
+    blocos = parciais.setdefault(prefixo, [])
+    chaves = sorted(postings)
+    linhas = (
+        np.concatenate([np.asarray(postings[c], dtype=np.int64) for c in chaves])
+        if chaves
+        else np.empty(0, dtype=np.int64)
+    )
+    np.save(pasta / f"{prefixo}.parcial{len(blocos)}.npy", linhas)
+    blocos.append({c: len(postings[c]) for c in chaves})
+
+
+def _juntar_parciais(
+    pasta: Path, prefixo: str, blocos: List[Dict[str, int]]
+) -> List[str]:
+    """
+    Junta os arquivos parciais de cada bloco em chaves + um array de linhas
+    + offsets. Cada lista é copiada bloco a bloco, em ordem, direto para a
+    sua faixa do array final (memory-map): as linhas continuam crescentes.
+    """
+    chaves = sorted(set().union(*blocos))
+    indice = {c: i for i, c in enumerate(chaves)}
+    tamanhos = np.zeros(len(chaves), dtype=np.int64)
+    for tamanhos_bloco in blocos:
+        for c, n in tamanhos_bloco.items():
+            tamanhos[indice[c]] += n
+    offsets = np.zeros(len(chaves) + 1, dtype=np.int64)
+    np.cumsum(tamanhos, out=offsets[1:])
+
+    linhas = np.lib.format.open_memmap(
+        pasta / f"{prefixo}_linhas.npy", mode="w+", dtype=np.int64, shape=(int(offsets[-1]),)
+    )
+    proxima = offsets[:-1].copy()
+    for b, tamanhos_bloco in enumerate(blocos):
+        parcial_path = pasta / f"{prefixo}.parcial{b}.npy"
+        parcial = np.load(parcial_path, mmap_mode="r")
+        inicio = 0
+        for c, n in tamanhos_bloco.items():
+            i = indice[c]
+            linhas[proxima[i] : proxima[i] + n] = parcial[inicio : inicio + n]
+            proxima[i] += n
+            inicio += n
+        del parcial
+        parcial_path.unlink()
+    linhas.flush()
+    np.save(pasta / f"{prefixo}_offsets.npy", offsets)
+    return chaves
+
+
+def _carregar_postings(pasta: Path, prefixo: str, chaves: List[str]) -> Dict[str, np.ndarray]:
+    # fatias de um array mapeado: nenhuma cópia por chave
+    linhas = np.load(pasta / f"{prefixo}_linhas.npy", mmap_mode="r")
+    offsets = np.load(pasta / f"{prefixo}_offsets.npy")
+    return {c: linhas[offsets[i] : offsets[i + 1]] for i, c in enumerate(chaves)}
+
+
+def _postings_genero(itens: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """gênero (minúsculo) -> linhas do gênero, em ordem crescente."""
+    return {
+        g: np.sort(pos)
+        for g, pos in itens.groupby(itens["genero"].str.lower()).indices.items()
+    }
+
+
+def _tipo_indice(*tamanhos: int):
+    # como o scipy: int32 enquanto couber
+    return np.int32 if max(tamanhos) <= np.iinfo(np.int32).max else np.int64
+
+
+def salvar(
+    vectorizer: TfidfVectorizer,
+    blocos: Iterable[Tuple[pd.DataFrame, sp.csr_matrix]],
+    n_itens: int,
+    nnz: int,
+    hash_itens: str,
+) -> Path:
+    """
+    Grava o artefato de forma atômica (pasta temporária + rename).
+    blocos = (itens, linhas TF-IDF) de cada bloco do catálogo, em ordem (ver
+    ingestao.transformar_blocos); n_itens e nnz são os totais, para os
+    arrays CSR e os ids serem alocados no disco (memory-map) e preenchidos
+    bloco a bloco, sem a matriz inteira em memória.
+    """
+    MODEL_DIR.mkdir(parents=True, exist_ok=True)
+    destino = artefato_dir(hash_itens)
+    tmp = Path(tempfile.mkdtemp(prefix=".tmp-", dir=MODEL_DIR))
+    dtype = np.dtype(vectorizer.dtype)
+    n_termos = len(vectorizer.vocabulary_)
+    try:
+        termos = [""] * n_termos
+        for termo, idx in vectorizer.vocabulary_.items():
+            termos[idx] = termo
+        with open(tmp / "vocabulario.json", "w", encoding="utf-8") as f:
+            json.dump(termos, f, ensure_ascii=False)
+        np.save(tmp / "idf.npy", vectorizer.idf_)
+
+        tipo_indice = _tipo_indice(nnz, n_termos)
+        abrir = np.lib.format.open_memmap
+        data = abrir(tmp / "data.npy", mode="w+", dtype=dtype, shape=(nnz,))
+        indices = abrir(tmp / "indices.npy", mode="w+", dtype=tipo_indice, shape=(nnz,))
+        indptr = abrir(tmp / "indptr.npy", mode="w+", dtype=tipo_indice, shape=(n_itens + 1,))
+        item_ids = abrir(tmp / "item_ids.npy", mode="w+", dtype=np.int64, shape=(n_itens,))
+        indptr[0] = 0
+        tabela = colunar.GravadorTabela(tmp / "itens", n_itens)
+        # postings de gênero e de busca: um arquivo parcial por bloco, juntados
+        # no fim (ver _juntar_parciais)
+        parciais: Dict[str, List[Dict[str, int]]] = {}
+        linha = inicio = 0
+        for itens, matriz in blocos:
+            fim, fim_linha = inicio + matriz.nnz, linha + matriz.shape[0]
+            if fim > nnz or fim_linha > n_itens:
+                raise RuntimeError("o catálogo mudou durante o fit")
+            data[inicio:fim] = matriz.data
+            indices[inicio:fim] = matriz.indices
+            indptr[linha + 1 : fim_linha + 1] = matriz.indptr[1:] + inicio
+            item_ids[linha:fim_linha] = itens["item_id"].to_numpy(dtype=np.int64)
+            tabela.anexar(itens)
+
+            generos = {g: pos + linha for g, pos in _postings_genero(itens).items()}
+            _gravar_parcial(tmp, "genero", parciais, generos)
+            busca: Dict[str, Dict[str, array]] = {}
+            search.acumular_postings(busca, itens, linha)
+            for campo in search.CAMPOS:
+                _gravar_parcial(tmp, f"busca_{campo}", parciais, busca.get(campo, {}))
+            linha, inicio = fim_linha, fim
+        if (linha, inicio) != (n_itens, nnz):
+            raise RuntimeError("o catálogo mudou durante o fit")
+        tabela.fechar()
+        # estável: com ids repetidos, a última linha de cada um fica por último
+        ordem = np.argsort(item_ids, kind="stable")
+        np.save(tmp / "ids_ordem.npy", ordem)
+        np.save(tmp / "ids_ordenados.npy", item_ids[ordem])
+        for arr in (data, indices, indptr, item_ids):
+            arr.flush()
+        del data, indices, indptr, item_ids, ordem
+
+        generos = _juntar_parciais(tmp, "genero", parciais.get("genero", []))
+        for campo in search.CAMPOS:
+            grams = _juntar_parciais(tmp, f"busca_{campo}", parciais.get(f"busca_{campo}", []))
+            with open(tmp / f"busca_{campo}_grams.json", "w", encoding="utf-8") as f:
+                json.dump(grams, f, ensure_ascii=False)
+
+        meta = {
+            "versao_formato": VERSAO_FORMATO,
+            "hash_itens": hash_itens,
+            "shape": [n_itens, n_termos],
+            "stop_words": list(vectorizer.stop_words or []),
+            "dtype": str(dtype),
+            "generos": generos,
+        }
+        with open(tmp / "meta.json", "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+        if destino.exists() and not _compativel(_ler_meta(destino), str(dtype)):
+            # artefato do mesmo catálogo num formato antigo (ou outro dtype)
+            shutil.rmtree(destino, ignore_errors=True)
+        try:
+            os.rename(tmp, destino)
+        except OSError:
+            # outro processo gravou o mesmo artefato antes
+            shutil.rmtree(tmp, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+    _remover_antigos(manter=hash_itens)
+    return destino
+
+
+def _ler_meta(pasta: Path) -> Optional[dict]:
+    try:
+        with open(pasta / "meta.json", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _compativel(meta: Optional[dict], dtype: Optional[str]) -> bool:
+    if meta is None or meta.get("versao_formato") != VERSAO_FORMATO:
+        return False
+    return dtype is None or meta.get("dtype", "float64") == dtype
+
+
+def _remover_antigos(manter: str) -> None:
+    for pasta in MODEL_DIR.iterdir():
+        if pasta.is_dir() and pasta.name != manter and not pasta.name.startswith("."):
+            shutil.rmtree(pasta, ignore_errors=True)
+
+
+def carregar(hash_itens: str, dtype: Optional[str] = None) -> Optional[dict]:
+    """
+    Abre o artefato do hash informado, ou retorna None se ele não existe
+    (ou está em outro formato / dtype). O dict traz vectorizer, item_matrix,
+    item_ids, ids_ordenados, ids_ordem, itens (colunar.Tabela), genero_pos e
+    busca (postings por campo, ver search.py).
+    """
+    pasta = artefato_dir(hash_itens)
+    meta = _ler_meta(pasta)
+    if not _compativel(meta, dtype):
+        return None
+
+    with open(pasta / "vocabulario.json", encoding="utf-8") as f:
+        termos = json.load(f)
+    vectorizer = TfidfVectorizer(
+        stop_words=meta["stop_words"] or None,
+        vocabulary={termo: idx for idx, termo in enumerate(termos)},
+        dtype=np.dtype(meta.get("dtype", "float64")).type,
+    )
+    vectorizer.idf_ = np.load(pasta / "idf.npy")
+
+    arrays = {
+        nome: np.load(pasta / f"{nome}.npy", mmap_mode="r") for nome in _ARRAYS_CSR
+    }
+    item_matrix = sp.csr_matrix(
+        (arrays["data"], arrays["indices"], arrays["indptr"]),
+        shape=tuple(meta["shape"]),
+        copy=False,
+    )
+
+    busca = {}
+    for campo in search.CAMPOS:
+        with open(pasta / f"busca_{campo}_grams.json", encoding="utf-8") as f:
+            grams = json.load(f)
+        busca[campo] = _carregar_postings(pasta, f"busca_{campo}", grams)
+
+    return {
+        "vectorizer": vectorizer,
+        "item_matrix": item_matrix,
+        "item_ids": np.load(pasta / "item_ids.npy", mmap_mode="r"),
+        "ids_ordenados": np.load(pasta / "ids_ordenados.npy", mmap_mode="r"),
+        "ids_ordem": np.load(pasta / "ids_ordem.npy", mmap_mode="r"),
+        "itens": colunar.Tabela(pasta / "itens"),
+        "genero_pos": _carregar_postings(pasta, "genero", meta["generos"]),
+        "busca": busca,
+    }
+
+
+def _lock_path(hash_itens: str) -> Path:
+    return MODEL_DIR / f".{hash_itens}.lock"
+
+
+def carregar_ou_construir(
+    hash_itens: str,
+    construir: Callable[
+        [], Tuple[TfidfVectorizer, Iterable[Tuple[pd.DataFrame, sp.csr_matrix]], int, int]
+    ],
+    dtype: Optional[str] = None,
+    intervalo: float = 0.2,
+) -> dict:
+    """
+    Abre o artefato; se ele não existe, só um processo chama construir()
+    (os argumentos de salvar, menos o hash) e grava, enquanto os outros
+    esperam. Todos (inclusive quem construiu)
+    terminam com a versão mapeada do disco, sem cópia própria da matriz.
+    """
+    MODEL_DIR.mkdir(parents=True, exist_ok=True)
+    while True:
+        modelo = carregar(hash_itens, dtype)
+        if modelo is not None:
+            return modelo
+        if lock_arquivo.adquirir(_lock_path(hash_itens), _LOCK_EXPIRA_SEGUNDOS):
+            try:
+                # outro processo pode ter terminado entre o carregar e o lock
+                if carregar(hash_itens, dtype) is None:
+                    vectorizer, blocos, n_itens, nnz = construir()
+                    salvar(vectorizer, blocos, n_itens, nnz, hash_itens)
+            finally:
+                lock_arquivo.liberar(_lock_path(hash_itens))
+            continue
+        time.sleep(intervalo)
+
+
+if __name__ == "__main__":
+    from . import recommender
+
+    pasta = recommender.build_model_artifact()
+    print("Artefato do modelo gerado em", pasta)
@@ -1,6 +1,6 @@
 # backend/models.py
 from typing import List, Optional, Literal, Dict
-from pydantic import BaseModel
+from pydantic import BaseModel, model_validator
 
 
 class Item(BaseModel):
@@ -21,6 +21,60 @@ class Item(BaseModel):
     similaridade: Optional[float] = None
 
 
+class ItemCreateRequest(BaseModel):
+    item_id: Optional[int] = None
+    nome: str
+    artista: str
+    genero: str
+    tempo: str = ""
+    instrumentacao: str = ""
+    palavra_chave: str = ""
+    humor: str = ""
+    duracao_segundos: int = 0
+    idioma: str = ""
+    tags: str = ""
+    descricao: str = ""
+    youtube_url: Optional[str] = None
+
+
+class ItemUpdateRequest(BaseModel):
+    nome: Optional[str] = None
+    artista: Optional[str] = None
+    genero: Optional[str] = None
+    tempo: Optional[str] = None
+    instrumentacao: Optional[str] = None
+    palavra_chave: Optional[str] = None
+    humor: Optional[str] = None
+    duracao_segundos: Optional[int] = None
+    idioma: Optional[str] = None
+    tags: Optional[str] = None
+    descricao: Optional[str] = None
+    youtube_url: Optional[str] = None
+
+    @model_validator(mode="after")
+    def _sem_nulos(self):
+        # omitido = não altera; null explícito só vale para youtube_url (tirar o link)
+        nulos = [
+            campo
+            for campo in self.model_fields_set
+            if campo != "youtube_url" and getattr(self, campo) is None
+        ]
+        if nulos:
+            raise ValueError(f"campos não podem ser null: {', '.join(sorted(nulos))}")
+        return self
+
+
+class DriftCatalogoResponse(BaseModel):
+    itens_catalogo: int
+    itens_adicionados: int
+    itens_atualizados: int
+    fracao_alterada: float
+    tokens: int
+    tokens_fora_vocabulario: int
+    taxa_oov: float
+    refit_recomendado: bool
+
+
 class User(BaseModel):
     usuario_id: int
     nome: str
@@ -44,6 +98,18 @@ class RecomendacaoRequest(BaseModel):
     ordenar_por: Literal["similaridade", "nome"] = "similaridade"
 
 
+class RecomendacaoLoteRequest(BaseModel):
+    usuario_ids: List[int]
+    top_k: int = 10
+    genero: Optional[str] = None
+
+
+class RecomendacaoUsuario(BaseModel):
+    usuario_id: int
+    itens: List[Item] = []
+    erro: Optional[str] = None
+
+
 class MetricasResponse(BaseModel):
     precision: float
     recall: float
@@ -53,6 +119,10 @@ class MetricasResponse(BaseModel):
     relevantes: int
 
 
+class MetricasUsuario(MetricasResponse):
+    usuario_id: int
+
+
 class GeneroStats(BaseModel):
     likes: int
     total: int
@@ -0,0 +1,239 @@
+# backend/precompute.py
+"""
+Recomendações pré-calculadas para todos os usuários.
+
+O job offline calcula o top-N (PRECOMPUTE_TOP_N) de cada usuário de
+usuarios.csv com recommend_for_users, dividindo os usuários em blocos entre
+PRECOMPUTE_JOBS processos, e grava em PRECOMPUTE_DIR:
+
+    meta.json      hash do catálogo, top_n e configuração do modelo
+    usuarios.npy   usuario_id (ordenado)
+    impressoes.npy impressão digital dos likes de cada usuário
+    offsets.npy    início do top-N de cada usuário em item_ids/sims
+    item_ids.npy, sims.npy
+
+A impressão digital é um hash dos item_ids curtidos: é a "versão do perfil"
+que continua valendo entre processos e reinícios. O /recomendar serve o
+top-N gravado (via memory-map) quando o catálogo é o mesmo e a impressão
+bate com os likes atuais; senão calcula ao vivo. O filtro de gênero é
+aplicado sobre o top-N gravado; se sobram menos de top_k itens e a lista
+foi truncada em N, também cai no cálculo ao vivo.
+
+Para gerar (a partir da raiz do projeto):
+
+    python -m backend.precompute
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .config import (
+    MODO_COMPACTO,
+    PERFIL_MAX_TERMOS,
+    PRECOMPUTE_BLOCO,
+    PRECOMPUTE_DIR,
+    PRECOMPUTE_JOBS,
+    PRECOMPUTE_TOP_N,
+)
+from .metrics import REGISTRY
+
+VERSAO_FORMATO = 1
+
+# o job pontua com o cosseno exato; só esses backends dão o mesmo resultado
+BACKENDS_EXATOS = ("sparse", "joblib")
+
+CONSULTAS = REGISTRY.counter(
+    "musiq_precomputado_total",
+    "Consultas às recomendações pré-calculadas "
+    "(servido, ausente, desatualizado, insuficiente).",
+    ["resultado"],
+)
+
+_lock = threading.Lock()
+_dados: Optional[dict] = None
+_assinatura: Optional[tuple] = None  # (inode, mtime) do meta.json carregado
+
+
+def impressao(curtidos: Iterable[int]) -> int:
+    """Impressão digital (64 bits) do conjunto de item_ids curtidos."""
+    ids = np.array(sorted(int(i) for i in curtidos), dtype=np.int64)
+    return int.from_bytes(hashlib.blake2b(ids.tobytes(), digest_size=8).digest(), "little")
+
+
+def _config_modelo() -> dict:
+    return {"compacto": MODO_COMPACTO, "perfil_max_termos": PERFIL_MAX_TERMOS}
+
+
+# ------------------------------------------------------------------ job
+
+
+def _iniciar_worker() -> None:
+    from . import recommender
+
+    # com fork o modelo e os perfis já vêm do processo pai
+    recommender._ensure_perfis()
+
+
+def _calcular_bloco(ids: List[int], top_n: int) -> List[tuple]:
+    from . import profiles, recommender
+
+    recs, _ = recommender.recommend_for_users(ids, top_k=top_n)
+    return [
+        (
+            usuario_id,
+            impressao(profiles.curtidos(usuario_id)),
+            df["item_id"].to_numpy(dtype=np.int64),
+            df["similaridade"].to_numpy(dtype=np.float64),
+        )
+        for usuario_id, df in recs.items()
+    ]
+
+
+def _gravar(partes: List[tuple], hash_catalogo: str, top_n: int) -> Path:
+    partes = sorted(partes, key=lambda p: p[0])
+    tamanhos = np.array([len(p[2]) for p in partes], dtype=np.int64)
+    offsets = np.zeros(len(partes) + 1, dtype=np.int64)
+    np.cumsum(tamanhos, out=offsets[1:])
+
+    destino = PRECOMPUTE_DIR
+    tmp = destino.with_name(f".{destino.name}.tmp-{os.getpid()}")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    np.save(tmp / "usuarios.npy", np.array([p[0] for p in partes], dtype=np.int64))
+    np.save(tmp / "impressoes.npy", np.array([p[1] for p in partes], dtype=np.uint64))
+    np.save(tmp / "offsets.npy", offsets)
+    vazio_i, vazio_f = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    np.save(tmp / "item_ids.npy", np.concatenate([vazio_i] + [p[2] for p in partes]))
+    np.save(tmp / "sims.npy", np.concatenate([vazio_f] + [p[3] for p in partes]))
+    meta = {
+        "versao_formato": VERSAO_FORMATO,
+        "hash_catalogo": hash_catalogo,
+        "top_n": top_n,
+        "config": _config_modelo(),
+        "usuarios": len(partes),
+        "gerado_em": time.time(),
+    }
+    # meta.json por último: é a assinatura que os leitores observam
+    (tmp / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+    shutil.rmtree(destino, ignore_errors=True)
+    os.rename(tmp, destino)
+    return destino
+
+
+def gerar(
+    top_n: int = PRECOMPUTE_TOP_N,
+    jobs: int = PRECOMPUTE_JOBS,
+    bloco: int = PRECOMPUTE_BLOCO,
+) -> Tuple[Path, int]:
+    """Calcula e grava o top-N de todos os usuários. Retorna (pasta, usuários)."""
+    from . import recommender
+
+    recommender._ensure_perfis()
+    usuarios = np.sort(recommender.load_usuarios_df()["usuario_id"].unique())
+    blocos = [usuarios[i : i + bloco].tolist() for i in range(0, len(usuarios), bloco)]
+
+    partes: List[tuple] = []
+    if jobs > 1 and len(blocos) > 1:
+        contexto = (
+            multiprocessing.get_context("fork")
+            if "fork" in multiprocessing.get_all_start_methods()
+            else None
+        )
+        with ProcessPoolExecutor(
+            max_workers=min(jobs, len(blocos)),
+            mp_context=contexto,
+            initializer=_iniciar_worker,
+        ) as pool:
+            for resultado in pool.map(_calcular_bloco, blocos, [top_n] * len(blocos)):
+                partes.extend(resultado)
+    else:
+        for ids in blocos:
+            partes.extend(_calcular_bloco(ids, top_n))
+
+    return _gravar(partes, recommender._modelo_hash, top_n), len(partes)
+
+
+# ------------------------------------------------------------- leitura
+
+
+def _carregar() -> Optional[dict]:
+    """Arrays gravados (memory-map); relê quando o job grava de novo."""
+    global _dados, _assinatura
+    try:
+        st = (PRECOMPUTE_DIR / "meta.json").stat()
+    except FileNotFoundError:
+        return None
+    assinatura = (st.st_ino, st.st_mtime_ns)
+    if assinatura == _assinatura:
+        return _dados
+    with _lock:
+        if assinatura != _assinatura:
+            try:
+                meta = json.loads((PRECOMPUTE_DIR / "meta.json").read_text(encoding="utf-8"))
+                dados = {"meta": meta}
+                for nome in ("usuarios", "impressoes", "offsets", "item_ids", "sims"):
+                    dados[nome] = np.load(PRECOMPUTE_DIR / f"{nome}.npy", mmap_mode="r")
+            except (OSError, ValueError):
+                # o job está trocando a pasta: tenta na próxima consulta
+                return None
+            if meta.get("versao_formato") != VERSAO_FORMATO:
+                dados = None
+            _dados, _assinatura = dados, assinatura
+    return _dados
+
+
+def obter(
+    hash_catalogo: str, usuario_id: int, curtidos: Iterable[int]
+) -> Optional[Tuple[np.ndarray, np.ndarray, bool]]:
+    """
+    (item_ids, similaridades, completo) pré-calculados para o usuário, ou
+    None se não há entrada válida. completo = a lista não foi truncada em N.
+    """
+    dados = _carregar()
+    if (
+        dados is None
+        or dados["meta"]["hash_catalogo"] != hash_catalogo
+        or dados["meta"]["config"] != _config_modelo()
+    ):
+        CONSULTAS.inc(resultado="ausente")
+        return None
+    usuarios = dados["usuarios"]
+    i = int(np.searchsorted(usuarios, usuario_id))
+    if i == len(usuarios) or usuarios[i] != usuario_id:
+        CONSULTAS.inc(resultado="ausente")
+        return None
+    if int(dados["impressoes"][i]) != impressao(curtidos):
+        CONSULTAS.inc(resultado="desatualizado")
+        return None
+    ini, fim = int(dados["offsets"][i]), int(dados["offsets"][i + 1])
+    completo = fim - ini < dados["meta"]["top_n"]
+    return dados["item_ids"][ini:fim], dados["sims"][ini:fim], completo
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Pré-calcula o top-N de recomendações de todos os usuários"
+    )
+    parser.add_argument("--top-n", type=int, default=PRECOMPUTE_TOP_N)
+    parser.add_argument("--jobs", type=int, default=PRECOMPUTE_JOBS, help="processos")
+    parser.add_argument("--bloco", type=int, default=PRECOMPUTE_BLOCO, help="usuários por tarefa")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    pasta, n = gerar(args.top_n, args.jobs, args.bloco)
+    print(
+        f"Top-{args.top_n} de {n} usuários gravado em {pasta} "
+        f"({time.perf_counter() - inicio:.1f}s)."
+    )
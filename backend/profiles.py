@@ -0,0 +1,262 @@
+# backend/profiles.py
+"""
+Perfis de usuário mantidos incrementalmente.
+
+Para cada usuario_id guardamos:
+- "curtidos": item_ids com gostou == 1 (estado atual, última avaliação vale)
+- "soma": soma dos vetores TF-IDF dos itens curtidos que existem no catálogo
+- "n": quantos vetores entraram na soma
+- "versao": incrementada a cada mudança de likes do usuário
+
+O perfil é soma / n, exatamente a média usada antes, mas um like, uma troca
+de like para dislike ou a retirada de um like custa O(nnz de um item).
+O histórico de avaliações só é lido uma vez, na primeira carga. Junto com os
+perfis fica o conjunto de todos os usuario_id (com ou sem likes), para
+existe() responder sem reler o histórico.
+
+No modo compacto (config.MODO_COMPACTO) a soma é uma linha esparsa float32
+em vez de um vetor denso do tamanho do vocabulário, e o perfil entregue
+também: a linha esparsa (1 x V), opcionalmente truncada aos
+PERFIL_MAX_TERMOS termos de maior peso, pontuada sem ser densificada (ver
+vetores.produto_perfil).
+"""
+from __future__ import annotations
+
+import threading
+from typing import Callable, Dict, Optional, Set
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from .config import MODO_COMPACTO, PERFIL_MAX_TERMOS
+from .metrics import etapa
+
+_lock = threading.RLock()
+_perfis: Optional[Dict[int, dict]] = None
+_usuarios: Set[int] = set()  # todos os usuario_id do histórico (cadastro ou avaliação)
+_item_matrix = None
+_item_pos = None  # item_id -> linha, catalogo.PosicoesItens
+# incrementada a cada resetar(): as versões por usuário recomeçam do zero
+_geracao = 0
+
+
+def _soma_vazia():
+    if MODO_COMPACTO:
+        return sp.csr_matrix((1, _item_matrix.shape[1]), dtype=_item_matrix.dtype)
+    return np.zeros(_item_matrix.shape[1])
+
+
+def _novo_perfil() -> dict:
+    return {
+        "curtidos": set(),
+        "soma": _soma_vazia(),
+        "n": 0,
+        "versao": 0,
+    }
+
+
+def _somar_vetor(perfil: dict, vetor, sinal: float) -> None:
+    """soma += sinal * vetor, com vetor uma linha CSR (1 x V)."""
+    if MODO_COMPACTO:
+        perfil["soma"] = perfil["soma"] + vetor if sinal > 0 else perfil["soma"] - vetor
+    else:
+        perfil["soma"][vetor.indices] += sinal * vetor.data
+
+
+def _somar_item(perfil: dict, item_id: int, sinal: float) -> None:
+    pos = _item_pos.get(item_id)
+    if pos is None:
+        return
+    _somar_vetor(perfil, _item_matrix[pos], sinal)
+    perfil["n"] += 1 if sinal > 0 else -1
+    if perfil["n"] == 0:
+        # evita acumular erro de ponto flutuante
+        perfil["soma"] = _soma_vazia()
+
+
+def _soma_linhas(item_matrix, idx):
+    if MODO_COMPACTO:
+        # produto esparso: não materializa um vetor denso por usuário
+        return sp.csr_matrix(np.ones((1, len(idx)), dtype=item_matrix.dtype)) @ item_matrix[idx]
+    return np.asarray(item_matrix[idx].sum(axis=0)).ravel()
+
+
+def resetar() -> None:
+    """Descarta todos os perfis (ex.: o catálogo / modelo mudou)."""
+    global _perfis, _geracao
+    with _lock:
+        _perfis = None
+        _geracao += 1
+
+
+def garantir_carregado(
+    item_matrix,
+    item_pos,
+    load_usuarios_df: Callable[[], pd.DataFrame],
+) -> None:
+    """
+    Monta todos os perfis a partir do histórico, apenas na primeira vez.
+    Troca de modelo passa por resetar(); mudanças de catálogo, por trocar_item().
+    item_pos é o catalogo.PosicoesItens do recommender: as linhas de todos os
+    likes saem de uma busca só.
+    """
+    global _perfis, _usuarios, _item_matrix, _item_pos
+    if _perfis is not None:
+        return
+    with _lock:
+        if _perfis is not None:
+            return
+        _item_matrix = item_matrix
+        _item_pos = item_pos
+
+        usuarios_df = load_usuarios_df()
+        usuarios = set(usuarios_df["usuario_id"].astype(int).tolist())
+        likes = usuarios_df[usuarios_df["gostou"] == 1].dropna(subset=["item_id"])
+
+        perfis: Dict[int, dict] = {}
+        with etapa("carga_perfis"):
+            # a linha de cada like numa busca só (-1 = fora do catálogo)
+            likes = likes.assign(
+                pos=item_pos.posicoes(likes["item_id"].to_numpy(dtype=np.int64))
+            )
+            for usuario_id, grupo in likes.groupby("usuario_id"):
+                perfil = _novo_perfil()
+                ids = grupo["item_id"].astype(int).tolist()
+                linha = dict(zip(ids, grupo["pos"].tolist()))
+                # set da lista, não do dict: set(dict) pré-dimensiona a tabela e
+                # muda a ordem de iteração, e com ela a ordem da soma
+                perfil["curtidos"] = set(ids)
+                idx = [linha[i] for i in perfil["curtidos"] if linha[i] >= 0]
+                if idx:
+                    perfil["soma"] = _soma_linhas(item_matrix, idx)
+                    perfil["n"] = len(idx)
+                perfis[int(usuario_id)] = perfil
+        _usuarios = usuarios
+        _perfis = perfis
+
+
+def trocar_item(item_matrix, item_pos, item_id: int, pos: int, vetor_antigo) -> None:
+    """
+    O catálogo ganhou (vetor_antigo None) ou alterou o item item_id, agora
+    na linha pos de item_matrix. Registra a linha em item_pos (com o lock dos
+    perfis: ninguém vê a linha nova com a matriz antiga) e corrige só os
+    perfis de quem curtiu o item.
+    """
+    global _item_matrix, _item_pos
+    with _lock:
+        _item_matrix, _item_pos = item_matrix, item_pos
+        item_pos[item_id] = pos
+        if _perfis is None:
+            # ainda não carregados: a carga já usa a matriz nova
+            return
+        for perfil in _perfis.values():
+            if item_id not in perfil["curtidos"]:
+                continue
+            if vetor_antigo is not None:
+                _somar_vetor(perfil, vetor_antigo, -1.0)
+                perfil["n"] -= 1
+            _somar_item(perfil, item_id, 1.0)
+            perfil["versao"] += 1
+
+
+def atualizar(usuario_id: int, item_id: int, gostou: bool) -> None:
+    """
+    Aplica uma avaliação ao perfil. Não faz nada se os perfis ainda não foram
+    carregados: a primeira carga já vai ler o evento do histórico.
+    """
+    with _lock:
+        if _perfis is None:
+            return
+        usuario_id, item_id = int(usuario_id), int(item_id)
+        _usuarios.add(usuario_id)
+        perfil = _perfis.get(usuario_id)
+        ja_curtia = perfil is not None and item_id in perfil["curtidos"]
+        if bool(gostou) == ja_curtia:
+            return
+        if perfil is None:
+            perfil = _perfis[usuario_id] = _novo_perfil()
+
+        if gostou:
+            perfil["curtidos"].add(item_id)
+            _somar_item(perfil, item_id, 1.0)
+        else:
+            perfil["curtidos"].discard(item_id)
+            _somar_item(perfil, item_id, -1.0)
+        perfil["versao"] += 1
+
+
+def registrar_usuario(usuario_id: int) -> None:
+    """Usuário cadastrado depois da carga (sem efeito antes dela)."""
+    with _lock:
+        if _perfis is not None:
+            _usuarios.add(int(usuario_id))
+
+
+def existe(usuario_id: int) -> bool:
+    """Se o usuário apareceu no histórico carregado ou depois dele."""
+    return _perfis is not None and int(usuario_id) in _usuarios
+
+
+def curtidos(usuario_id: int) -> Set[int]:
+    perfil = _perfis.get(int(usuario_id)) if _perfis is not None else None
+    return set(perfil["curtidos"]) if perfil else set()
+
+
+def versao(usuario_id: int) -> int:
+    perfil = _perfis.get(int(usuario_id)) if _perfis is not None else None
+    return perfil["versao"] if perfil else 0
+
+
+def geracao() -> int:
+    return _geracao
+
+
+def perfil_vetor(usuario_id: int):
+    """
+    Média dos vetores dos itens curtidos: ndarray 1D ou, no modo compacto,
+    linha CSR (1 x V).
+    """
+    with _lock:
+        perfil = _perfis.get(int(usuario_id)) if _perfis is not None else None
+        if not perfil or not perfil["curtidos"]:
+            raise ValueError(
+                "Usuário ainda não possui likes suficientes para montar o perfil."
+            )
+        if perfil["n"] == 0:
+            raise ValueError(
+                "Itens curtidos pelo usuário não existem mais no catálogo."
+            )
+        vetor = perfil["soma"] / perfil["n"]
+    if MODO_COMPACTO:
+        return _truncar_esparso(vetor)
+    if PERFIL_MAX_TERMOS and np.count_nonzero(vetor) > PERFIL_MAX_TERMOS:
+        # mantém só os termos de maior peso
+        corte = np.argpartition(vetor, -PERFIL_MAX_TERMOS)[:-PERFIL_MAX_TERMOS]
+        vetor[corte] = 0.0
+    return vetor
+
+
+def _truncar_esparso(vetor: sp.csr_matrix) -> sp.csr_matrix:
+    """Só os PERFIL_MAX_TERMOS termos de maior peso da linha esparsa."""
+    if not PERFIL_MAX_TERMOS or vetor.nnz <= PERFIL_MAX_TERMOS:
+        return vetor
+    manter = np.sort(np.argpartition(vetor.data, -PERFIL_MAX_TERMOS)[-PERFIL_MAX_TERMOS:])
+    return sp.csr_matrix(
+        (vetor.data[manter], vetor.indices[manter], [0, len(manter)]), shape=vetor.shape
+    )
+
+
+def bytes_usados() -> int:
+    """Memória ocupada pelas somas dos perfis."""
+    with _lock:
+        if _perfis is None:
+            return 0
+        total = 0
+        for perfil in _perfis.values():
+            soma = perfil["soma"]
+            if sp.issparse(soma):
+                total += soma.data.nbytes + soma.indices.nbytes + soma.indptr.nbytes
+            else:
+                total += soma.nbytes
+        return total
@@ -1,115 +1,337 @@
 # backend/recommender.py
 from __future__ import annotations
 
-from typing import Optional, Dict
+import threading
+from typing import Optional, Dict, List, Tuple
 
 import numpy as np
 import pandas as pd
-from joblib import Parallel, delayed
+import scipy.sparse as sp
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-
-from .config import DATA_DIR
-
-_itens_df: Optional[pd.DataFrame] = None
+from sklearn.preprocessing import normalize
+
+from .config import DATA_DIR, MODO_COMPACTO, SCORING_BACKEND
+from . import (
+    ann,
+    cache_resultados,
+    catalogo,
+    colunar,
+    ingestao,
+    lsa,
+    model_store,
+    precompute,
+    profiles,
+    search,
+)
+from .metrics import (
+    etapa,
+    ITENS_CATALOGO,
+    TERMOS_VOCABULARIO,
+    AVALIACOES_USUARIOS,
+    TAXA_OOV_CATALOGO,
+)
+from .storage import get_storage
+from .scoring import score_items, sparse_scores_lote, top_k_indices
+from .vetores import normalizar_linhas
+
+# catálogo do fit, coluna a coluna no artefato (memory-map, ver _itens_novos)
+_itens_base: Optional[colunar.Tabela] = None
 _avaliacoes_df: Optional[pd.DataFrame] = None
+_avaliacoes_assinatura: Optional[tuple] = None  # (inode, mtime, tamanho) do avaliacoes.csv
+# (assinatura do avaliacoes.csv, threshold) -> item_ids relevantes
+_relevantes_cache: Dict[tuple, np.ndarray] = {}
 _usuarios_df: Optional[pd.DataFrame] = None
+_usuarios_assinatura: Optional[tuple] = None  # ver storage.assinatura()
+# protege _usuarios_assinatura entre a escrita e a conferência da assinatura
+_usuarios_lock = threading.Lock()
 
 _vectorizer: Optional[TfidfVectorizer] = None
+# csr_matrix do fit; com itens ingeridos depois dele, catalogo.MatrizItens
 _item_matrix = None
+# item_id -> linha (viva) em _item_matrix, ver catalogo.PosicoesItens
+_item_pos: Optional[catalogo.PosicoesItens] = None
+_modelo_hash: Optional[str] = None  # ver catalogo.hash_catalogo (itens.csv + itens.log)
+_search_index: Optional[dict] = None  # ver backend/search.py
+_genero_pos: Dict[str, np.ndarray] = {}  # gênero (minúsculo) -> linhas do gênero (do fit)
+_catalogo_versao = 0  # incrementada a cada item ingerido/alterado (backend/catalogo.py)
+
+# Itens ingeridos depois do fit (POST/PATCH /itens), só anexados, ver
+# backend/catalogo.py. A linha len(_itens_base) + i é _itens_novos[i].
+_linhas_novas: Optional[catalogo.LinhasNovas] = None
+_itens_novos: List[dict] = []
+_slots_novos: List[int] = []  # posição de listagem de cada linha nova
+_genero_novos: Dict[str, List[int]] = {}  # gênero (minúsculo) -> linhas novas
+_mortas = np.empty(0, dtype=np.int64)  # linhas substituídas por um PATCH (ordenadas)
+_maior_item_id = 0
+_log_aplicado = 0  # bytes do itens.log já aplicados ao catálogo em memória
+
+# média mínima de 'gostou' no gabarito para um item ser relevante nas métricas
+LIMIAR_RELEVANCIA = 0.6
+
+STOPWORDS_PT = [
+    'a', 'o', 'e', 'de', 'do', 'da', 'em', 'um', 'uma', 'que', 'é',
+    'para', 'com', 'não', 'no', 'na', 'os', 'as', 'por', 'mais', 'menos',
+    'seu', 'sua', 'isso', 'também', 'ou', 'mas', 'se', 'então', 'quando',
+    'onde', 'como', 'porque'
+]
 
-def _global_relevantes(threshold: float = 0.5):
+def _global_relevantes(threshold: float = 0.5) -> np.ndarray:
     """
     Define quais itens são relevantes globalmente, com base no gabarito (avaliacoes.csv).
     threshold = média mínima de 'gostou' para um item ser considerado relevante.
+    Retorna os item_ids ordenados; o groupby só roda de novo quando o
+    avaliacoes.csv muda.
+    """
+    _ensure_avaliacoes()
+    # assinatura antes do df: _ensure_avaliacoes troca o df antes da assinatura
+    chave = (_avaliacoes_assinatura, threshold)
+    aval = _avaliacoes_df
+    relevantes = _relevantes_cache.get(chave)
+    if relevantes is None:
+        if aval.empty:
+            relevantes = np.empty(0, dtype=np.int64)
+        else:
+            media_por_item = aval.groupby("item_id")["gostou"].mean()
+            relevantes = np.sort(
+                media_por_item[media_por_item >= threshold].index.to_numpy(dtype=np.int64)
+            )
+        _relevantes_cache[chave] = relevantes
+    return relevantes
+
+def _blocos_catalogo(bytes_log: int):
+    """
+    Catálogo do fit em blocos tipados: itens.csv com as alterações dos
+    primeiros bytes_log bytes do itens.log (as mesmas do hash_catalogo).
+    """
+    entradas, _ = catalogo.ler_log(0, bytes_log)
+    return catalogo.aplicar_log_em_blocos(
+        ingestao.ler_blocos(DATA_DIR / "itens.csv"), entradas
+    )
+
+
+def _fit_model(bytes_log: int):
+    """
+    Ajusta o TF-IDF sobre o catálogo em duas passadas pelos blocos (ver
+    backend/ingestao.py), sem carregar o catálogo inteiro. Retorna
+    (vectorizer, blocos, n_itens, nnz), os argumentos de model_store.salvar:
+    a segunda passada só roda enquanto o artefato é gravado.
     """
-    aval = load_avaliacoes_df()
-    if aval.empty:
-        return set()
+    with etapa("fit_modelo"):
+        vectorizer, n_itens, nnz = ingestao.ajustar_tfidf(
+            _blocos_catalogo(bytes_log),
+            STOPWORDS_PT,
+            dtype=np.float32 if MODO_COMPACTO else np.float64,
+        )
+    # linhas normalizadas (L2): o cosseno vira um simples produto escalar
+    blocos = ingestao.transformar_blocos(_blocos_catalogo(bytes_log), vectorizer)
+    return vectorizer, blocos, n_itens, nnz
+
+
+def build_model_artifact():
+    """Refaz o fit e grava o artefato do catálogo atual (etapa de build)."""
+    _, bytes_log = catalogo.ler_log()
+    return model_store.salvar(
+        *_fit_model(bytes_log),
+        catalogo.hash_catalogo(DATA_DIR / "itens.csv", bytes_log),
+    )
 
-    media_por_item = aval.groupby("item_id")["gostou"].mean()
-    relevantes = media_por_item[media_por_item >= threshold].index.tolist()
-    return set(int(i) for i in relevantes)
 
-def _ensure_itens_loaded() -> pd.DataFrame:
-    global _itens_df
-    if _itens_df is None:
+def _ensure_model():
+    """
+    Carrega o modelo do artefato em disco (memory-map) correspondente ao hash
+    do catálogo atual. Só refaz o fit se o catálogo mudou, e com vários
+    workers só um deles faz o fit: os demais abrem o mesmo artefato. Depois
+    da carga, aplica as alterações que outros workers anexaram ao itens.log.
+    O catálogo do fit também vem do artefato (metadados, ids e busca), então
+    nenhum worker guarda uma cópia própria dele.
+    """
+    global _vectorizer, _item_matrix, _item_pos, _itens_base, _modelo_hash, _search_index
+    global _genero_pos, _linhas_novas, _itens_novos, _slots_novos, _genero_novos, _mortas
+    global _maior_item_id, _log_aplicado
+    if _vectorizer is None or _item_matrix is None:
         path = DATA_DIR / "itens.csv"
         if not path.exists():
             raise RuntimeError(
                 f"Arquivo itens.csv não encontrado em {path}. Rode backend/data/setup_data.py."
             )
-        df = pd.read_csv(path)
-        df["genero"] = df["genero"].fillna("desconhecido").astype(str)
-        df["tags"] = df["tags"].fillna("").astype(str)
-        df["palavra_chave"] = df["palavra_chave"].fillna("").astype(str)
-        df["humor"] = df["humor"].fillna("").astype(str)
-        df["instrumentacao"] = df["instrumentacao"].fillna("").astype(str)
-        df["idioma"] = df["idioma"].fillna("").astype(str)
-        df["descricao"] = df["descricao"].fillna("").astype(str)
-        _itens_df = df
-    return _itens_df
-
-
-def _build_feature_text(row: pd.Series) -> str:
-    parts = [
-        row["genero"],
-        row["tags"],
-        row["palavra_chave"],
-        row["humor"],
-        row["instrumentacao"],
-        row["idioma"],
-        row["descricao"],
-    ]
-    return " ".join(str(p) for p in parts if p)
+        # o catálogo = itens.csv com as alterações do itens.log (ver catalogo.py)
+        _, bytes_log = catalogo.ler_log()
+        hash_itens = catalogo.hash_catalogo(path, bytes_log)
+        with etapa("carga_modelo"):
+            modelo = model_store.carregar_ou_construir(
+                hash_itens,
+                lambda: _fit_model(bytes_log),
+                dtype="float32" if MODO_COMPACTO else "float64",
+            )
+        _vectorizer, _item_matrix = modelo["vectorizer"], modelo["item_matrix"]
+        _item_pos = catalogo.PosicoesItens(modelo["ids_ordenados"], modelo["ids_ordem"])
+        _genero_pos = modelo["genero_pos"]
+        _itens_base = itens = modelo["itens"]
+        _modelo_hash = hash_itens
+        _search_index = search.construir_indice(modelo["busca"], len(itens), itens.textos)
+        _linhas_novas, _itens_novos, _slots_novos, _genero_novos = None, [], [], {}
+        _mortas = np.empty(0, dtype=np.int64)
+        ids = modelo["ids_ordenados"]
+        _maior_item_id = int(ids[-1]) if len(ids) else 0
+        _log_aplicado = bytes_log
+        if SCORING_BACKEND == "ann":
+            with etapa("indice_ann"):
+                ann.construir(_item_matrix)
+        elif SCORING_BACKEND == "lsa":
+            with etapa("indice_lsa"):
+                lsa.construir(_item_matrix)
+        _resetar_perfis()
+        catalogo.resetar_drift()
+        ITENS_CATALOGO.set(len(itens))
+        TERMOS_VOCABULARIO.set(len(_vectorizer.vocabulary_))
+    _sincronizar_catalogo()
+
+
+def _sincronizar_catalogo() -> None:
+    """Aplica as linhas do itens.log que este processo ainda não viu."""
+    global _log_aplicado
+    if catalogo.tamanho_log() <= _log_aplicado:
+        return
+    with catalogo.lock:
+        entradas, fim = catalogo.ler_log(_log_aplicado)
+        for item in entradas:
+            _aplicar_item(item)
+        _log_aplicado = fim
+
+
+def _linhas_itens(linhas) -> pd.DataFrame:
+    """
+    Linhas do catálogo (posições em _item_matrix), na ordem pedida. Só as
+    linhas pedidas são lidas do catálogo do artefato.
+    """
+    linhas = np.asarray(linhas, dtype=np.int64)
+    n_base = len(_itens_base)
+    novas = linhas >= n_base
+    if not novas.any():
+        return _itens_base.linhas(linhas)
+    novos = pd.DataFrame(
+        [_itens_novos[p - n_base] for p in linhas[novas]], columns=_itens_base.colunas
+    )
+    if novas.all():
+        return novos
+    # o concat perde o dtype categórico (e troca None por NaN); tipar_itens refaz
+    df = ingestao.tipar_itens(
+        pd.concat([_itens_base.linhas(linhas[~novas]), novos], ignore_index=True)
+    )
+    origem = np.concatenate([np.flatnonzero(~novas), np.flatnonzero(novas)])
+    return df.iloc[np.argsort(origem)].reset_index(drop=True)
 
 
-def _ensure_model():
+def _vivas(linhas: np.ndarray) -> np.ndarray:
+    """Máscara das linhas que não foram substituídas por um PATCH."""
+    mortas = _mortas
+    if not len(mortas):
+        return np.ones(len(linhas), dtype=bool)
+    i = np.minimum(np.searchsorted(mortas, linhas), len(mortas) - 1)
+    return mortas[i] != linhas
 
-    stopwords_pt = [
-    'a', 'o', 'e', 'de', 'do', 'da', 'em', 'um', 'uma', 'que', 'é',
-    'para', 'com', 'não', 'no', 'na', 'os', 'as', 'por', 'mais', 'menos',
-    'seu', 'sua', 'isso', 'também', 'ou', 'mas', 'se', 'então', 'quando',
-    'onde', 'como', 'porque'
-    ]
 
-    global _vectorizer, _item_matrix, _itens_df
-    itens = _ensure_itens_loaded()
-    if _vectorizer is None or _item_matrix is None:
-        itens = itens.copy()
-        itens["feature_text"] = itens.apply(_build_feature_text, axis=1)
-        _vectorizer = TfidfVectorizer(stop_words=stopwords_pt)
-        _item_matrix = _vectorizer.fit_transform(itens["feature_text"])
-        _itens_df = itens
+def _em_listagem(linhas: np.ndarray) -> np.ndarray:
+    """
+    Só as linhas vivas, na ordem da listagem do catálogo: um item alterado
+    continua no lugar em que estava, mesmo com a linha nova no fim.
+    """
+    linhas = linhas[_vivas(linhas)]
+    n_base = len(_itens_base)
+    novas = linhas >= n_base
+    if not novas.any():
+        return linhas
+    slots = linhas.copy()
+    slots[novas] = [_slots_novos[p - n_base] for p in linhas[novas]]
+    return linhas[np.argsort(slots, kind="stable")]
+
+
+def _itens_vivos() -> pd.DataFrame:
+    """O catálogo atual (sem as versões substituídas), na ordem da listagem."""
+    n = len(_itens_base) + len(_itens_novos)
+    return _linhas_itens(_em_listagem(np.arange(n)))
+
+
+def _itens_por_id(item_ids) -> pd.DataFrame:
+    """Versão atual dos itens de item_ids que estão no catálogo."""
+    pos = _item_pos.posicoes(pd.Series(item_ids).dropna().to_numpy(dtype=np.int64))
+    return _linhas_itens(np.unique(pos[pos >= 0]))
 
 
 def get_itens_df() -> pd.DataFrame:
     _ensure_model()
-    return _itens_df.copy()
+    return _itens_vivos()
+
+
+def buscar_itens(q: str) -> pd.DataFrame:
+    """Itens cujo nome, artista ou tags contêm q (sem diferenciar maiúsculas)."""
+    _ensure_model()
+    posicoes = search.buscar(_search_index, q)
+    return _linhas_itens(_em_listagem(posicoes))
+
+
+def _ensure_avaliacoes() -> None:
+    """Carrega o gabarito; relê (e descarta os relevantes) se o arquivo mudou."""
+    global _avaliacoes_df, _avaliacoes_assinatura
+    path = DATA_DIR / "avaliacoes.csv"
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        raise RuntimeError(
+            f"Arquivo avaliacoes.csv não encontrado em {path}. Rode backend/data/setup_data.py."
+        )
+    assinatura = (st.st_ino, st.st_mtime_ns, st.st_size)
+    if _avaliacoes_df is not None and assinatura == _avaliacoes_assinatura:
+        return
+    with etapa("carga_avaliacoes"):
+        df = colunar.ler_csv(path)
+    df["gostou"] = df["gostou"].astype(int)
+    _relevantes_cache.clear()
+    _avaliacoes_df = df
+    _avaliacoes_assinatura = assinatura
 
 
 def load_avaliacoes_df() -> pd.DataFrame:
-    global _avaliacoes_df
-    if _avaliacoes_df is None:
-        path = DATA_DIR / "avaliacoes.csv"
-        if not path.exists():
-            raise RuntimeError(
-                f"Arquivo avaliacoes.csv não encontrado em {path}. Rode backend/data/setup_data.py."
-            )
-        df = pd.read_csv(path)
-        df["gostou"] = df["gostou"].astype(int)
-        _avaliacoes_df = df
+    _ensure_avaliacoes()
     return _avaliacoes_df.copy()
 
 
 def load_usuarios_df() -> pd.DataFrame:
-    global _usuarios_df
-    path = DATA_DIR / "usuarios.csv"
-    if path.exists():
-        df = pd.read_csv(path)
-    else:
-        df = pd.DataFrame(columns=["usuario_id", "nome", "item_id", "gostou", "origem"])
-
+    """
+    Avaliações dos usuários, com cache em memória.
+    Só relê os arquivos quando eles mudam (inode/mtime/tamanho) ou quando
+    houve escrita pelo próprio backend. Retorna uma visão rasa do cache:
+    trate-a como somente leitura.
+    """
+    global _usuarios_df, _usuarios_assinatura
+    storage = get_storage()
+    assinatura = storage.assinatura()
+    if _usuarios_df is not None and assinatura == _usuarios_assinatura:
+        return _usuarios_df.copy(deep=False)
+    with _usuarios_lock:
+        # relida com o lock: uma escrita local entre as duas leituras já
+        # anotou a própria assinatura (_anotar_escrita)
+        assinatura = storage.assinatura()
+        mudou = _usuarios_assinatura is not None and assinatura != _usuarios_assinatura
+        _usuarios_df = None
+        _usuarios_assinatura = assinatura
+    if mudou:
+        # outro processo escreveu: os perfis em memória ficaram desatualizados
+        _resetar_perfis()
+
+    # CSV (snapshot + log de eventos) ou SQLite, ver backend/storage.py
+    with etapa("carga_usuarios"):
+        df = _tipar_usuarios(storage.ler_usuarios())
+    AVALIACOES_USUARIOS.set(int(df["item_id"].notna().sum()) if "item_id" in df.columns else 0)
+
+    with _usuarios_lock:
+        # uma escrita no meio da leitura já trocou a assinatura: não guarda df
+        if _usuarios_assinatura == assinatura:
+            _usuarios_df = df
+    return df.copy(deep=False)
+
+
+def _tipar_usuarios(df: pd.DataFrame) -> pd.DataFrame:
     if not df.empty:
         if "usuario_id" in df.columns:
             df["usuario_id"] = df["usuario_id"].astype(int)
@@ -117,89 +339,308 @@ def load_usuarios_df() -> pd.DataFrame:
             df["nome"] = df["nome"].astype(str)
         if "gostou" in df.columns:
             df["gostou"] = df["gostou"].fillna(0).astype(int)
+    return df
 
-    _usuarios_df = df
-    return _usuarios_df.copy()
+
+def registros_usuario(usuario_id: int) -> pd.DataFrame:
+    """
+    Avaliações de um único usuário. Usa o cache se ele está atualizado; no
+    SQLite faz uma leitura só das linhas do usuário (índice por usuario_id).
+    """
+    storage = get_storage()
+    if storage.leitura_por_usuario and (
+        _usuarios_df is None or storage.assinatura() != _usuarios_assinatura
+    ):
+        return _tipar_usuarios(storage.ler_usuario(usuario_id))
+    usuarios = load_usuarios_df()
+    return usuarios[usuarios["usuario_id"] == usuario_id]
 
 
 def salvar_usuarios_df(df: pd.DataFrame) -> None:
-    global _usuarios_df
-    path = DATA_DIR / "usuarios.csv"
-    df.to_csv(path, index=False)
-    _usuarios_df = df.copy()
+    """Substitui todas as avaliações armazenadas por df."""
+    global _usuarios_df, _usuarios_assinatura
+    with _usuarios_lock:
+        get_storage().substituir_tudo(df)
+        _usuarios_df = None
+        _usuarios_assinatura = None
+    _resetar_perfis()
+
+
+def _anotar_escrita(antes: tuple, depois: tuple) -> bool:
+    """
+    Anota a própria escrita (assinaturas de antes/depois, ver storage.py) sem
+    reler o histórico. Retorna True se a de antes não é a última lida, isto
+    é, outro processo escreveu desde então e os perfis e o cache de
+    resultados devem ser descartados, como em load_usuarios_df. Chamado com
+    _usuarios_lock; o descarte fica para depois de soltá-lo (profiles tem o
+    próprio lock, que garantir_carregado segura ao chamar load_usuarios_df).
+    """
+    global _usuarios_df, _usuarios_assinatura
+    mudou = _usuarios_assinatura is not None and antes != _usuarios_assinatura
+    _usuarios_df = None
+    _usuarios_assinatura = depois
+    return mudou
+
 
+def criar_usuario(nome: str) -> int:
+    """Cadastra um usuário e retorna o novo usuario_id."""
+    with _usuarios_lock:
+        novo_id, antes, depois = get_storage().criar_usuario(nome)
+        mudou = _anotar_escrita(antes, depois)
+    if mudou:
+        _resetar_perfis()
+    profiles.registrar_usuario(novo_id)
+    return novo_id
 
-def _user_profile_vector(usuario_id: int, usuarios_df: pd.DataFrame):
+
+def usuario_existe(usuario_id: int) -> bool:
+    """
+    Se o usuário tem cadastro ou avaliações. Responde pelos ids guardados
+    com os perfis (profiles.existe), sem reler o histórico a cada escrita;
+    só um id desconhecido consulta o armazenamento, e só se ele mudou desde
+    a última leitura (ex.: cadastro feito por outro worker).
+    """
+    _ensure_perfis()
+    if profiles.existe(usuario_id):
+        return True
+    storage = get_storage()
+    if _usuarios_df is not None and storage.assinatura() == _usuarios_assinatura:
+        return False
+    if storage.leitura_por_usuario:
+        # SQLite: consulta pelo índice (usuario_id, item_id)
+        return not storage.ler_usuario(usuario_id).empty
+    return bool((load_usuarios_df()["usuario_id"] == usuario_id).any())
+
+
+def _resetar_perfis() -> None:
+    profiles.resetar()
+    cache_resultados.limpar()
+
+
+def _ensure_perfis() -> None:
     _ensure_model()
-    liked_ids = usuarios_df[
-        (usuarios_df["usuario_id"] == usuario_id) & (usuarios_df["gostou"] == 1)
-    ]["item_id"].dropna().unique()
+    profiles.garantir_carregado(_item_matrix, _item_pos, load_usuarios_df)
 
-    if len(liked_ids) == 0:
-        raise ValueError(
-            "Usuário ainda não possui likes suficientes para montar o perfil."
-        )
 
-    itens = _ensure_itens_loaded()
-    liked_idx = itens.index[itens["item_id"].isin(liked_ids)].tolist()
-    if not liked_idx:
-        raise ValueError(
-            "Itens curtidos pelo usuário não existem mais no catálogo."
-        )
+def _user_profile_vector(usuario_id: int):
+    """
+    Perfil = média dos vetores dos itens curtidos, mantida incrementalmente
+    por backend/profiles.py (não relê o histórico de avaliações).
+    """
+    _ensure_perfis()
+    with etapa("perfil"):
+        return profiles.perfil_vetor(usuario_id)
+
 
-    liked_vectors = _item_matrix[liked_idx]
-    profile = liked_vectors.mean(axis=0)  # ainda é np.matrix
-    # converte para ndarray 1D para evitar o erro do np.matrix
-    profile = np.asarray(profile).ravel()
-    return profile
+def _linhas_candidatas(genero: Optional[str], n: int) -> Optional[np.ndarray]:
+    """
+    Linhas do gênero pedido (posting list), ou None para o catálogo todo.
+    n = linhas da matriz que vai ser pontuada (ignora as anexadas depois).
+    """
+    if not genero:
+        return None
+    linhas = _genero_pos.get(genero.lower(), np.empty(0, dtype=np.int64))
+    novas = _genero_novos.get(genero.lower())
+    if novas:
+        linhas = np.concatenate([linhas, np.array(novas, dtype=np.int64)])
+        linhas = linhas[: np.searchsorted(linhas, n)]
+    return linhas
+
+
+def _indices_curtidos(
+    usuario_id: int, linhas: Optional[np.ndarray], n: int
+) -> np.ndarray:
+    """
+    Índices dos itens curtidos pelo usuário no vetor de similaridades: com
+    linhas (ordenadas), índices em linhas; sem, posições em _item_matrix
+    menores que n (as linhas pontuadas).
+    """
+    curtidos = profiles.curtidos(usuario_id)
+    pos = _item_pos.posicoes(np.fromiter(curtidos, dtype=np.int64, count=len(curtidos)))
+    pos = pos[pos >= 0]
+    if linhas is None:
+        return pos[pos < n]
+    if not len(pos) or not len(linhas):
+        return np.empty(0, dtype=np.int64)
+    i = np.minimum(np.searchsorted(linhas, pos), len(linhas) - 1)
+    return i[linhas[i] == pos]
+
+
+def _selecionar(
+    linhas: Optional[np.ndarray],
+    sims: np.ndarray,
+    usuario_id: int,
+    top_k: Optional[int],
+) -> pd.DataFrame:
+    """Remove itens já curtidos / sem nota e devolve os top_k em ordem."""
+    with etapa("filtragem"):
+        # NaN = item não avaliado pelo backend (ex.: fora dos candidatos do ANN)
+        ok = ~np.isnan(sims)
+        ok[_indices_curtidos(usuario_id, linhas, len(sims))] = False
+        if linhas is None:
+            linhas = np.arange(len(sims))
+            mortas = _mortas
+            ok[mortas[mortas < len(sims)]] = False
+        elif len(_mortas):
+            ok &= _vivas(linhas)
+        linhas, sims = linhas[ok], sims[ok]
+
+    with etapa("top_k"):
+        ordem = top_k_indices(sims, top_k)
+    df = _linhas_itens(linhas[ordem])
+    df["similaridade"] = sims[ordem]
+    return df
+
+
+def _precomputado(
+    usuario_id: int, top_k: Optional[int], genero: Optional[str]
+) -> Optional[pd.DataFrame]:
+    """
+    Top-N gravado por backend/precompute.py, se ainda vale para os likes
+    atuais do usuário e para o catálogo carregado; None = calcular ao vivo.
+    """
+    if _catalogo_versao:
+        # catálogo alterado desde a carga (POST/PATCH /itens)
+        return None
+    entrada = precompute.obter(_modelo_hash, usuario_id, profiles.curtidos(usuario_id))
+    if entrada is None:
+        return None
+    item_ids, sims, completo = entrada
+    linhas = _item_pos.posicoes(item_ids)
+    if (linhas < 0).any():
+        return None
+    if genero:
+        ok = np.isin(linhas, _linhas_candidatas(genero, _item_matrix.shape[0]))
+        linhas, sims = linhas[ok], sims[ok]
+    if not completo and (top_k is None or len(linhas) < top_k):
+        # o filtro deixou menos que top_k itens do top-N truncado
+        precompute.CONSULTAS.inc(resultado="insuficiente")
+        return None
+    precompute.CONSULTAS.inc(resultado="servido")
+    df = _linhas_itens(linhas[:top_k])
+    df["similaridade"] = np.asarray(sims[:top_k])
+    return df
 
 
 def recommend_for_user(
     usuario_id: int,
     top_k: int = 10,
     genero: Optional[str] = None,
+    backend: Optional[str] = None,
 ) -> pd.DataFrame:
     """
     Gera recomendações baseado apenas nos atributos dos itens (TF-IDF + cosseno).
-    Usa joblib.Parallel para paralelizar o cálculo de similaridade.
+    As similaridades são calculadas por backend.scoring; por padrão com um único
+    produto matriz esparsa × vetor (config.SCORING_BACKEND).
+    Com gênero, só as linhas daquele gênero são pontuadas.
+    O resultado fica no cache LRU (backend/cache_resultados.py) até o usuário
+    mudar seus likes ou o catálogo mudar. Se o job backend/precompute.py
+    gravou um top-N ainda válido para o usuário, ele é servido sem pontuar.
     """
-    _ensure_model()
-    itens = _ensure_itens_loaded()
-    usuarios_df = load_usuarios_df()
-    profile = _user_profile_vector(usuario_id, usuarios_df)
-    n_items = _item_matrix.shape[0]
-
-    def sim_for_idx(i: int) -> float:
-        # linha i da matriz TF-IDF (sparse)
-        v_sparse = _item_matrix[i]
-        # converte para array 1D
-        v = v_sparse.toarray().ravel()
-        s = cosine_similarity(
-            profile.reshape(1, -1),
-            v.reshape(1, -1),
-        )[0, 0]
-        return float(s)
-
-    # Paralelismo aqui
-    sims = Parallel(n_jobs=-1)(delayed(sim_for_idx)(i) for i in range(n_items))
-
-    itens = itens.copy()
-    itens["similaridade"] = np.array(sims)
-
-    liked_ids = usuarios_df[
-        (usuarios_df["usuario_id"] == usuario_id) & (usuarios_df["gostou"] == 1)
-    ]["item_id"].dropna().unique()
-
-    mask = ~itens["item_id"].isin(liked_ids)
-
-    if genero:
-        mask &= itens["genero"].str.lower() == genero.lower()
+    _ensure_perfis()
+    backend = backend or SCORING_BACKEND
+    chave = (
+        int(usuario_id),
+        profiles.versao(usuario_id),
+        profiles.geracao(),
+        genero.lower() if genero else None,
+        top_k,
+        backend,
+        _catalogo_versao,
+    )
+    em_cache = cache_resultados.obter(chave)
+    if em_cache is not None:
+        return em_cache
+
+    recs = None
+    if backend in precompute.BACKENDS_EXATOS:
+        with etapa("precomputado"):
+            recs = _precomputado(usuario_id, top_k, genero)
+    if recs is None:
+        profile = _user_profile_vector(usuario_id)
+
+        matriz = _item_matrix
+        linhas = _linhas_candidatas(genero, matriz.shape[0])
+        # itens que o backend aproximado precisa pontuar: os top_k mais os
+        # que _selecionar descarta (curtidos e versões substituídas)
+        if top_k is None:
+            minimo = matriz.shape[0]
+        else:
+            minimo = top_k + len(profiles.curtidos(usuario_id)) + len(_mortas)
+        with etapa("similaridade"):
+            sims = score_items(matriz, profile, backend, linhas, minimo)
+        recs = _selecionar(linhas, sims, usuario_id, top_k)
+    cache_resultados.guardar(chave, recs)
+    return recs
+
+
+def recommend_for_users(
+    usuario_ids: List[int],
+    top_k: int = 10,
+    genero: Optional[str] = None,
+    bloco: int = 64,
+) -> Tuple[Dict[int, pd.DataFrame], Dict[int, str]]:
+    """
+    Recomendações para vários usuários de uma vez.
+    Por bloco de usuários, os perfis (normalizados) são empilhados numa
+    matriz densa e pontuados contra _item_matrix num único produto esparso ×
+    denso (scoring.sparse_scores_lote), com as similaridades de cada usuário
+    numa linha contígua. Itens curtidos e versões substituídas recebem -inf
+    em vez de filtrar cada linha, e os itens de todo o bloco saem de uma
+    única leitura do catálogo. Retorna (recomendações por usuário, erro por
+    usuário).
+    """
+    _ensure_perfis()
 
-    candidatos = itens[mask]
-    candidatos = candidatos.sort_values("similaridade", ascending=False)
-    if top_k is not None:
-        candidatos = candidatos.head(top_k)
-    return candidatos.reset_index(drop=True)
+    matriz = _item_matrix
+    n = matriz.shape[0]
+    linhas = _linhas_candidatas(genero, n)
+    if linhas is None:
+        mortas = _mortas[_mortas < n]
+    else:
+        matriz = matriz[linhas]
+        mortas = np.flatnonzero(~_vivas(linhas))
+
+    recs: Dict[int, pd.DataFrame] = {}
+    erros: Dict[int, str] = {}
+    usuarios = list(dict.fromkeys(int(u) for u in usuario_ids))
+    for ini in range(0, len(usuarios), bloco):
+        perfis: List[np.ndarray] = []
+        ids_bloco: List[int] = []
+        for usuario_id in usuarios[ini : ini + bloco]:
+            try:
+                perfis.append(profiles.perfil_vetor(usuario_id))
+            except ValueError as e:
+                erros[usuario_id] = str(e)
+                continue
+            ids_bloco.append(usuario_id)
+        if not ids_bloco:
+            continue
+
+        # perfis esparsos (modo compacto) só viram densos aqui, um bloco por vez
+        P = sp.vstack(perfis).toarray() if MODO_COMPACTO else np.vstack(perfis)
+        with etapa("similaridade_lote"):
+            sims = sparse_scores_lote(matriz, normalizar_linhas(P))
+        sims[:, mortas] = -np.inf
+
+        escolhidas: List[np.ndarray] = []
+        with etapa("top_k"):
+            for j, usuario_id in enumerate(ids_bloco):
+                sims_usuario = sims[j]
+                sims_usuario[_indices_curtidos(usuario_id, linhas, n)] = -np.inf
+                ordem = top_k_indices(sims_usuario, top_k)
+                escolhidas.append(ordem[sims_usuario[ordem] > -np.inf])
+
+        selecionadas = np.concatenate(escolhidas)
+        df = _linhas_itens(selecionadas if linhas is None else linhas[selecionadas])
+        usuario_de = np.repeat(np.arange(len(ids_bloco)), [len(e) for e in escolhidas])
+        df["similaridade"] = sims[usuario_de, selecionadas]
+        fim = 0
+        for usuario_id, ordem in zip(ids_bloco, escolhidas):
+            ini_df, fim = fim, fim + len(ordem)
+            recs[usuario_id] = df.iloc[ini_df:fim].reset_index(drop=True)
+
+    return recs, erros
 
 
 def compute_metricas(usuario_id: int) -> Dict[str, float]:
@@ -211,13 +652,10 @@ def compute_metricas(usuario_id: int) -> Dict[str, float]:
       - relevância é definida globalmente por item (média de 'gostou' no gabarito);
       - hits = recomendações que o usuário gostou E que são relevantes no gabarito.
     """
-    aval = load_avaliacoes_df()
-    usuarios = load_usuarios_df()
-
-    relevantes = _global_relevantes(threshold=0.6)
+    relevantes = _global_relevantes(threshold=LIMIAR_RELEVANCIA)
 
     # Todas as avaliações do usuário no sistema
-    regs_usuario = usuarios[usuarios["usuario_id"] == usuario_id]
+    regs_usuario = registros_usuario(usuario_id)
 
     # Apenas avaliações feitas na aba Recomendador
     regs_rec = regs_usuario[regs_usuario["origem"] == "recomendador"]
@@ -236,15 +674,14 @@ def compute_metricas(usuario_id: int) -> Dict[str, float]:
     recomendados = set(int(i) for i in regs_rec["item_id"].dropna().tolist())
 
     # Hits: recomendados que são relevantes globalmente e que o usuário marcou como gostou=1
-    hits = 0
-    for _, row in regs_rec.iterrows():
-        item_id = int(row["item_id"])
-        if item_id in relevantes and int(row["gostou"]) == 1:
-            hits += 1
+    hits = int(
+        (regs_rec["item_id"].isin(relevantes) & (regs_rec["gostou"] == 1)).sum()
+    )
+
+    return _metricas(hits, len(recomendados), len(relevantes))
 
-    n_recomendados = len(recomendados)
-    n_relevantes = len(relevantes)
 
+def _metricas(hits: int, n_recomendados: int, n_relevantes: int) -> Dict[str, float]:
     precision = hits / n_recomendados if n_recomendados else 0.0
     recall = hits / n_relevantes if n_relevantes else 0.0
     f1 = (
@@ -262,17 +699,48 @@ def compute_metricas(usuario_id: int) -> Dict[str, float]:
         "relevantes": n_relevantes,
     }
 
-def genero_stats(usuario_id: int) -> Dict[str, Dict[str, int]]:
+
+def compute_metricas_todos() -> List[Dict[str, float]]:
+    """
+    compute_metricas para todos os usuários numa única passada: um filtro
+    pela origem, um isin contra os relevantes e um groupby por usuário.
+    """
+    relevantes = _global_relevantes(threshold=LIMIAR_RELEVANCIA)
     usuarios = load_usuarios_df()
-    itens = _ensure_itens_loaded()
+    if usuarios.empty:
+        return []
+
+    regs_rec = usuarios[usuarios["origem"] == "recomendador"]
+    hit = regs_rec["item_id"].isin(relevantes) & (regs_rec["gostou"] == 1)
+    por_usuario = pd.DataFrame(
+        {
+            "usuario_id": regs_rec["usuario_id"],
+            "item_id": regs_rec["item_id"],
+            "hit": hit.astype(int),
+        }
+    ).groupby("usuario_id").agg(hits=("hit", "sum"), recomendados=("item_id", "nunique"))
+
+    resultado = []
+    for usuario_id in np.sort(usuarios["usuario_id"].unique()):
+        if usuario_id in por_usuario.index:
+            linha = por_usuario.loc[usuario_id]
+            m = _metricas(int(linha["hits"]), int(linha["recomendados"]), len(relevantes))
+        else:
+            m = _metricas(0, 0, len(relevantes))
+        resultado.append({"usuario_id": int(usuario_id), **m})
+    return resultado
+
+def genero_stats(usuario_id: int) -> Dict[str, Dict[str, int]]:
+    _ensure_model()
 
-    regs = usuarios[usuarios["usuario_id"] == usuario_id]
+    regs = registros_usuario(usuario_id)
     if regs.empty:
         return {}
+    itens = _itens_por_id(regs["item_id"])
 
     merged = regs.merge(itens[["item_id", "genero"]], on="item_id", how="left")
     stats: Dict[str, Dict[str, int]] = {}
-    for genero, grupo in merged.groupby("genero"):
+    for genero, grupo in merged.groupby("genero", observed=True):
         total = len(grupo)
         likes = int((grupo["gostou"] == 1).sum())
         stats[genero] = {"likes": likes, "total": int(total)}
@@ -280,11 +748,11 @@ def genero_stats(usuario_id: int) -> Dict[str, Dict[str, int]]:
 
 
 def user_ratings(usuario_id: int) -> pd.DataFrame:
-    usuarios = load_usuarios_df()
-    itens = _ensure_itens_loaded()
-    regs = usuarios[usuarios["usuario_id"] == usuario_id]
+    _ensure_model()
+    regs = registros_usuario(usuario_id)
     if regs.empty:
         return pd.DataFrame()
+    itens = _itens_por_id(regs["item_id"])
     merged = regs.merge(
         itens[["item_id", "nome", "genero", "artista"]],
         on="item_id",
@@ -292,35 +760,151 @@ def user_ratings(usuario_id: int) -> pd.DataFrame:
     )
     return merged
 
-# em backend/recommender.py
-
 def registrar_avaliacao(usuario_id: int, item_id: int, gostou: bool, origem: str):
     """
     Registra uma avaliação de forma idempotente:
-    - para cada (usuario_id, item_id) existe no máximo UMA linha em usuarios.csv
-    - se já existia, é substituída (atualiza gostou e origem)
-    """
-    global _usuarios_df
-
-    df = load_usuarios_df()  # sempre traz a versão mais recente
-
-    # remove qualquer linha anterior desse usuário para esse item
-    mask = (df["usuario_id"] == usuario_id) & (df["item_id"] == item_id)
-    df = df[~mask]
-
-    # adiciona nova linha
-    nova_linha = {
-        "usuario_id": int(usuario_id),
-        "nome": str(
-            df[df["usuario_id"] == usuario_id]["nome"].iloc[0]
-        ) if "nome" in df.columns and (df["usuario_id"] == usuario_id).any() else "",
-        "item_id": int(item_id),
-        "gostou": 1 if gostou else 0,
-        "origem": origem,  # "inicio", "recomendador" ou "outro"
-    }
+    - para cada (usuario_id, item_id) vale só a avaliação mais recente
+      (substitui gostou e origem de uma avaliação anterior)
+    - no CSV o evento é apenas anexado em usuarios.log (custo O(1) por escrita);
+      no SQLite é um upsert pelo índice (usuario_id, item_id)
+    - os perfis em memória são atualizados só com esta avaliação; se outro
+      processo escreveu desde a última leitura, são descartados (_anotar_escrita)
+    """
+    with _usuarios_lock:
+        antes, depois = get_storage().registrar_avaliacao(
+            usuario_id=usuario_id,
+            item_id=item_id,
+            gostou=1 if gostou else 0,
+            origem=origem,  # "inicio", "recomendador" ou "outro"
+        )
+        mudou = _anotar_escrita(antes, depois)
+    if mudou:
+        _resetar_perfis()
+    versao = profiles.versao(usuario_id)
+    profiles.atualizar(usuario_id, item_id, gostou)
+    if profiles.versao(usuario_id) != versao:
+        # os likes mudaram: resultados guardados deste usuário não valem mais
+        cache_resultados.invalidar_usuario(usuario_id)
+
+
+def _vetorizar_item(item: dict):
+    """Vetor TF-IDF (normalizado) de um item com o vocabulário/IDF atuais."""
+    texto = ingestao.textos_features(pd.DataFrame([item])).iloc[0]
+    tokens = _vectorizer.build_analyzer()(texto)
+    fora = sum(1 for t in tokens if t not in _vectorizer.vocabulary_)
+    vetor = normalize(_vectorizer.transform([texto]), norm="l2", copy=False)
+    return vetor, len(tokens), fora
+
+
+def _aplicar_item(item: dict) -> dict:
+    """
+    Anexa item ao catálogo em memória como uma linha nova; se o item_id já
+    existe, a linha antiga passa a ser ignorada (_mortas). Custa O(item):
+    nada do catálogo é copiado (ver backend/catalogo.py). Chamado com
+    catalogo.lock.
+    """
+    global _item_matrix, _linhas_novas, _mortas, _catalogo_versao, _maior_item_id
+    linha = ingestao.tipar_itens(pd.DataFrame([item]).reindex(columns=_itens_base.colunas))
+    item = linha.iloc[0].to_dict()
+    item_id = int(item["item_id"])
+    vetor, n_tokens, n_fora = _vetorizar_item(item)
+
+    n_base = len(_itens_base)
+    pos = n_base + len(_itens_novos)
+    antiga = _item_pos.get(item_id)
+    vetor_antigo = None if antiga is None else _item_matrix[antiga]
+    if antiga is None:
+        slot = pos
+    else:
+        slot = antiga if antiga < n_base else _slots_novos[antiga - n_base]
+
+    base = _item_matrix.base if isinstance(_item_matrix, catalogo.MatrizItens) else _item_matrix
+    if _linhas_novas is None:
+        _linhas_novas = catalogo.LinhasNovas(base)
+    novas = _linhas_novas.anexar(vetor)
+    # a linha entra em todas as estruturas antes de aparecer em _item_pos
+    _itens_novos.append(item)
+    _slots_novos.append(slot)
+    _genero_novos.setdefault(str(item["genero"]).lower(), []).append(pos)
+    search.anexar(_search_index, pos, item)
+    if SCORING_BACKEND == "lsa":
+        lsa.anexar_linha(novas, vetor)
+
+    # a partir daqui as próximas leituras veem o item novo
+    _item_matrix = catalogo.MatrizItens(base, novas)
+    profiles.trocar_item(_item_matrix, _item_pos, item_id, pos, vetor_antigo)
+    if antiga is not None:
+        _mortas = np.insert(_mortas, np.searchsorted(_mortas, antiga), antiga)
+    _maior_item_id = max(_maior_item_id, item_id)
+    _catalogo_versao += 1
+    cache_resultados.limpar()
+
+    catalogo.registrar_drift(n_tokens, n_fora, antiga is None)
+    ITENS_CATALOGO.set(len(_item_pos))
+    TAXA_OOV_CATALOGO.set(catalogo.drift(len(_item_pos))["taxa_oov"])
+    return item
+
+
+def adicionar_item(dados: dict) -> dict:
+    """
+    Inclui um item no catálogo sem refazer o fit (vocabulário e IDF atuais)
+    e o anexa ao itens.log. Sem item_id, usa o maior id + 1.
+    Levanta ValueError se o item_id já existe.
+    """
+    global _log_aplicado
+    _ensure_model()
+    with catalogo.escrita():
+        # com o lock, o catálogo em memória passa a ser o do arquivo
+        _sincronizar_catalogo()
+        item = dict(dados)
+        if item.get("item_id") is None:
+            item["item_id"] = _maior_item_id + 1
+        item["item_id"] = int(item["item_id"])
+        if item["item_id"] in _item_pos:
+            raise ValueError(f"Item {item['item_id']} já existe.")
+        novo = _aplicar_item(item)
+        _log_aplicado = catalogo.anexar_log(novo)
+    return novo
+
+
+def atualizar_item(item_id: int, campos: dict) -> Optional[dict]:
+    """
+    Altera campos de um item (a versão nova ganha uma linha na matriz) e
+    anexa a nova versão ao itens.log. Retorna None se o item não existe.
+    """
+    global _log_aplicado
+    _ensure_model()
+    with catalogo.escrita():
+        _sincronizar_catalogo()
+        pos = _item_pos.get(int(item_id))
+        if pos is None:
+            return None
+        item = _linhas_itens([pos]).iloc[0].to_dict()
+        item.update({k: v for k, v in campos.items() if k != "item_id"})
+        atualizado = _aplicar_item(item)
+        _log_aplicado = catalogo.anexar_log(atualizado)
+    return atualizado
+
+
+def drift_catalogo() -> dict:
+    """Quanto o catálogo se afastou do vocabulário do último fit."""
+    _ensure_model()
+    return catalogo.drift(len(_item_pos))
 
-    df = pd.concat([df, pd.DataFrame([nova_linha])], ignore_index=True)
 
-    # salva e atualiza cache
-    df.to_csv(DATA_DIR / "usuarios.csv", index=False)
-    _usuarios_df = df
+def uso_memoria() -> Dict[str, int]:
+    """Bytes ocupados pelas principais estruturas em memória (ou mapeadas)."""
+    _ensure_model()
+    matriz = _item_matrix
+    partes = [matriz.base, matriz.novas] if isinstance(matriz, catalogo.MatrizItens) else [matriz]
+    uso = {
+        "item_matrix": sum(
+            int(m.data.nbytes + m.indices.nbytes + m.indptr.nbytes) for m in partes
+        ),
+        "perfis": profiles.bytes_usados(),
+        # catálogo do fit mapeado do artefato + itens ingeridos depois dele
+        "catalogo": _itens_base.nbytes
+        + (int(pd.DataFrame(_itens_novos).memory_usage(deep=True).sum()) if _itens_novos else 0),
+    }
+    uso["total"] = sum(uso.values())
+    return uso
@@ -0,0 +1,150 @@
+# backend/scoring.py
+from __future__ import annotations
+
+import functools
+from typing import Callable, Dict, Optional
+
+import numpy as np
+import scipy.sparse as sp
+from joblib import Parallel, delayed
+from sklearn.metrics.pairwise import cosine_similarity
+
+from .ann import ann_scores
+from .catalogo import MatrizItens
+from .lsa import lsa_scores
+from .vetores import norma_perfil, produto_perfil
+
+
+def _sparse_scores(item_matrix, profile: np.ndarray, linhas=None) -> np.ndarray:
+    """
+    Calcula a similaridade do cosseno de todos os itens (ou só das linhas
+    informadas) em um único produto matriz esparsa × vetor.
+    Pressupõe que as linhas de item_matrix já estão normalizadas (L2), então
+    basta normalizar o perfil para que o produto escalar seja o cosseno.
+    """
+    if linhas is not None:
+        item_matrix = item_matrix[linhas]
+    norma = norma_perfil(profile)
+    if norma == 0:
+        return np.zeros(item_matrix.shape[0])
+    return produto_perfil(item_matrix, profile / norma)
+
+
+# linhas da matriz de itens por produto esparso × denso em sparse_scores_lote, e
+# itens por transposição (a faixa transposta cabe no cache)
+_FAIXA_ITENS = 8192
+_FAIXA_TRANSPOSTA = 512
+
+
+def sparse_scores_lote(item_matrix, perfis: np.ndarray) -> np.ndarray:
+    """
+    Cosseno de cada perfil (linhas de perfis, já normalizadas) com cada
+    linha de item_matrix: (n_perfis x n_itens), as similaridades de cada
+    perfil numa linha contígua. O produto esparso × denso sai com os itens
+    nas linhas, então ele é feito por faixas de itens e cada faixa é
+    transposta enquanto ainda está no cache, sem materializar o
+    (n_itens x n_perfis) inteiro.
+    """
+    perfis_t = np.ascontiguousarray(perfis.T)
+    sims = np.empty(
+        (perfis.shape[0], item_matrix.shape[0]),
+        dtype=np.result_type(item_matrix.dtype, perfis.dtype),
+    )
+    if isinstance(item_matrix, MatrizItens):
+        partes = [item_matrix.base, item_matrix.novas]
+    else:
+        partes = [item_matrix]
+    inicio = 0
+    for parte in partes:
+        for ini in range(0, parte.shape[0], _FAIXA_ITENS):
+            faixa = np.asarray(parte[ini : ini + _FAIXA_ITENS] @ perfis_t)
+            for j in range(0, len(faixa), _FAIXA_TRANSPOSTA):
+                bloco = faixa[j : j + _FAIXA_TRANSPOSTA]
+                col = inicio + ini + j
+                sims[:, col : col + len(bloco)] = bloco.T
+        inicio += parte.shape[0]
+    return sims
+
+
+def _joblib_scores(item_matrix, profile: np.ndarray, linhas=None) -> np.ndarray:
+    """
+    Implementação original: uma tarefa joblib por item, com cosine_similarity
+    sobre pares 1x1. Mantida apenas para comparação.
+    """
+    if linhas is not None:
+        item_matrix = item_matrix[linhas]
+    if sp.issparse(profile):
+        profile = profile.toarray().ravel()
+
+    def sim_for_idx(i: int) -> float:
+        # linha i da matriz TF-IDF (sparse) convertida para array 1D
+        v = item_matrix[i].toarray().ravel()
+        s = cosine_similarity(
+            profile.reshape(1, -1),
+            v.reshape(1, -1),
+        )[0, 0]
+        return float(s)
+
+    sims = Parallel(n_jobs=-1)(
+        delayed(sim_for_idx)(i) for i in range(item_matrix.shape[0])
+    )
+    return np.array(sims)
+
+
+SCORERS: Dict[str, Callable] = {
+    "sparse": _sparse_scores,
+    "joblib": _joblib_scores,
+    # aproximado: só os candidatos do índice IVF recebem nota (demais = NaN)
+    "ann": ann_scores,
+    # aproximado: cosseno entre embeddings LSA (SVD truncada) densos
+    "lsa": lsa_scores,
+}
+
+
+def score_items(
+    item_matrix,
+    profile: np.ndarray,
+    backend: str = "sparse",
+    linhas: Optional[np.ndarray] = None,
+    minimo: int = 0,
+) -> np.ndarray:
+    """
+    Retorna a similaridade de cada linha de item_matrix com o perfil.
+    Com `linhas`, só essas linhas são pontuadas (resultado na mesma ordem).
+    `minimo` = quantas linhas, no mínimo, o backend ann deve pontuar (os
+    demais backends pontuam todas).
+    Numa MatrizItens (catálogo com itens ingeridos depois do fit) a base e as
+    linhas novas são pontuadas separadamente pelo mesmo backend.
+    """
+    try:
+        scorer = SCORERS[backend]
+    except KeyError:
+        raise ValueError(
+            f"Backend de similaridade desconhecido: {backend!r}. "
+            f"Opções: {', '.join(sorted(SCORERS))}."
+        )
+    if backend == "ann" and minimo:
+        scorer = functools.partial(scorer, minimo=minimo)
+    if isinstance(item_matrix, MatrizItens):
+        return item_matrix.pontuar(lambda m, l: scorer(m, profile, l), linhas)
+    return scorer(item_matrix, profile, linhas)
+
+
+def top_k_indices(scores: np.ndarray, k: Optional[int]) -> np.ndarray:
+    """
+    Índices dos k maiores scores, do maior para o menor; empates ficam na
+    ordem original (a mesma de um sort estável decrescente).
+    Usa seleção parcial (argpartition), sem ordenar o vetor inteiro.
+    """
+    n = len(scores)
+    neg = -scores
+    if k is None or k >= n:
+        return np.argsort(neg, kind="stable")
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+
+    limite = neg[np.argpartition(neg, k - 1)[k - 1]]
+    melhores = np.flatnonzero(neg < limite)
+    empatados = np.flatnonzero(neg == limite)[: k - len(melhores)]
+    selecionados = np.sort(np.concatenate((melhores, empatados)))
+    return selecionados[np.argsort(neg[selecionados], kind="stable")]
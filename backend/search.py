@@ -0,0 +1,171 @@
+# backend/search.py
+"""
+Índice invertido de n-gramas (1 a 3 caracteres) para a busca de /itens.
+
+A busca antiga fazia, para cada campo (nome, artista, tags):
+
+    itens[campo].str.lower().str.contains(q.lower())
+
+Aqui cada campo tem, para cada n-grama do texto em minúsculas, a lista
+ordenada das linhas que o contêm. Uma consulta com até 3 caracteres é
+respondida direto pela lista do próprio termo; uma consulta maior intersecta
+as listas dos seus trigramas e confirma só os candidatos com `q in texto`.
+
+Consultas com caracteres especiais de regex continuam sendo uma busca por
+regex (re.search, como o str.contains) nos textos, para manter exatamente o
+comportamento anterior.
+
+Os textos das linhas do fit não ficam em memória: o índice recebe uma
+função que lê os textos de algumas linhas do catálogo do artefato (ver
+colunar.Tabela), e só os candidatos de uma consulta são decodificados.
+
+Itens ingeridos depois do fit (backend/catalogo.py) entram por anexar(): o
+texto vai para uma lista do campo e a posição para listas "novos" por
+n-grama, no lugar. As postings do artefato não são copiadas nem alteradas.
+"""
+from __future__ import annotations
+
+import re
+from array import array
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Sequence, Set
+
+import numpy as np
+import pandas as pd
+
+CAMPOS = ("nome", "artista", "tags")
+N_MAX = 3
+
+_REGEX_ESPECIAL = re.compile(r"[.^$*+?{}\[\]\\|()]")
+
+
+def _textos(itens: pd.DataFrame, campo: str) -> List[str]:
+    return itens[campo].fillna("").astype(str).str.lower().tolist()
+
+
+def _minusculos(textos: Sequence[Optional[str]]) -> List[str]:
+    return ["" if t is None else t.lower() for t in textos]
+
+
+def _grams(texto: str) -> Set[str]:
+    grams = set()
+    for n in range(1, N_MAX + 1):
+        grams.update(texto[i : i + n] for i in range(len(texto) - n + 1))
+    return grams
+
+
+def acumular_postings(
+    postings: Dict[str, Dict[str, array]], itens: pd.DataFrame, inicio: int
+) -> None:
+    """
+    Anexa às listas de postings (campo -> n-grama -> linhas) as linhas de
+    itens, que ocupam as posições a partir de inicio. Chamado bloco a bloco,
+    em ordem, as listas continuam crescentes.
+    """
+    for campo in CAMPOS:
+        listas = postings.setdefault(campo, defaultdict(lambda: array("q")))
+        for pos, texto in enumerate(_textos(itens, campo), start=inicio):
+            for g in _grams(texto):
+                listas[g].append(pos)
+
+
+def construir_postings(itens: pd.DataFrame) -> Dict[str, Dict[str, np.ndarray]]:
+    """campo -> n-grama -> linhas que o contêm (gravado no artefato do modelo)."""
+    postings: Dict[str, Dict[str, array]] = {}
+    acumular_postings(postings, itens, 0)
+    return {
+        campo: {g: np.frombuffer(p, dtype=np.int64) for g, p in postings.get(campo, {}).items()}
+        for campo in CAMPOS
+    }
+
+
+def construir_indice(
+    postings: Dict[str, Dict[str, np.ndarray]],
+    n_itens: int,
+    ler_textos: Callable[[str, np.ndarray], Sequence[Optional[str]]],
+) -> dict:
+    """
+    Índice de busca sobre as postings do artefato (memory-map) das n_itens
+    linhas do fit; ler_textos(campo, linhas) devolve os textos dessas
+    linhas (None = vazio).
+    """
+    return {
+        "postings": postings,
+        "ler_textos": ler_textos,
+        "n_base": n_itens,
+        "textos_novos": {campo: [] for campo in CAMPOS},
+        "novos": {campo: {} for campo in CAMPOS},
+        "n_itens": n_itens,
+    }
+
+
+def anexar(indice: dict, pos: int, item: dict) -> None:
+    """
+    Inclui item na posição pos == n_itens, no lugar (chamado com
+    catalogo.lock). O texto entra antes das posições: quem achar pos numa
+    lista já encontra o texto dela.
+    """
+    linha = pd.DataFrame([item])
+    for campo in CAMPOS:
+        texto = _textos(linha, campo)[0]
+        indice["textos_novos"][campo].append(texto)
+        novos = indice["novos"][campo]
+        for g in _grams(texto):
+            novos.setdefault(g, []).append(pos)
+    indice["n_itens"] = pos + 1
+
+
+def _textos_linhas(indice: dict, campo: str, linhas: np.ndarray) -> List[str]:
+    """Textos (minúsculos) das linhas, em ordem: as do fit vêm do catálogo."""
+    n_base = indice["n_base"]
+    base = linhas[linhas < n_base]
+    textos = _minusculos(indice["ler_textos"](campo, base)) if len(base) else []
+    novos = indice["textos_novos"][campo]
+    return textos + [novos[p - n_base] for p in linhas[len(base) :].tolist()]
+
+
+def _lista(indice: dict, campo: str, gram: str) -> np.ndarray:
+    """Linhas com o n-grama: as do artefato seguidas das anexadas depois."""
+    lista = indice["postings"][campo].get(gram)
+    novos = indice["novos"][campo].get(gram)
+    if novos:
+        novos = np.array(novos, dtype=np.int64)
+        return novos if lista is None else np.concatenate([lista, novos])
+    return np.empty(0, dtype=np.int64) if lista is None else lista
+
+
+def _buscar_campo(indice: dict, campo: str, q: str) -> np.ndarray:
+    if len(q) <= N_MAX:
+        return _lista(indice, campo, q)
+
+    grams = {q[i : i + N_MAX] for i in range(len(q) - N_MAX + 1)}
+    listas = [_lista(indice, campo, g) for g in grams]
+    listas.sort(key=len)
+    candidatos = listas[0]
+    for lista in listas[1:]:
+        if len(candidatos) == 0:
+            break
+        candidatos = np.intersect1d(candidatos, lista, assume_unique=True)
+
+    # candidatos em ordem crescente: as linhas do fit vêm antes das novas
+    textos = _textos_linhas(indice, campo, candidatos)
+    ok = np.fromiter((q in t for t in textos), dtype=bool, count=len(textos))
+    return candidatos[ok]
+
+
+def buscar(indice: dict, q: str) -> np.ndarray:
+    """Posições (em ordem) das linhas que casam com q."""
+    q_lower = q.lower()
+    if _REGEX_ESPECIAL.search(q_lower):
+        padrao = re.compile(q_lower)
+        n = indice["n_itens"]
+        mask = np.zeros(n, dtype=bool)
+        for campo in CAMPOS:
+            textos = _textos_linhas(indice, campo, np.arange(n))
+            mask |= np.fromiter(
+                (padrao.search(t) is not None for t in textos), dtype=bool, count=n
+            )
+        return np.flatnonzero(mask)
+
+    resultados = [_buscar_campo(indice, campo, q_lower) for campo in CAMPOS]
+    return np.unique(np.concatenate(resultados))
@@ -0,0 +1,239 @@
+# backend/storage.py
+"""
+Armazenamento dos usuários e das suas avaliações.
+
+Duas implementações com a mesma interface, escolhidas por
+config.STORAGE_BACKEND (variável de ambiente MUSIQ_STORAGE):
+
+- "csv"    (padrão): usuarios.csv + log append-only (backend/event_log.py)
+- "sqlite": banco SQLite em modo WAL, com índice único em
+            (usuario_id, item_id) para upserts e leituras por usuário
+
+As escritas de avaliação e de cadastro retornam também a assinatura() de
+logo antes e de logo depois delas: quem guarda a última assinatura lida
+sabe se outro processo escreveu no meio (ver recommender.registrar_avaliacao).
+
+Migração dos CSVs existentes para o SQLite (a partir da raiz do projeto):
+
+    python -m backend.storage migrar
+"""
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Optional, Tuple
+
+import pandas as pd
+
+from . import event_log
+from .config import SQLITE_PATH, STORAGE_BACKEND
+
+COLUNAS = event_log.COLUNAS
+
+
+class CsvStorage:
+    """usuarios.csv (snapshot) + usuarios.log (eventos)."""
+
+    nome = "csv"
+    leitura_por_usuario = False
+
+    def assinatura(self) -> tuple:
+        return event_log.assinatura()
+
+    def ler_usuarios(self) -> pd.DataFrame:
+        return event_log.ler_usuarios()
+
+    def ler_usuario(self, usuario_id: int) -> pd.DataFrame:
+        df = self.ler_usuarios()
+        return df[df["usuario_id"] == usuario_id].reset_index(drop=True)
+
+    def substituir_tudo(self, df: pd.DataFrame) -> None:
+        event_log.substituir_tudo(df)
+
+    def registrar_avaliacao(
+        self, usuario_id: int, item_id: int, gostou: int, origem: str
+    ) -> Tuple[tuple, tuple]:
+        return event_log.append_evento(
+            usuario_id=usuario_id, item_id=item_id, gostou=gostou, origem=origem
+        )
+
+    def criar_usuario(self, nome: str) -> Tuple[int, tuple, tuple]:
+        return event_log.append_cadastro(nome)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS avaliacoes_usuarios (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    usuario_id INTEGER NOT NULL,
+    nome TEXT,
+    item_id INTEGER,
+    gostou INTEGER NOT NULL DEFAULT 0,
+    origem TEXT
+);
+-- NULLs são distintos: as linhas de cadastro (item_id NULL) não conflitam
+CREATE UNIQUE INDEX IF NOT EXISTS ux_usuario_item
+    ON avaliacoes_usuarios (usuario_id, item_id);
+CREATE TABLE IF NOT EXISTS versao (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    n INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO versao (id, n) VALUES (1, 0);
+"""
+
+_SELECT = "SELECT usuario_id, nome, item_id, gostou, origem FROM avaliacoes_usuarios"
+
+# nome do usuário = nome da sua linha de cadastro
+_NOME_DO_USUARIO = (
+    "(SELECT nome FROM avaliacoes_usuarios "
+    "WHERE usuario_id = :usuario_id AND nome IS NOT NULL AND nome <> '' "
+    "ORDER BY seq LIMIT 1)"
+)
+
+
+class SqliteStorage:
+    """Banco SQLite (WAL). Uma conexão por thread."""
+
+    nome = "sqlite"
+    leitura_por_usuario = True
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._local = threading.local()
+        with self._conexao() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _conexao(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def assinatura(self) -> tuple:
+        # contador incrementado em toda escrita (de qualquer processo)
+        (n,) = self._conexao().execute("SELECT n FROM versao WHERE id = 1").fetchone()
+        return (n,)
+
+    def _tipar(self, df: pd.DataFrame) -> pd.DataFrame:
+        df["item_id"] = df["item_id"].astype(float)
+        return df
+
+    def ler_usuarios(self) -> pd.DataFrame:
+        conn = self._conexao()
+        return self._tipar(pd.read_sql_query(f"{_SELECT} ORDER BY seq", conn))
+
+    def ler_usuario(self, usuario_id: int) -> pd.DataFrame:
+        conn = self._conexao()
+        return self._tipar(
+            pd.read_sql_query(
+                f"{_SELECT} WHERE usuario_id = ? ORDER BY seq",
+                conn,
+                params=(int(usuario_id),),
+            )
+        )
+
+    def substituir_tudo(self, df: pd.DataFrame) -> None:
+        registros = [
+            (
+                int(r.usuario_id),
+                None if pd.isna(r.nome) else str(r.nome),
+                None if pd.isna(r.item_id) else int(r.item_id),
+                0 if pd.isna(r.gostou) else int(r.gostou),
+                None if pd.isna(r.origem) else str(r.origem),
+            )
+            for r in df[COLUNAS].itertuples(index=False)
+        ]
+        with self._conexao() as conn:
+            conn.execute("DELETE FROM avaliacoes_usuarios")
+            conn.executemany(
+                "INSERT INTO avaliacoes_usuarios "
+                "(usuario_id, nome, item_id, gostou, origem) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (usuario_id, item_id) DO UPDATE SET "
+                "gostou = excluded.gostou, origem = excluded.origem",
+                registros,
+            )
+            conn.execute("UPDATE versao SET n = n + 1 WHERE id = 1")
+
+    def _incrementar_versao(self, conn: sqlite3.Connection) -> Tuple[tuple, tuple]:
+        # o UPDATE pega o lock de escrita do banco: o n lido em seguida, na
+        # mesma transação, é o desta escrita e n - 1 o de logo antes dela
+        conn.execute("UPDATE versao SET n = n + 1 WHERE id = 1")
+        (n,) = conn.execute("SELECT n FROM versao WHERE id = 1").fetchone()
+        return (n - 1,), (n,)
+
+    def registrar_avaliacao(
+        self, usuario_id: int, item_id: int, gostou: int, origem: str
+    ) -> Tuple[tuple, tuple]:
+        with self._conexao() as conn:
+            antes, depois = self._incrementar_versao(conn)
+            conn.execute(
+                "INSERT INTO avaliacoes_usuarios "
+                "(usuario_id, nome, item_id, gostou, origem) "
+                f"VALUES (:usuario_id, {_NOME_DO_USUARIO}, :item_id, :gostou, :origem) "
+                "ON CONFLICT (usuario_id, item_id) DO UPDATE SET "
+                "gostou = excluded.gostou, origem = excluded.origem",
+                {
+                    "usuario_id": int(usuario_id),
+                    "item_id": int(item_id),
+                    "gostou": int(gostou),
+                    "origem": origem,
+                },
+            )
+        return antes, depois
+
+    def criar_usuario(self, nome: str) -> Tuple[int, tuple, tuple]:
+        with self._conexao() as conn:
+            antes, depois = self._incrementar_versao(conn)
+            # o próximo id é calculado dentro da própria transação de escrita
+            cur = conn.execute(
+                "INSERT INTO avaliacoes_usuarios (usuario_id, nome, item_id, gostou, origem) "
+                "SELECT COALESCE(MAX(usuario_id), 0) + 1, ?, NULL, 0, 'outro' "
+                "FROM avaliacoes_usuarios",
+                (nome,),
+            )
+            (novo_id,) = conn.execute(
+                "SELECT usuario_id FROM avaliacoes_usuarios WHERE seq = ?",
+                (cur.lastrowid,),
+            ).fetchone()
+        return int(novo_id), antes, depois
+
+
+_storage = None
+
+
+def get_storage():
+    global _storage
+    if _storage is None:
+        if STORAGE_BACKEND == "csv":
+            _storage = CsvStorage()
+        elif STORAGE_BACKEND == "sqlite":
+            _storage = SqliteStorage(SQLITE_PATH)
+        else:
+            raise RuntimeError(
+                f"MUSIQ_STORAGE inválido: {STORAGE_BACKEND!r} (use 'csv' ou 'sqlite')."
+            )
+    return _storage
+
+
+def migrar_csv_para_sqlite(destino: Optional[Path] = None) -> int:
+    """Copia usuarios.csv (+ log) para o SQLite. Retorna o número de linhas."""
+    df = CsvStorage().ler_usuarios()
+    SqliteStorage(destino or SQLITE_PATH).substituir_tudo(df)
+    return len(df)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ferramentas de armazenamento do Musiq+")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    migrar = sub.add_parser("migrar", help="migra usuarios.csv para o SQLite")
+    migrar.add_argument("--destino", type=Path, default=SQLITE_PATH)
+    args = parser.parse_args()
+
+    if args.comando == "migrar":
+        n = migrar_csv_para_sqlite(args.destino)
+        print(f"{n} linhas migradas para {args.destino}.")
+        print("Use MUSIQ_STORAGE=sqlite para o backend ler desse banco.")
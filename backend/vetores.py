@@ -0,0 +1,37 @@
+# backend/vetores.py
+"""
+Operações compartilhadas pelos backends de similaridade (scoring, ann, lsa).
+
+O perfil de um usuário chega como ndarray 1D ou, no modo compacto, como uma
+linha CSR (1 x V) com só os termos do perfil: norma_perfil e produto_perfil
+aceitam os dois sem densificar a linha esparsa.
+"""
+from __future__ import annotations
+
+import numpy as np
+import scipy.sparse as sp
+
+
+def normalizar_linhas(X: np.ndarray) -> np.ndarray:
+    """Cada linha dividida pela sua norma L2 (linhas nulas ficam nulas)."""
+    normas = np.linalg.norm(X, axis=1, keepdims=True)
+    normas[normas == 0] = 1.0
+    return X / normas
+
+
+def norma_perfil(perfil) -> float:
+    """Norma L2 do perfil (denso ou linha esparsa)."""
+    return float(np.linalg.norm(perfil.data if sp.issparse(perfil) else perfil))
+
+
+def produto_perfil(matriz, perfil) -> np.ndarray:
+    """
+    matriz @ perfil como vetor 1D denso. Com uma linha esparsa, o produto é
+    matriz @ perfil.T: só as colunas dos termos do perfil entram na conta.
+    """
+    if sp.issparse(perfil):
+        resultado = matriz @ perfil.T
+        if sp.issparse(resultado):
+            return resultado.toarray().ravel()
+        return np.asarray(resultado).ravel()
+    return np.asarray(matriz @ perfil).ravel()
@@ -0,0 +1,78 @@
+# benchmarks/ann_recall.py
+"""
+Recall@k e latência do índice ANN (backend/ann.py) contra o cálculo exato.
+
+Usa o catálogo de MUSIQ_DATA_DIR (padrão: backend/data). A partir da raiz:
+
+    python -m benchmarks.ann_recall --k 10 --consultas 200 --nprobe 1 2 4 8 16
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+
+from backend import ann
+from backend import recommender as rec
+from backend.scoring import score_items
+from benchmarks.perfis import perfis_aleatorios
+
+
+def _top_k(sims: np.ndarray, k: int) -> np.ndarray:
+    sims = np.where(np.isnan(sims), -np.inf, sims)
+    k = min(k, len(sims))
+    return np.argpartition(-sims, k - 1)[:k]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--consultas", type=int, default=200)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--listas", type=int, default=None, help="padrão: config.ANN_LISTAS")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rec._ensure_model()
+    matriz = rec._item_matrix
+    rng = np.random.default_rng(args.seed)
+
+    t0 = time.perf_counter()
+    indice = ann.construir(matriz, n_listas=args.listas)
+    t_build = time.perf_counter() - t0
+    n_listas = len(indice["centroides"])
+    print(
+        f"itens={matriz.shape[0]} termos={matriz.shape[1]} listas={n_listas} "
+        f"build={t_build:.2f}s"
+    )
+
+    perfis = perfis_aleatorios(matriz, args.consultas, rng)
+
+    exatos, t_exato = [], 0.0
+    for p in perfis:
+        t0 = time.perf_counter()
+        sims = score_items(matriz, p, "sparse")
+        exatos.append(set(_top_k(sims, args.k).tolist()))
+        t_exato += time.perf_counter() - t0
+    print(f"exato: {1000 * t_exato / len(perfis):.3f} ms/consulta")
+
+    print(f"{'nprobe':>7} {'candidatos':>11} {'recall@' + str(args.k):>10} {'ms/consulta':>12}")
+    for nprobe in args.nprobe:
+        acertos, n_cand, t_ann = 0, 0, 0.0
+        for p, exato in zip(perfis, exatos):
+            t0 = time.perf_counter()
+            sims = ann.ann_scores(matriz, p, nprobe=nprobe)
+            aprox = set(_top_k(sims, args.k).tolist())
+            t_ann += time.perf_counter() - t0
+            acertos += len(aprox & exato)
+            n_cand += int(np.count_nonzero(~np.isnan(sims)))
+        total = sum(len(e) for e in exatos)
+        print(
+            f"{min(nprobe, n_listas):>7} {n_cand / len(perfis):>11.0f} "
+            f"{acertos / total:>10.3f} {1000 * t_ann / len(perfis):>12.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# benchmarks/compacto.py
+"""
+Memória e fidelidade do ranking no modo compacto (MUSIQ_MODO_COMPACTO)
+contra a representação float64 atual.
+
+Usa o catálogo de MUSIQ_DATA_DIR (padrão: backend/data), com o modelo
+carregado em float64. A partir da raiz:
+
+    python -m benchmarks.compacto --k 10 --consultas 200 --termos 0 64 32 16
+"""
+from __future__ import annotations
+
+import argparse
+
+import numpy as np
+import scipy.sparse as sp
+
+from backend import recommender as rec
+from backend.scoring import score_items, top_k_indices
+from benchmarks.perfis import perfis_aleatorios
+
+
+def _bytes(matriz) -> int:
+    return int(matriz.data.nbytes + matriz.indices.nbytes + matriz.indptr.nbytes)
+
+
+def _truncar(perfil: np.ndarray, termos: int) -> np.ndarray:
+    if termos and np.count_nonzero(perfil) > termos:
+        perfil = perfil.copy()
+        perfil[np.argpartition(perfil, -termos)[:-termos]] = 0.0
+    return perfil
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--consultas", type=int, default=200)
+    parser.add_argument("--termos", type=int, nargs="+", default=[0, 64, 32, 16],
+                        help="PERFIL_MAX_TERMOS a testar (0 = sem truncar)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rec._ensure_model()
+    matriz = sp.csr_matrix(rec._item_matrix, dtype=np.float64)
+    compacta = sp.csr_matrix(
+        (matriz.data.astype(np.float32), matriz.indices.astype(np.int32),
+         matriz.indptr.astype(np.int32)),
+        shape=matriz.shape,
+    )
+    print(
+        f"itens={matriz.shape[0]} termos={matriz.shape[1]} "
+        f"matriz float64={_bytes(matriz) / 2**20:.1f} MiB "
+        f"float32/int32={_bytes(compacta) / 2**20:.1f} MiB"
+    )
+
+    rng = np.random.default_rng(args.seed)
+    consultas = []
+    for perfil in perfis_aleatorios(matriz, args.consultas, rng):
+        exato = top_k_indices(score_items(matriz, perfil), args.k)
+        consultas.append((perfil, exato))
+
+    print(f"{'termos':>7} {'overlap@' + str(args.k):>11} {'desvio máx':>11} {'perfil denso':>13} {'perfil esparso':>15}")
+    for termos in args.termos:
+        acertos, desvio, bytes_esparso = 0, 0.0, 0
+        for perfil, exato in consultas:
+            # o perfil como o modo compacto entrega: linha esparsa truncada
+            p32 = sp.csr_matrix(_truncar(perfil.astype(np.float32), termos))
+            sims = score_items(compacta, p32)
+            aprox = top_k_indices(sims, args.k)
+            acertos += len(set(aprox.tolist()) & set(exato.tolist()))
+            ref = score_items(matriz, perfil)
+            desvio = max(desvio, float(np.max(np.abs(sims[exato] - ref[exato]))))
+            bytes_esparso += p32.data.nbytes + p32.indices.nbytes + p32.indptr.nbytes
+        total = sum(len(e) for _, e in consultas)
+        # bytes por perfil pontuado: denso float64 x linha esparsa (data + indices + indptr)
+        print(
+            f"{termos or 'todos':>7} {acertos / total:>11.3f} {desvio:>11.2e} "
+            f"{matriz.shape[1] * 8:>12}B {bytes_esparso / len(consultas):>14.0f}B"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+# benchmarks/compare.py
+"""
+Compara dois resultados de benchmarks/run.py (ex.: dois commits).
+
+    python -m benchmarks.compare antes.json depois.json [--metrica p50_ms]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compara dois resultados de benchmark")
+    parser.add_argument("antes")
+    parser.add_argument("depois")
+    parser.add_argument("--metrica", default="p50_ms")
+    args = parser.parse_args()
+
+    with open(args.antes, encoding="utf-8") as f:
+        antes = json.load(f)
+    with open(args.depois, encoding="utf-8") as f:
+        depois = json.load(f)
+
+    print(f"{antes['commit']} -> {depois['commit']} ({args.metrica})")
+    for escala, resultados in depois["escalas"].items():
+        base = antes["escalas"].get(escala)
+        if base is None:
+            continue
+        print(f"== {escala} itens ==")
+        for nome, r in resultados.items():
+            if args.metrica not in r or args.metrica not in base.get(nome, {}):
+                continue
+            a, d = base[nome][args.metrica], r[args.metrica]
+            variacao = (d - a) / a * 100 if a else float("inf")
+            print(f"{nome:>28}: {a:10.3f} -> {d:10.3f}  ({variacao:+7.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+# benchmarks/hot_paths.py
+"""
+Mede os caminhos quentes do backend sobre o catálogo de MUSIQ_DATA_DIR.
+
+Roda num processo próprio (o backend lê a configuração na importação), e
+normalmente é chamado por benchmarks/run.py. Pode ser usado sozinho:
+
+    MUSIQ_DATA_DIR=/tmp/musiq python -m benchmarks.hot_paths --saida r.json
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+import warnings
+from typing import Callable, Dict, List
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def _percentis(latencias: List[float]) -> Dict[str, float]:
+    ms = np.array(latencias) * 1000
+    return {
+        "n": len(ms),
+        "media_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p90_ms": float(np.percentile(ms, 90)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max()),
+        "throughput_ops_s": float(len(ms) / (ms.sum() / 1000)) if ms.sum() else 0.0,
+    }
+
+
+def medir(fn: Callable[[int], object], repeticoes: int, aquecimento: int = 2) -> Dict[str, float]:
+    """
+    Executa fn(i) `repeticoes` vezes e devolve percentis de latência,
+    throughput e o pico de memória alocada (tracemalloc) numa execução extra.
+    """
+    for i in range(aquecimento):
+        fn(i)
+    latencias = []
+    for i in range(repeticoes):
+        t0 = time.perf_counter()
+        fn(aquecimento + i)
+        latencias.append(time.perf_counter() - t0)
+
+    gc.collect()
+    tracemalloc.start()
+    fn(aquecimento + repeticoes)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    resultado = _percentis(latencias)
+    resultado["pico_memoria_mb"] = pico / 2**20
+    return resultado
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmarks dos caminhos quentes")
+    parser.add_argument("--repeticoes", type=int, default=50)
+    parser.add_argument("--saida", required=True, help="arquivo JSON de saída")
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore")
+    resultados: Dict[str, Dict[str, float]] = {}
+
+    # carga fria do modelo (fit ou artefato)
+    t0 = time.perf_counter()
+    from backend import recommender as rec
+
+    rec._ensure_model()
+    resultados["carga_modelo"] = {"segundos": time.perf_counter() - t0}
+
+    from fastapi.testclient import TestClient
+    from backend.app import app
+
+    client = TestClient(app)
+    usuarios = rec.load_usuarios_df()
+    ids = usuarios.loc[usuarios["gostou"] == 1, "usuario_id"].unique()
+    ids = [int(u) for u in ids[: max(1, args.repeticoes)]]
+    itens = rec.get_itens_df()
+    generos = itens["genero"].unique()
+    item_ids = itens["item_id"].to_numpy()
+    rng = np.random.default_rng(0)
+
+    def usuario(i: int) -> int:
+        return ids[i % len(ids)]
+
+    casos: Dict[str, Callable[[int], object]] = {
+        "recommend_for_user": lambda i: rec.recommend_for_user(usuario(i), top_k=10),
+        "recommend_for_user_genero": lambda i: rec.recommend_for_user(
+            usuario(i), top_k=10, genero=str(generos[i % len(generos)])
+        ),
+        "compute_metricas": lambda i: rec.compute_metricas(usuario(i)),
+        "compute_metricas_todos": lambda i: rec.compute_metricas_todos(),
+        "registrar_avaliacao": lambda i: rec.registrar_avaliacao(
+            usuario(i), int(rng.choice(item_ids)), bool(i % 2), "recomendador"
+        ),
+        "api_get_usuarios": lambda i: client.get("/usuarios"),
+        "api_get_itens_busca": lambda i: client.get(
+            "/itens", params={"q": ["rock", "lo", "jazz modal", "artista 1"][i % 4]}
+        ),
+        "api_post_recomendar": lambda i: client.post(
+            "/recomendar", json={"usuario_id": usuario(i), "top_k": 10}
+        ),
+        "api_post_avaliar": lambda i: client.post(
+            "/avaliar",
+            json={
+                "usuario_id": usuario(i),
+                "item_id": int(rng.choice(item_ids)),
+                "gostou": bool(i % 2),
+                "origem": "recomendador",
+            },
+        ),
+        "api_get_metricas": lambda i: client.get(f"/metricas/{usuario(i)}"),
+        "api_get_analise_usuario": lambda i: client.get(f"/analise_usuario/{usuario(i)}"),
+    }
+
+    for nome, fn in casos.items():
+        print(f"  {nome}...", file=sys.stderr, flush=True)
+        resultados[nome] = medir(fn, args.repeticoes)
+
+    resultados["processo"] = {
+        # ru_maxrss é em KiB no Linux
+        "max_rss_mb": (
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 if resource else None
+        ),
+        "memoria_bytes": rec.uso_memoria(),
+        "n_itens": int(len(itens)),
+        "n_usuarios": int(usuarios["usuario_id"].nunique()),
+        "n_avaliacoes": int(usuarios["item_id"].notna().sum()),
+    }
+
+    with open(args.saida, "w", encoding="utf-8") as f:
+        json.dump(resultados, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
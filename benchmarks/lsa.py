@@ -0,0 +1,68 @@
+# benchmarks/lsa.py
+"""
+Recall@k e latência do backend "lsa" (backend/lsa.py) contra o "sparse".
+
+Usa o catálogo de MUSIQ_DATA_DIR (padrão: backend/data). A partir da raiz:
+
+    python -m benchmarks.lsa --k 10 --consultas 200 --dims 32 64 128 256
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+
+from backend import lsa
+from backend import recommender as rec
+from backend.scoring import score_items, top_k_indices
+from benchmarks.perfis import perfis_aleatorios
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--consultas", type=int, default=200)
+    parser.add_argument("--dims", type=int, nargs="+", default=[32, 64, 128, 256])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rec._ensure_model()
+    matriz = rec._item_matrix
+    rng = np.random.default_rng(args.seed)
+    perfis = perfis_aleatorios(matriz, args.consultas, rng)
+    print(f"itens={matriz.shape[0]} termos={matriz.shape[1]}")
+
+    exatos, t_exato = [], 0.0
+    for p in perfis:
+        t0 = time.perf_counter()
+        sims = score_items(matriz, p, "sparse")
+        exatos.append(set(top_k_indices(sims, args.k).tolist()))
+        t_exato += time.perf_counter() - t0
+    print(f"sparse: {1000 * t_exato / len(perfis):.3f} ms/consulta")
+
+    print(
+        f"{'dim':>5} {'build (s)':>10} {'MiB':>8} "
+        f"{'recall@' + str(args.k):>10} {'ms/consulta':>12}"
+    )
+    for dim in args.dims:
+        t0 = time.perf_counter()
+        indice = lsa.construir(matriz, dim=dim)
+        t_build = time.perf_counter() - t0
+        acertos, t_lsa = 0, 0.0
+        for p, exato in zip(perfis, exatos):
+            t0 = time.perf_counter()
+            sims = lsa.lsa_scores(matriz, p)
+            aprox = set(top_k_indices(sims, args.k).tolist())
+            t_lsa += time.perf_counter() - t0
+            acertos += len(aprox & exato)
+        total = sum(len(e) for e in exatos)
+        mib = (indice["embeddings"].nbytes + indice["componentes"].nbytes) / 2**20
+        print(
+            f"{indice['embeddings'].shape[1]:>5} {t_build:>10.2f} {mib:>8.1f} "
+            f"{acertos / total:>10.3f} {1000 * t_lsa / len(perfis):>12.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+# benchmarks/perfis.py
+"""Perfis sintéticos compartilhados pelos benchmarks de qualidade."""
+from __future__ import annotations
+
+from typing import List
+
+import numpy as np
+
+
+def perfis_aleatorios(item_matrix, n: int, rng: np.random.Generator) -> List[np.ndarray]:
+    """Perfis sintéticos: média de 1 a 5 itens "curtidos" aleatórios."""
+    perfis = []
+    for _ in range(n):
+        curtidos = rng.choice(item_matrix.shape[0], size=rng.integers(1, 6), replace=False)
+        perfis.append(np.asarray(item_matrix[curtidos].mean(axis=0)).ravel())
+    return perfis
@@ -0,0 +1,115 @@
+# benchmarks/run.py
+"""
+Suíte de benchmarks do Musiq+.
+
+Para cada escala, gera um catálogo sintético (backend/data/setup_data.py) e
+roda benchmarks/hot_paths.py num processo separado. O resultado de todas as
+escalas é salvo em JSON em benchmarks/results/, identificado pelo commit.
+
+A partir da raiz do projeto:
+
+    python -m benchmarks.run --scales 1000 100000 1000000
+    python -m benchmarks.compare benchmarks/results/A.json benchmarks/results/B.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from backend.data.setup_data import create_dados_sinteticos
+
+RAIZ = Path(__file__).resolve().parent.parent
+RESULTADOS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def _commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconhecido"
+
+
+def rodar_escala(n_itens: int, args) -> dict:
+    with tempfile.TemporaryDirectory(prefix=f"musiq-bench-{n_itens}-") as tmp:
+        dados = Path(tmp) / "data"
+        t0 = time.perf_counter()
+        create_dados_sinteticos(
+            n_itens=n_itens,
+            n_usuarios=args.users,
+            ratings_per_user=args.ratings_per_user,
+            seed=args.seed,
+            destino=dados,
+        )
+        t_geracao = time.perf_counter() - t0
+
+        saida = Path(tmp) / "resultado.json"
+        env = dict(os.environ, MUSIQ_DATA_DIR=str(dados))
+        subprocess.run(
+            [
+                sys.executable, "-m", "benchmarks.hot_paths",
+                "--repeticoes", str(args.repeticoes),
+                "--saida", str(saida),
+            ],
+            cwd=RAIZ,
+            env=env,
+            check=True,
+        )
+        resultado = json.loads(saida.read_text(encoding="utf-8"))
+        resultado["geracao_dados"] = {"segundos": t_geracao}
+        return resultado
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Suíte de benchmarks do Musiq+")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1000, 100_000, 1_000_000])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--ratings-per-user", type=int, default=20)
+    parser.add_argument("--repeticoes", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--saida", type=Path, help="padrão: benchmarks/results/<commit>-<data>.json")
+    args = parser.parse_args()
+
+    commit = _commit()
+    relatorio = {
+        "commit": commit,
+        "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "parametros": {
+            "users": args.users,
+            "ratings_per_user": args.ratings_per_user,
+            "repeticoes": args.repeticoes,
+            "seed": args.seed,
+        },
+        "escalas": {},
+    }
+
+    for n_itens in args.scales:
+        print(f"== {n_itens} itens ==", flush=True)
+        relatorio["escalas"][str(n_itens)] = resultado = rodar_escala(n_itens, args)
+        for nome, r in resultado.items():
+            if "p50_ms" in r:
+                print(
+                    f"{nome:>28}: p50={r['p50_ms']:9.3f} ms  p99={r['p99_ms']:9.3f} ms  "
+                    f"{r['throughput_ops_s']:9.1f} ops/s  pico={r['pico_memoria_mb']:8.1f} MB"
+                )
+            elif "segundos" in r:
+                print(f"{nome:>28}: {r['segundos']:.2f} s")
+
+    saida = args.saida or RESULTADOS_DIR / f"{commit}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    saida.parent.mkdir(parents=True, exist_ok=True)
+    saida.write_text(json.dumps(relatorio, indent=2), encoding="utf-8")
+    print("Resultados salvos em", saida)
+
+
+if __name__ == "__main__":
+    main()
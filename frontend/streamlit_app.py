@@ -24,11 +24,26 @@ def api_get(path: str, params: Optional[Dict[str, Any]] = None):
         return None
 
 
-def api_post(path: str, json_data: Dict[str, Any]):
+def parse_server_timing(valor: str) -> List[Dict[str, Any]]:
+    """'perfil;dur=0.12, total;dur=3.4' -> [{"Etapa": "perfil", "ms": 0.12}, ...]"""
+    etapas = []
+    for parte in valor.split(","):
+        campos = [c.strip() for c in parte.split(";")]
+        dur = next((c[4:] for c in campos[1:] if c.startswith("dur=")), None)
+        if campos[0] and dur is not None:
+            etapas.append({"Etapa": campos[0], "ms": float(dur)})
+    return etapas
+
+
+def api_post(path: str, json_data: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
     url = f"{BACKEND_URL}{path}"
     try:
-        resp = requests.post(url, json=json_data, timeout=20)
+        resp = requests.post(url, json=json_data, headers=headers, timeout=20)
         resp.raise_for_status()
+        if "Server-Timing" in resp.headers:
+            st.session_state["server_timing"] = parse_server_timing(
+                resp.headers["Server-Timing"]
+            )
         return resp.json()
     except requests.exceptions.HTTPError as e:
         try:
@@ -68,7 +83,10 @@ def recomendar(usuario_id: int, top_k: int = 10, genero: Optional[str] = None):
         "genero": None if genero == "Todos" else genero,
         "ordenar_por": "similaridade",
     }
-    return api_post("/recomendar", payload) or []
+    # modo debug: o backend devolve o tempo de cada etapa em Server-Timing
+    headers = {"X-Musiq-Debug": "1"} if st.session_state.get("debug_tempos") else None
+    st.session_state.pop("server_timing", None)
+    return api_post("/recomendar", payload, headers=headers) or []
 
 
 def avaliar(usuario_id: int, item_id: int, gostou: bool, origem: str):
@@ -167,6 +185,9 @@ def sidebar_user():
     else:
         st.sidebar.info("Nenhum usuário ativo.")
 
+    st.sidebar.markdown("---")
+    st.sidebar.checkbox("Modo debug (tempos do backend)", key="debug_tempos")
+
 
 def card_musica(item: Dict[str, Any], origem: str, mostrar_sim: bool = False):
     """
@@ -288,6 +309,23 @@ def pagina_inicio():
         st.markdown("---")
 
 
+def painel_tempos():
+    etapas = st.session_state.get("server_timing")
+    with st.expander("Tempos da última recomendação (debug)", expanded=True):
+        if not etapas:
+            st.info("Gere as recomendações com o modo debug ligado para ver os tempos.")
+            return
+        df_tempos = pd.DataFrame(etapas)
+        total = df_tempos.loc[df_tempos["Etapa"] == "total", "ms"].sum()
+        df_etapas = df_tempos[df_tempos["Etapa"] != "total"]
+        st.metric("Total no backend", f"{total:.2f} ms")
+        st.dataframe(df_etapas, use_container_width=True)
+        st.bar_chart(df_etapas.set_index("Etapa")[["ms"]], use_container_width=True)
+        st.caption(
+            "O restante do total é validação e codificação JSON feitas pelo FastAPI."
+        )
+
+
 def pagina_recomendador():
     usuario_id = st.session_state.get("usuario_id")
     if usuario_id is None:
@@ -314,6 +352,9 @@ def pagina_recomendador():
         st.info("Nenhuma recomendação gerada ainda.")
         return
 
+    if st.session_state.get("debug_tempos"):
+        painel_tempos()
+
     st.markdown("#### Recomendações")
     for it in recs:
         card_musica(it, origem="recomendador", mostrar_sim=True)
@@ -0,0 +1,29 @@
+# tests/conftest.py
+"""
+Os módulos do backend leem a configuração (MUSIQ_DATA_DIR etc.) na
+importação, então a pasta de dados dos testes é definida aqui, antes de
+qualquer import de backend: uma cópia dos CSVs de demonstração numa pasta
+temporária, para os testes nunca escreverem em backend/data.
+"""
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+DADOS_DEMO = RAIZ / "backend" / "data"
+
+
+def copiar_dados_demo(destino: Path) -> Path:
+    """Copia itens/avaliacoes/usuarios.csv e as capas para destino."""
+    destino.mkdir(parents=True, exist_ok=True)
+    for nome in ("itens.csv", "avaliacoes.csv", "usuarios.csv"):
+        shutil.copy(DADOS_DEMO / nome, destino / nome)
+    shutil.copytree(DADOS_DEMO / "image", destino / "image", dirs_exist_ok=True)
+    return destino
+
+
+_pasta = Path(tempfile.mkdtemp(prefix="musiq-testes-"))
+os.environ["MUSIQ_DATA_DIR"] = str(copiar_dados_demo(_pasta / "data"))
+sys.path.insert(0, str(RAIZ))
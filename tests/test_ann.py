@@ -0,0 +1,31 @@
+# tests/test_ann.py
+import pytest
+
+from backend import ann
+from backend import profiles
+from backend import recommender as rec
+
+
+@pytest.fixture
+def indice_ann(monkeypatch):
+    rec._ensure_perfis()
+    # índice pequeno (poucos itens por lista), o ativo volta ao fim do teste
+    monkeypatch.setattr(ann, "_indice", None)
+    ann.construir(rec._item_matrix)
+
+
+@pytest.mark.parametrize("genero", [None, "Rock", "jazz"])
+def test_ann_devolve_tantos_itens_quanto_o_exato(indice_ann, genero):
+    usuarios = sorted(rec.load_usuarios_df()["usuario_id"].unique())
+    for usuario_id in usuarios:
+        if not profiles.curtidos(usuario_id):
+            continue
+        exato = rec.recommend_for_user(usuario_id, top_k=10, genero=genero, backend="sparse")
+        aprox = rec.recommend_for_user(usuario_id, top_k=10, genero=genero, backend="ann")
+        assert len(aprox) == len(exato), (usuario_id, genero)
+
+
+def test_ann_sem_top_k_pontua_todas_as_linhas(indice_ann):
+    exato = rec.recommend_for_user(1, top_k=None, backend="sparse")
+    aprox = rec.recommend_for_user(1, top_k=None, backend="ann")
+    assert aprox["item_id"].tolist() == exato["item_id"].tolist()
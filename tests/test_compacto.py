@@ -0,0 +1,72 @@
+# tests/test_compacto.py
+import numpy as np
+import pytest
+import scipy.sparse as sp
+
+from backend import ann, lsa, profiles
+from backend import recommender as rec
+from backend.scoring import score_items
+
+
+def _usuarios_com_likes():
+    rec._ensure_perfis()
+    usuarios = sorted(rec.load_usuarios_df()["usuario_id"].unique())
+    return [u for u in usuarios if profiles.curtidos(u)]
+
+
+@pytest.fixture
+def modo_compacto(monkeypatch):
+    def ativar(max_termos=0):
+        monkeypatch.setattr(profiles, "MODO_COMPACTO", True)
+        monkeypatch.setattr(rec, "MODO_COMPACTO", True)
+        monkeypatch.setattr(profiles, "PERFIL_MAX_TERMOS", max_termos)
+        rec._resetar_perfis()
+        rec._ensure_perfis()
+
+    yield ativar
+    # os perfis esparsos não servem fora do modo compacto
+    rec._resetar_perfis()
+
+
+def test_perfil_compacto_esparso_recomenda_como_o_denso(modo_compacto):
+    usuarios = _usuarios_com_likes()
+    densos = {u: rec.recommend_for_user(u, top_k=10, backend="sparse") for u in usuarios}
+    modo_compacto()
+    lote, _ = rec.recommend_for_users(usuarios, top_k=10)
+    for u in usuarios:
+        assert sp.issparse(profiles.perfil_vetor(u))
+        recs = rec.recommend_for_user(u, top_k=10, backend="sparse")
+        assert recs["item_id"].tolist() == densos[u]["item_id"].tolist()
+        np.testing.assert_allclose(recs["similaridade"], densos[u]["similaridade"])
+        assert lote[u]["item_id"].tolist() == recs["item_id"].tolist()
+
+
+def test_perfil_compacto_truncado_mantem_os_maiores_pesos(modo_compacto):
+    usuarios = _usuarios_com_likes()
+    densos = {u: profiles.perfil_vetor(u) for u in usuarios}
+    modo_compacto(max_termos=5)
+    for u in usuarios:
+        perfil = profiles.perfil_vetor(u)
+        assert perfil.nnz == min(5, np.count_nonzero(densos[u]))
+        pesos = np.sort(densos[u])[::-1][: perfil.nnz]
+        np.testing.assert_allclose(np.sort(perfil.data)[::-1], pesos)
+
+
+@pytest.mark.parametrize("backend", ["sparse", "ann", "lsa"])
+def test_backends_aceitam_perfil_esparso(monkeypatch, backend):
+    usuarios = _usuarios_com_likes()
+    monkeypatch.setattr(ann, "_indice", None)
+    monkeypatch.setattr(lsa, "_indice", None)
+    if backend == "ann":
+        ann.construir(rec._item_matrix)
+    elif backend == "lsa":
+        lsa.construir(rec._item_matrix)
+    linhas = rec._linhas_candidatas("Rock", rec._item_matrix.shape[0])
+    for u in usuarios:
+        denso = profiles.perfil_vetor(u)
+        esparso = sp.csr_matrix(denso)
+        for l in (None, linhas):
+            np.testing.assert_allclose(
+                score_items(rec._item_matrix, esparso, backend, l),
+                score_items(rec._item_matrix, denso, backend, l),
+            )
@@ -0,0 +1,45 @@
+# tests/test_event_log.py
+import os
+import subprocess
+import sys
+
+from backend import event_log
+
+from conftest import RAIZ
+
+EVENTOS_POR_PROCESSO = 1500
+
+_ESCRITOR = """
+import sys
+from backend import event_log
+usuario_id = int(sys.argv[1])
+for item_id in range(int(sys.argv[2])):
+    event_log.append_evento(usuario_id, item_id, 1, "teste")
+"""
+
+
+def test_compactacao_nao_perde_eventos_de_outros_processos(tmp_path, monkeypatch):
+    monkeypatch.setattr(event_log, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(event_log, "_linhas_no_log", None)
+    # os escritores nunca compactam sozinhos: quem compacta é este processo
+    env = dict(
+        os.environ,
+        MUSIQ_DATA_DIR=str(tmp_path),
+        MUSIQ_USUARIOS_LOG_COMPACTAR_A_CADA=str(10**9),
+    )
+    escritores = [
+        subprocess.Popen(
+            [sys.executable, "-c", _ESCRITOR, str(usuario_id), str(EVENTOS_POR_PROCESSO)],
+            cwd=RAIZ,
+            env=env,
+        )
+        for usuario_id in (1, 2)
+    ]
+    while any(p.poll() is None for p in escritores):
+        event_log.compactar()
+    assert all(p.returncode == 0 for p in escritores)
+    event_log.compactar()
+
+    df = event_log.ler_usuarios()
+    for usuario_id in (1, 2):
+        assert sorted(df.loc[df["usuario_id"] == usuario_id, "item_id"].astype(int)) == list(range(EVENTOS_POR_PROCESSO))
@@ -0,0 +1,24 @@
+# tests/test_lote.py
+import pytest
+
+from backend import profiles
+from backend import recommender as rec
+
+
+@pytest.mark.parametrize("genero", [None, "Rock"])
+def test_lote_igual_a_chamadas_individuais(genero):
+    rec._ensure_perfis()
+    usuarios = sorted(rec.load_usuarios_df()["usuario_id"].unique())
+    recs, erros = rec.recommend_for_users(usuarios, top_k=10, genero=genero, bloco=3)
+    for usuario_id in usuarios:
+        if not profiles.curtidos(usuario_id):
+            assert usuario_id in erros
+            continue
+        individual = rec.recommend_for_user(
+            usuario_id, top_k=10, genero=genero, backend="sparse"
+        )
+        lote = recs[usuario_id]
+        assert lote["item_id"].tolist() == individual["item_id"].tolist()
+        assert lote["similaridade"].tolist() == pytest.approx(
+            individual["similaridade"].tolist()
+        )
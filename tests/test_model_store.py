@@ -0,0 +1,96 @@
+# tests/test_model_store.py
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+from backend import catalogo, colunar, ingestao, model_store, search
+from backend import recommender as rec
+from backend.config import DATA_DIR
+
+
+def test_artefato_em_blocos_igual_ao_fit_do_catalogo_inteiro(tmp_path, monkeypatch):
+    monkeypatch.setattr(model_store, "MODEL_DIR", tmp_path)
+    path = DATA_DIR / "itens.csv"
+    # blocos pequenos: várias passadas em paralelo e postings de vários blocos
+    vectorizer, n_itens, nnz = ingestao.ajustar_tfidf(
+        ingestao.ler_blocos(path, bloco=7), rec.STOPWORDS_PT, n_jobs=2
+    )
+    blocos = ingestao.transformar_blocos(ingestao.ler_blocos(path, bloco=7), vectorizer, n_jobs=2)
+    model_store.salvar(vectorizer, blocos, n_itens, nnz, "teste")
+    modelo = model_store.carregar("teste")
+
+    itens = ingestao.ler_itens(path)
+    referencia = TfidfVectorizer(stop_words=rec.STOPWORDS_PT)
+    esperado = normalize(referencia.fit_transform(ingestao.textos_features(itens)))
+    assert modelo["vectorizer"].vocabulary_ == referencia.vocabulary_
+    np.testing.assert_allclose(modelo["item_matrix"].toarray(), esperado.toarray())
+    assert modelo["item_ids"].tolist() == itens["item_id"].tolist()
+    pd.testing.assert_frame_equal(modelo["itens"].linhas(np.arange(n_itens)), itens)
+    linhas = [5, 0, 5, n_itens - 1]
+    pd.testing.assert_frame_equal(
+        modelo["itens"].linhas(linhas), itens.iloc[linhas].reset_index(drop=True)
+    )
+    posicoes = catalogo.PosicoesItens(modelo["ids_ordenados"], modelo["ids_ordem"])
+    assert posicoes.posicoes(itens["item_id"]).tolist() == list(range(n_itens))
+
+    generos = itens.groupby(itens["genero"].str.lower()).indices
+    assert {g: p.tolist() for g, p in modelo["genero_pos"].items()} == {
+        g: p.tolist() for g, p in generos.items()
+    }
+    for campo, postings in search.construir_postings(itens).items():
+        carregadas = modelo["busca"][campo]
+        assert {g: p.tolist() for g, p in carregadas.items()} == {
+            g: p.tolist() for g, p in postings.items()
+        }
+
+
+def test_tabela_gravada_em_blocos(tmp_path):
+    blocos = [
+        pd.DataFrame(
+            {
+                "item_id": [3, 1],
+                "genero": pd.Categorical(["Rock", "Pop"]),
+                "nome": pd.Series(["á", None], dtype="str"),
+                "url": pd.Series(["u", None], dtype=object),
+            }
+        ),
+        # vazio na coluna inteira: promove para float, como o concat
+        pd.DataFrame(
+            {
+                "item_id": [np.nan],
+                "genero": pd.Categorical(["Jazz"]),
+                "nome": pd.Series(["b"], dtype="str"),
+                "url": pd.Series([None], dtype=object),
+            }
+        ),
+    ]
+    gravador = colunar.GravadorTabela(tmp_path / "t", 3)
+    for b in blocos:
+        gravador.anexar(b)
+    gravador.fechar()
+    tabela = colunar.Tabela(tmp_path / "t")
+
+    df = tabela.linhas([2, 0, 1])
+    assert df["item_id"].dtype == np.float64
+    assert df["item_id"].tolist()[1:] == [3.0, 1.0] and np.isnan(df["item_id"][0])
+    assert list(df["genero"].cat.categories) == ["Jazz", "Pop", "Rock"]
+    assert df["genero"].tolist() == ["Jazz", "Rock", "Pop"]
+    assert df["nome"].tolist()[:2] == ["b", "á"] and pd.isna(df["nome"][2])
+    assert df["url"].tolist() == [None, "u", None]
+    assert tabela.textos("nome", [0, 1, 2], "") == ["á", "", "b"]
+
+
+def test_posicoes_itens():
+    ids = np.array([5, 3, 5, 8])
+    ordem = np.argsort(ids, kind="stable")
+    posicoes = catalogo.PosicoesItens(ids[ordem], ordem)
+    # id repetido: vale a última linha, como no dict de antes
+    assert posicoes.posicoes([5, 3, 9, 8]).tolist() == [2, 1, -1, 3]
+    assert len(posicoes) == 3 and 9 not in posicoes
+
+    posicoes[9] = 4
+    posicoes[3] = 5
+    assert posicoes.posicoes([3, 9, 5]).tolist() == [5, 4, 2]
+    assert posicoes.get(9) == 4 and posicoes[3] == 5 and posicoes.get(7) is None
+    assert len(posicoes) == 4
@@ -0,0 +1,57 @@
+# tests/test_usuarios.py
+from fastapi.testclient import TestClient
+
+from backend import cache_resultados, event_log, profiles
+from backend import recommender as rec
+from backend.app import app
+from backend.storage import get_storage
+
+
+def test_recomendar_depois_de_avaliar_nao_rele_o_historico(monkeypatch):
+    cliente = TestClient(app)
+    rec._ensure_perfis()
+    storage = get_storage()
+    ler_usuarios = storage.ler_usuarios
+    leituras = []
+    monkeypatch.setattr(
+        storage, "ler_usuarios", lambda: leituras.append(1) or ler_usuarios()
+    )
+
+    r = cliente.post("/avaliar", json={"usuario_id": 1, "item_id": 5, "gostou": True})
+    assert r.status_code == 200
+    r = cliente.post("/recomendar", json={"usuario_id": 1, "top_k": 5})
+    assert r.status_code == 200 and len(r.json()) == 5
+    assert leituras == []
+
+    assert cliente.post("/recomendar", json={"usuario_id": 10**6}).status_code == 404
+
+
+def test_usuario_cadastrado_por_outro_processo_existe():
+    rec._ensure_perfis()
+    # escrita direta no log, como a de outro worker
+    novo_id, _, _ = event_log.append_cadastro("Outro Worker")
+    assert rec.usuario_existe(novo_id)
+    assert not rec.usuario_existe(novo_id + 1)
+
+
+def test_escrita_local_nao_esconde_a_de_outro_processo():
+    rec._ensure_perfis()
+    item_local, item_outro = 7, 9
+    assert item_outro not in profiles.curtidos(2)
+    geracao = profiles._geracao
+
+    # sem escrita de fora, a própria avaliação não descarta os perfis
+    rec.registrar_avaliacao(1, item_local, True, "teste")
+    rec._ensure_perfis()
+    assert profiles._geracao == geracao and item_local in profiles.curtidos(1)
+
+    rec.recommend_for_user(2, top_k=5)
+    assert cache_resultados._por_usuario.get(2)
+    # outro worker curte item_outro pelo usuário 2 e, em seguida, este
+    # processo registra uma avaliação de outro usuário
+    event_log.append_evento(2, item_outro, 1, "outro")
+    rec.registrar_avaliacao(3, item_local, True, "teste")
+
+    rec._ensure_perfis()
+    assert item_outro in profiles.curtidos(2)
+    assert 2 not in cache_resultados._por_usuario